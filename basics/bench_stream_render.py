@@ -0,0 +1,87 @@
+"""
+Benchmark: per-delta re-rendering vs StreamingMarkdown.
+
+Feeds a synthetic token stream into a fake placeholder that does what
+Streamlit does with each markdown() call: serialize the full body into a
+message for the websocket. No API key or browser needed.
+
+Usage:
+  python bench_stream_render.py --tokens 4000 --delay-ms 2
+"""
+
+import argparse
+import json
+import random
+import time
+
+from stream_render import CURSOR, StreamingMarkdown
+
+WORDS = "the model streams tokens into a growing markdown answer with lists code and prose".split()
+
+
+class FakePlaceholder:
+    """Counts renders and the bytes Streamlit would push to the browser."""
+
+    def __init__(self):
+        self.renders = 0
+        self.bytes_sent = 0
+
+    def markdown(self, body):
+        payload = json.dumps({"delta": {"markdown": {"body": body}}})
+        self.renders += 1
+        self.bytes_sent += len(payload)
+
+
+def synthetic_stream(tokens, delay_s, seed=0):
+    rng = random.Random(seed)
+    for i in range(tokens):
+        if i % 40 == 0:
+            yield "\n\n- "
+        yield rng.choice(WORDS) + " "
+        if delay_s:
+            time.sleep(delay_s)
+
+
+def run_naive(tokens, delay_s):
+    placeholder = FakePlaceholder()
+    full_response = ""
+    for delta in synthetic_stream(tokens, delay_s):
+        full_response += delta
+        placeholder.markdown(full_response + CURSOR)
+    placeholder.markdown(full_response)
+    return full_response, placeholder
+
+
+def run_throttled(tokens, delay_s):
+    placeholder = FakePlaceholder()
+    with StreamingMarkdown(placeholder) as out:
+        for delta in synthetic_stream(tokens, delay_s):
+            out.write(delta)
+    return out.text, placeholder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming markdown rendering.")
+    parser.add_argument("--tokens", type=int, default=4000, help="Deltas in the synthetic stream.")
+    parser.add_argument("--delay-ms", type=float, default=2.0, help="Delay between deltas (model speed).")
+    args = parser.parse_args()
+    delay_s = args.delay_ms / 1000
+
+    start = time.perf_counter()
+    naive_text, naive = run_naive(args.tokens, delay_s)
+    naive_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    throttled_text, throttled = run_throttled(args.tokens, delay_s)
+    throttled_s = time.perf_counter() - start
+
+    assert naive_text == throttled_text, "renderers must produce the same final text"
+
+    print(f"\nDeltas: {args.tokens}, answer: {len(naive_text):,} chars, delay {args.delay_ms} ms/delta")
+    print(f"Per-delta:  {naive.renders:6d} renders, {naive.bytes_sent / 1e6:8.2f} MB sent, {naive_s:.2f}s")
+    print(f"Throttled:  {throttled.renders:6d} renders, {throttled.bytes_sent / 1e6:8.2f} MB sent, {throttled_s:.2f}s")
+    print(f"Bytes reduction: {naive.bytes_sent / throttled.bytes_sent:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,19 @@
 import json
 import logging
-import os
+import sys
 import time
 from datetime import datetime
+from pathlib import Path
 
 import streamlit as st
-import tiktoken
-from anthropic import AI_PROMPT, HUMAN_PROMPT, Anthropic
 from streamlit_float import float_init
 
-from openai import OpenAI
+from llm_clients import get_registry
+from stream_render import StreamingMarkdown
+
+# Token accounting is shared with the Gemini chat app
+sys.path.append(str(Path(__file__).resolve().parent.parent / "gemini_google_basics"))
+from token_accounting import add_message, clear_messages, init_token_state, tokens_by_role, total_tokens
 
 # Set up logging
 logging.basicConfig(encoding="UTF-8", level=logging.INFO)
@@ -134,13 +138,16 @@ class ChatInterface:
                     key="claude_model_select",
                 )
 
+            # Recounts the history once if the new model uses another tokenizer
+            init_token_state(st.session_state, st.session_state.selected_model)
+
             # Model-specific settings
             self.temperature = st.slider("Temperature", 0.0, 1.0, 0.7)
             self.max_tokens = st.slider("Max Tokens", 100, 2000, 500)
 
             # Chat history options
             if st.button("Clear Chat History"):
-                st.session_state.messages = []
+                clear_messages(st.session_state)
                 st.session_state.conversation_history = []
                 st.success("Chat history cleared!")
 
@@ -152,26 +159,25 @@ class ChatInterface:
             if st.session_state.messages:
                 self.display_token_usage()
 
-    def get_client(self):
-        """Initialize and return the appropriate client based on selected provider"""
-        if st.session_state.model_provider == "OpenAI":
-            return (
-                OpenAI(api_key=os.getenv("OPENAI_API_KEY")),
-                st.session_state.selected_model,
-            )
-        elif st.session_state.model_provider == "Claude AI":
-            return (
-                Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY")),
-                st.session_state.selected_model,
+            self.display_provider_metrics()
+
+    def display_provider_metrics(self):
+        """Display time-to-first-token and tokens/sec per provider"""
+        metrics = get_registry().metrics()
+        if not metrics:
+            return
+        st.sidebar.markdown("**Provider Latency**")
+        for provider, m in metrics.items():
+            st.sidebar.markdown(
+                f"- {provider}: TTFT {m['avg_ttft_s']:.2f}s, "
+                f"{m['avg_tokens_per_s']:.0f} tok/s ({m['requests']} requests)"
             )
 
     def display_token_usage(self):
         """Display token usage statistics"""
-        enc = tiktoken.get_encoding("cl100k_base")
-        total_tokens = sum(
-            len(enc.encode(msg["content"])) for msg in st.session_state.messages
-        )
-        st.sidebar.markdown(f"**Total Tokens Used:** {total_tokens}")
+        st.sidebar.markdown(f"**Total Tokens Used:** {total_tokens(st.session_state)}")
+        for role, tokens in tokens_by_role(st.session_state).items():
+            st.sidebar.markdown(f"- {role.capitalize()}: {tokens}")
 
     def export_chat_history(self):
         """Export chat history to JSON file"""
@@ -199,68 +205,43 @@ class ChatInterface:
             return
 
         # Add user message
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        add_message(st.session_state, "user", prompt)
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # Get client and model
-        client, model = self.get_client()
+        registry = get_registry()
+        provider = st.session_state.model_provider
+        model = st.session_state.selected_model
 
-        # Generate response
+        # Generate response (same streaming interface for every provider)
         with st.chat_message("assistant"):
-            message_placeholder = st.empty()
-            full_response = ""
+            # Buffers deltas and re-renders on a time/size cadence, not per delta
+            renderer = StreamingMarkdown(st.empty())
+            stats = []
 
             try:
-                if st.session_state.model_provider in ["OpenAI"]:
-                    for response in client.chat.completions.create(
-                        model=model,
-                        messages=[
-                            {"role": m["role"], "content": m["content"]}
-                            for m in st.session_state.messages
-                        ],
-                        stream=True,
-                        temperature=self.temperature,
-                        max_tokens=self.max_tokens,
-                    ):
-                        full_response += response.choices[0].delta.content or ""
-                        message_placeholder.markdown(full_response + "▌")
-
-                elif st.session_state.model_provider == "Claude AI":
-                    prompt = self.format_claude_prompt()
-                    stream = client.completions.create(
-                        model=model,
-                        prompt=prompt,
-                        max_tokens_to_sample=self.max_tokens,
-                        stream=True,
-                        temperature=self.temperature,
+                for delta in registry.stream(
+                    provider,
+                    model,
+                    st.session_state.messages,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    on_stats=stats.append,
+                ):
+                    renderer.write(delta)
+
+                full_response = renderer.close()
+                add_message(st.session_state, "assistant", full_response)
+
+                if stats and stats[0].ttft_s is not None:
+                    st.caption(
+                        f"First token in {stats[0].ttft_s:.2f}s · {stats[0].tokens_per_s:.0f} tokens/s"
                     )
-                    for completion in stream:
-                        full_response += completion.completion or ""
-                        message_placeholder.markdown(full_response + "▌")
-
-                message_placeholder.markdown(full_response)
-                st.session_state.messages.append(
-                    {"role": "assistant", "content": full_response}
-                )
 
             except Exception as e:
                 logger.error(f"Error generating response: {str(e)}")
                 st.error(f"An error occurred: {str(e)}")
 
-    def format_claude_prompt(self):
-        """Format the prompt for Claude AI"""
-        prompt = ""
-        for m in st.session_state.messages:
-            if m["role"] == "user":
-                prompt += f"{HUMAN_PROMPT} {m['content']}"
-            else:
-                prompt += f"{AI_PROMPT} {m['content']}"
-        return (
-            prompt
-            + f"{HUMAN_PROMPT} {st.session_state.messages[-1]['content']}{AI_PROMPT}"
-        )
-
     def run(self):
         """Main method to run the chat interface"""
         st.title("🤖 AI Chat Interface")
@@ -0,0 +1,232 @@
+"""
+Pooled multi-provider LLM clients for the chat apps.
+
+Creating OpenAI(...) / Anthropic(...) per message gives every turn a fresh
+HTTP connection pool, so each turn pays DNS + TCP + TLS again. Instead:
+
+- One async client per (provider, api key, base URL), built once per process
+  on a shared httpx pool with keep-alive (HTTP/2 when `h2` is installed).
+- All clients live on a single background event loop, so pooled connections
+  stay valid across Streamlit reruns; stream() bridges it to plain iteration.
+- astream()/stream() yield text deltas the same way for every provider.
+- Each stream reports its own StreamStats (time-to-first-token, output
+  tokens/sec) through `on_stats`; averages are kept per provider.
+
+Usage:
+  registry = get_registry()
+  for delta in registry.stream("OpenAI", "gpt-4o-mini", messages):
+      print(delta, end="")
+  registry.metrics()
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from anthropic import AsyncAnthropic
+
+from openai import AsyncOpenAI
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+# provider name -> (SDK kind, API key env var, base URL)
+PROVIDERS: Dict[str, Tuple[str, str, Optional[str]]] = {
+    "OpenAI": ("openai", "OPENAI_API_KEY", None),
+    "Claude AI": ("anthropic", "ANTHROPIC_API_KEY", None),
+    "Groq": ("openai", "GROQ_API_KEY", "https://api.groq.com/openai/v1"),
+}
+
+STATS_HISTORY = 100  # recent requests kept per provider for the averages
+
+_DONE = object()
+
+
+@dataclass
+class StreamStats:
+    provider: str
+    model: str
+    ttft_s: Optional[float] = None
+    duration_s: float = 0.0
+    output_tokens: int = 0
+
+    @property
+    def tokens_per_s(self) -> float:
+        # Generation rate after the first token arrived
+        gen_time = self.duration_s - (self.ttft_s or 0.0)
+        return self.output_tokens / gen_time if gen_time > 0 else 0.0
+
+
+class ProviderRegistry:
+    """Process-wide cache of async LLM clients plus per-provider latency stats."""
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, str, Optional[str]], object] = {}
+        self._stats: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # -- event loop ---------------------------------------------------------
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-clients", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    # -- clients ------------------------------------------------------------
+
+    def get_client(self, provider: str, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        """Cached async client for provider/key/base URL."""
+        kind, env_var, default_base = PROVIDERS[provider]
+        api_key = api_key or os.getenv(env_var)
+        base_url = base_url or default_base
+        key = (provider, api_key, base_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                http_client = httpx.AsyncClient(
+                    http2=HTTP2,
+                    timeout=httpx.Timeout(120.0, connect=10.0),
+                    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=300),
+                )
+                if kind == "anthropic":
+                    client = AsyncAnthropic(api_key=api_key, base_url=base_url, http_client=http_client)
+                else:
+                    client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+                self._clients[key] = client
+            return client
+
+    # -- streaming ----------------------------------------------------------
+
+    async def astream(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        on_stats: Optional[Callable[[StreamStats], None]] = None,
+    ) -> AsyncIterator[str]:
+        """Yield text deltas from any provider; when done, passes this request's StreamStats to on_stats."""
+        kind = PROVIDERS[provider][0]
+        client = self.get_client(provider)
+        stats = StreamStats(provider, model)
+        start = time.perf_counter()
+        deltas = 0
+        usage_tokens = None
+
+        if kind == "anthropic":
+            system = "\n".join(m["content"] for m in messages if m["role"] == "system")
+            extra = {"system": system} if system else {}
+            stream = await client.messages.create(
+                model=model,
+                messages=[{"role": m["role"], "content": m["content"]} for m in messages if m["role"] != "system"],
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                **extra,
+            )
+            async for event in stream:
+                if event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                    if stats.ttft_s is None:
+                        stats.ttft_s = time.perf_counter() - start
+                    deltas += 1
+                    yield event.delta.text
+                elif event.type == "message_delta" and event.usage is not None:
+                    usage_tokens = event.usage.output_tokens
+        else:
+            extra = {"stream_options": {"include_usage": True}} if provider == "OpenAI" else {}
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=[{"role": m["role"], "content": m["content"]} for m in messages],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                **extra,
+            )
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage_tokens = chunk.usage.completion_tokens
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    if stats.ttft_s is None:
+                        stats.ttft_s = time.perf_counter() - start
+                    deltas += 1
+                    yield text
+
+        stats.duration_s = time.perf_counter() - start
+        # Providers send roughly one token per delta when usage is not reported
+        stats.output_tokens = usage_tokens if usage_tokens is not None else deltas
+        with self._lock:
+            self._stats.setdefault(provider, deque(maxlen=STATS_HISTORY)).append(stats)
+        if on_stats is not None:
+            on_stats(stats)
+
+    def stream(self, provider: str, model: str, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        """Synchronous view of astream(), for Streamlit and other threaded callers."""
+        out: "queue.Queue" = queue.Queue()
+
+        async def pump():
+            try:
+                async for delta in self.astream(provider, model, messages, **kwargs):
+                    out.put(delta)
+                out.put(_DONE)
+            except BaseException as e:
+                out.put(e)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._event_loop())
+        try:
+            while True:
+                item = out.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Consumer stopped early (e.g. the Streamlit script was rerun)
+            future.cancel()
+
+    # -- metrics ------------------------------------------------------------
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Per provider: request count, mean TTFT and mean output tokens/sec."""
+        summary = {}
+        with self._lock:
+            for provider, history in self._stats.items():
+                ttfts = [s.ttft_s for s in history if s.ttft_s is not None]
+                rates = [s.tokens_per_s for s in history if s.tokens_per_s > 0]
+                summary[provider] = {
+                    "requests": len(history),
+                    "avg_ttft_s": sum(ttfts) / len(ttfts) if ttfts else 0.0,
+                    "avg_tokens_per_s": sum(rates) / len(rates) if rates else 0.0,
+                }
+        return summary
+
+
+_registry: Optional[ProviderRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ProviderRegistry:
+    """The process-wide registry (shared by every Streamlit session)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ProviderRegistry()
+        return _registry
@@ -6,46 +6,46 @@ a Pydantic AI agent to analyze the data and answer questions about the posts.
 """
 
 import json
-import requests
 import os
 from dotenv import load_dotenv
 from instagram_post_analyzer import analyze_instagram_posts, AnalysisResult
+from instagram_fetcher import InstagramPostFetcher
 
 # Load environment variables
 load_dotenv()
 
-def fetch_instagram_posts(user_id: int = 18428658, depth: int = 1, chunk_size: int = 10) -> dict:
+_fetcher = None
+
+def get_fetcher() -> InstagramPostFetcher:
+    """Return the shared fetcher so its cache and unit budget span the session"""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = InstagramPostFetcher()
+    return _fetcher
+
+def fetch_instagram_posts(user_id: int = 18428658, depth: int = 1, chunk_size: int = 10,
+                          max_pages: int = 1) -> dict:
     """
     Fetch Instagram posts using EnsembleData API
     
+    Pages are served from the local response cache when available, so
+    re-running an analysis on the same user costs no API units.
+    
     Args:
         user_id: Instagram user ID (default: Kim Kardashian)
         depth: How deep to fetch posts
         chunk_size: Number of posts per request
+        max_pages: Number of pagination cursors to follow
         
     Returns:
         API response data
     """
-    root = "https://ensembledata.com/apis"
-    endpoint = "/instagram/user/posts"
-    
-    params = {
-        "user_id": user_id,
-        "depth": depth,
-        "oldest_timestamp": 1666262030,
-        "chunk_size": chunk_size,
-        "start_cursor": "",
-        "alternative_method": False,
-        "token": os.getenv("ENSEMBLE_DATA_API")
-    }
-    
-    try:
-        response = requests.get(root + endpoint, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data: {e}")
-        return None
+    return get_fetcher().fetch_user_posts(
+        user_id,
+        max_pages=max_pages,
+        depth=depth,
+        chunk_size=chunk_size,
+    )
 
 def interactive_analysis():
     """
@@ -0,0 +1,244 @@
+"""
+Paginated, parallel, cached EnsembleData fetcher
+
+Follows the `last_cursor` pagination of the EnsembleData Instagram user posts
+endpoint, fetches several users concurrently under a shared unit budget, and
+stores every raw page response in a local gzip cache with a TTL so repeat
+analyses start instantly and cost no API units.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+API_ROOT = "https://ensembledata.com/apis"
+USER_POSTS_ENDPOINT = "/instagram/user/posts"
+DEFAULT_OLDEST_TIMESTAMP = 1666262030
+CACHE_DIR = os.getenv(
+    "ENSEMBLE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "ensembledata"),
+)
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+
+
+class UnitBudget:
+    """
+    Thread-safe limiter for EnsembleData API units
+
+    Units are reserved before a request is sent and settled with the actual
+    `units_charged` once the response arrives; any unused reservation is
+    refunded. Each reservation is the larger of the caller's estimate and
+    the largest charge seen so far, so once a page's real cost is known,
+    concurrent workers cannot overspend. Only requests already in flight
+    when a larger charge is first seen can exceed their reservation: the
+    budget is overshot by at most (in-flight requests) x (charge - reserved),
+    once. An estimate at least the endpoint's real cost rules that out.
+    """
+
+    def __init__(self, max_units: Optional[int] = None):
+        self.max_units = max_units
+        self.units_spent = 0
+        self._reserved = 0
+        self._largest_charge = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, units: int) -> Optional[int]:
+        """Reserve units for one request; returns the units reserved, or None if over budget"""
+        with self._lock:
+            units = max(units, self._largest_charge)
+            if self.max_units is not None and self.units_spent + self._reserved + units > self.max_units:
+                return None
+            self._reserved += units
+            return units
+
+    def settle(self, reserved: int, charged: int) -> None:
+        with self._lock:
+            self._reserved -= reserved
+            self.units_spent += charged
+            self._largest_charge = max(self._largest_charge, charged)
+
+    @property
+    def remaining(self) -> Optional[int]:
+        if self.max_units is None:
+            return None
+        with self._lock:
+            return self.max_units - self.units_spent - self._reserved
+
+
+class ResponseCache:
+    """Gzip-compressed on-disk cache of raw API responses with a TTL"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict[str, Any]) -> str:
+        """Cache key over the endpoint and request params, excluding the token"""
+        cacheable = {k: v for k, v in params.items() if k != "token"}
+        payload = json.dumps([endpoint, cacheable], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json.gz")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.ttl_seconds is not None and time.time() - entry.get("fetched_at", 0) > self.ttl_seconds:
+            return None
+        return entry["response"]
+
+    def set(self, key: str, response: Dict[str, Any]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"fetched_at": time.time(), "response": response}, f)
+        os.replace(tmp_path, path)
+
+
+class InstagramPostFetcher:
+    """
+    Fetch Instagram user posts from EnsembleData with pagination, caching
+    and a shared unit budget
+
+    Args:
+        token: EnsembleData API token (defaults to ENSEMBLE_DATA_API)
+        cache: Response cache; pass None to disable caching
+        budget: Unit budget shared by all requests made by this fetcher
+        max_workers: Number of users fetched concurrently
+        units_per_page: Estimated units per request (reserved up front, and charged when the API does not report them)
+        session: Object with a `requests`-compatible `get` method
+    """
+
+    def __init__(self,
+                 token: Optional[str] = None,
+                 cache: Optional[ResponseCache] = ResponseCache(),
+                 budget: Optional[UnitBudget] = None,
+                 max_workers: int = 4,
+                 units_per_page: int = 1,
+                 session: Any = None):
+        self.token = token or os.getenv("ENSEMBLE_DATA_API")
+        self.cache = cache
+        self.budget = budget or UnitBudget()
+        self.max_workers = max_workers
+        self.units_per_page = units_per_page
+        self.session = session or requests.Session()
+        self.cache_hits = 0
+        self.api_calls = 0
+        self._stats_lock = threading.Lock()
+
+    def fetch_page(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a single page, serving it from the cache when possible
+
+        Returns:
+            Raw API response, or None if the budget is exhausted or the request failed
+        """
+        key = ResponseCache.make_key(USER_POSTS_ENDPOINT, params)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._stats_lock:
+                    self.cache_hits += 1
+                return cached
+
+        reserved = self.budget.reserve(self.units_per_page)
+        if reserved is None:
+            print(f"Unit budget exhausted, skipping page for user {params.get('user_id')}")
+            return None
+
+        charged = 0
+        try:
+            response = self.session.get(
+                API_ROOT + USER_POSTS_ENDPOINT,
+                params={**params, "token": self.token},
+                timeout=60,
+            )
+            response.raise_for_status()
+            charged = int(response.headers.get("units_charged", self.units_per_page))
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error fetching data: {e}")
+            return None
+        finally:
+            self.budget.settle(reserved, charged)
+
+        with self._stats_lock:
+            self.api_calls += 1
+        if self.cache is not None:
+            self.cache.set(key, data)
+        return data
+
+    def fetch_user_posts(self,
+                         user_id: int,
+                         max_pages: int = 5,
+                         depth: int = 1,
+                         chunk_size: int = 10,
+                         oldest_timestamp: int = DEFAULT_OLDEST_TIMESTAMP,
+                         alternative_method: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Follow pagination cursors for one user and merge the pages
+
+        Returns:
+            A response shaped like a single API page, with all fetched posts in
+            `data.posts` and the cursor to resume from in `data.last_cursor`
+        """
+        posts: List[Dict[str, Any]] = []
+        seen_ids = set()
+        cursor = ""
+        count = 0
+        for _ in range(max_pages):
+            page = self.fetch_page({
+                "user_id": user_id,
+                "depth": depth,
+                "oldest_timestamp": oldest_timestamp,
+                "chunk_size": chunk_size,
+                "start_cursor": cursor,
+                "alternative_method": alternative_method,
+            })
+            if page is None:
+                break
+
+            data = page.get("data", {})
+            count = data.get("count", count)
+            new_posts = 0
+            for post in data.get("posts", []):
+                post_id = post.get("node", {}).get("id")
+                if post_id in seen_ids:
+                    continue
+                seen_ids.add(post_id)
+                posts.append(post)
+                new_posts += 1
+
+            next_cursor = data.get("last_cursor")
+            if not next_cursor or next_cursor == cursor or new_posts == 0:
+                cursor = next_cursor or ""
+                break
+            cursor = next_cursor
+
+        if not posts and count == 0:
+            return None
+        return {"data": {"count": count, "posts": posts, "last_cursor": cursor}}
+
+    def fetch_users(self, user_ids: Iterable[int], **kwargs) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Fetch several users concurrently; kwargs are passed to fetch_user_posts"""
+        user_ids = list(user_ids)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = pool.map(lambda uid: self.fetch_user_posts(uid, **kwargs), user_ids)
+            return dict(zip(user_ids, results))
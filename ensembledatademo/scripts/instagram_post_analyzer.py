@@ -8,10 +8,12 @@ and answer questions about the content, engagement metrics, and other post attri
 import json
 import os
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent, RunContext
 from dotenv import load_dotenv
+from instagram_post_index import dataset_hash, get_post_index
+from instagram_query_planner import DatasetAggregates, answer_question, classify_question, normalize_question
 
 # Load environment variables
 load_dotenv()
@@ -37,6 +39,10 @@ class AnalysisResult(BaseModel):
     supporting_data: Optional[Dict[str, Any]] = Field(description="Additional data supporting the answer")
     confidence: str = Field(description="Confidence level of the analysis")
 
+# Precomputed aggregates and answers, keyed by dataset hash
+_aggregates_cache: Dict[str, DatasetAggregates] = {}
+_answer_cache: Dict[Tuple[str, str, bool], AnalysisResult] = {}
+
 # Create the Instagram analysis agent
 instagram_agent = Agent(
     'openai:gpt-4o',
@@ -60,10 +66,8 @@ instagram_agent = Agent(
     """
 )
 
-@instagram_agent.tool
-def extract_post_data(ctx: RunContext[Dict[str, Any]]) -> List[InstagramPostData]:
-    """Extract and structure Instagram post data from the API response"""
-    raw_data = ctx.deps
+def parse_instagram_posts(raw_data: Dict[str, Any]) -> List[InstagramPostData]:
+    """Structure the posts of a raw EnsembleData API response"""
     posts = []
     
     if 'data' in raw_data and 'posts' in raw_data['data']:
@@ -104,6 +108,11 @@ def extract_post_data(ctx: RunContext[Dict[str, Any]]) -> List[InstagramPostData
     
     return posts
 
+@instagram_agent.tool
+def extract_post_data(ctx: RunContext[Dict[str, Any]]) -> List[InstagramPostData]:
+    """Extract and structure Instagram post data from the API response"""
+    return parse_instagram_posts(ctx.deps)
+
 @instagram_agent.tool
 def get_engagement_metrics(ctx: RunContext[Dict[str, Any]]) -> Dict[str, Any]:
     """Calculate engagement metrics and statistics"""
@@ -226,54 +235,84 @@ def search_posts_by_criteria(ctx: RunContext[Dict[str, Any]],
                            min_likes: Optional[int] = None,
                            min_comments: Optional[int] = None,
                            content_type: Optional[str] = None,
-                           keyword_in_caption: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Search and filter posts based on specific criteria"""
-    posts = extract_post_data(ctx)
+                           keyword_in_caption: Optional[str] = None,
+                           match_all_keywords: bool = True,
+                           hashtags: Optional[List[str]] = None,
+                           mentions: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Search and filter posts based on specific criteria
+
+    Keywords are matched as caption word prefixes; separate several keywords
+    with spaces and set match_all_keywords=False to match any of them.
+    """
+    index = get_post_index(ctx.deps, lambda: extract_post_data(ctx))
+    terms = keyword_in_caption.split() if keyword_in_caption else None
+    matches = index.search(
+        terms=terms,
+        match_all=match_all_keywords,
+        hashtags=hashtags,
+        mentions=mentions,
+        min_likes=min_likes,
+        min_comments=min_comments,
+        content_type=content_type,
+    )
     
     filtered_posts = []
-    for post in posts:
-        # Apply filters
-        if min_likes and post.like_count < min_likes:
-            continue
-        if min_comments and post.comment_count < min_comments:
-            continue
-        if content_type:
-            if content_type.lower() == "video" and not post.is_video:
-                continue
-            if content_type.lower() == "image" and post.is_video:
-                continue
-            if content_type.lower() == "carousel" and not post.has_multiple_images:
-                continue
-        if keyword_in_caption and keyword_in_caption.lower() not in post.caption.lower():
-            continue
-        
-        # Add to results
+    for position in matches:
+        post = index.records[position]
         filtered_posts.append({
-            "shortcode": post.shortcode,
-            "username": post.username,
-            "likes": post.like_count,
-            "comments": post.comment_count,
-            "is_video": post.is_video,
-            "has_multiple_images": post.has_multiple_images,
-            "caption_preview": post.caption[:150] + "..." if len(post.caption) > 150 else post.caption,
-            "posted_date": datetime.fromtimestamp(post.taken_at_timestamp).strftime("%Y-%m-%d %H:%M")
+            "shortcode": post["shortcode"],
+            "username": post["username"],
+            "likes": post["likes"],
+            "comments": post["comments"],
+            "is_video": post["is_video"],
+            "has_multiple_images": post["has_multiple_images"],
+            "caption_preview": post["caption"][:150] + "..." if len(post["caption"]) > 150 else post["caption"],
+            "posted_date": datetime.fromtimestamp(post["taken_at_timestamp"]).strftime("%Y-%m-%d %H:%M")
         })
     
     return filtered_posts
 
-def analyze_instagram_posts(instagram_data: Dict[str, Any], question: str) -> AnalysisResult:
+def get_dataset_aggregates(instagram_data: Dict[str, Any], digest: str) -> DatasetAggregates:
+    """Return precomputed aggregates for a dataset, computing them on first use"""
+    aggregates = _aggregates_cache.get(digest)
+    if aggregates is None:
+        aggregates = DatasetAggregates(parse_instagram_posts(instagram_data))
+        _aggregates_cache[digest] = aggregates
+    return aggregates
+
+def analyze_instagram_posts(instagram_data: Dict[str, Any], question: str,
+                            use_fast_path: bool = True) -> AnalysisResult:
     """
     Main function to analyze Instagram posts and answer questions
     
+    Common metric, ranking and time-pattern questions are answered directly
+    from precomputed aggregates; everything else goes to the LLM agent.
+    Answers are cached per dataset and normalized question.
+    
     Args:
         instagram_data: Raw response from EnsembleData Instagram API
         question: User's question about the posts
+        use_fast_path: Answer recognized questions without calling the agent
         
     Returns:
         AnalysisResult with answer and supporting data
     """
-    result = instagram_agent.run_sync(question, deps=instagram_data)
-    return result.output
+    digest = dataset_hash(instagram_data)
+    cache_key = (digest, normalize_question(question), use_fast_path)
+    cached = _answer_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    intent = classify_question(question) if use_fast_path else None
+    if intent is not None:
+        answer, supporting_data = answer_question(intent, question, get_dataset_aggregates(instagram_data, digest))
+        output = AnalysisResult(answer=answer, supporting_data=supporting_data, confidence="high")
+    else:
+        output = instagram_agent.run_sync(question, deps=instagram_data).output
+
+    _answer_cache[cache_key] = output
+    return output
 
 # Example usage and test function
 def test_agent_with_sample_data():
@@ -0,0 +1,274 @@
+"""
+Inverted index over Instagram posts
+
+Builds a tokenized index over captions, hashtags and mentions plus pre-sorted
+numeric indexes for likes and comments, so that `search_posts_by_criteria`
+can answer filtered queries without scanning and lower-casing every caption.
+The index is built once per dataset (keyed by a content hash of the raw API
+response) and persisted to disk next to the other cached data.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+INDEX_VERSION = 1
+INDEX_DIR = os.getenv(
+    "INSTAGRAM_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "post_index"),
+)
+
+TOKEN_RE = re.compile(r"[#@]?\w+", re.UNICODE)
+
+# In-process cache so repeated tool calls in one agent run never touch disk
+_INDEX_CACHE: Dict[str, "PostIndex"] = {}
+
+# id(raw_data) -> (raw_data, digest) for the last few responses; holding the
+# object keeps its id from being reused by another dict
+_DIGEST_CACHE: "OrderedDict[int, tuple]" = OrderedDict()
+DIGEST_CACHE_SIZE = 8
+
+
+def dataset_hash(raw_data: Dict[str, Any]) -> str:
+    """
+    Stable content hash of a raw EnsembleData response
+
+    Hashing serializes the whole response, so the digest is memoized per
+    response object: responses are treated as read-only once loaded.
+    """
+    entry = _DIGEST_CACHE.get(id(raw_data))
+    if entry is not None and entry[0] is raw_data:
+        _DIGEST_CACHE.move_to_end(id(raw_data))
+        return entry[1]
+    payload = json.dumps(raw_data, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    _DIGEST_CACHE[id(raw_data)] = (raw_data, digest)
+    if len(_DIGEST_CACHE) > DIGEST_CACHE_SIZE:
+        _DIGEST_CACHE.popitem(last=False)
+    return digest
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lower-cased index tokens
+
+    Hashtags and mentions keep their `#`/`@` prefix and are also emitted as
+    a bare word, so `#sunset` is found by both a hashtag lookup and a plain
+    term search for "sunset".
+    """
+    tokens = []
+    for match in TOKEN_RE.findall(text.lower()):
+        tokens.append(match)
+        if match[0] in "#@" and len(match) > 1:
+            tokens.append(match[1:])
+    return tokens
+
+
+def _normalize_tag(tag: str, prefix: str) -> str:
+    tag = tag.strip().lower()
+    return tag if tag.startswith(prefix) else prefix + tag
+
+
+class PostIndex:
+    """
+    Inverted index plus sorted numeric indexes for a list of posts
+
+    Posts are referenced by their position in the original post list. Each
+    post is stored as a compact record so search results can be produced
+    without re-extracting the raw API response.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], postings: Dict[str, List[int]],
+                 likes: List[List[int]], comments: List[List[int]]):
+        self.records = records
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+        # [[count, position], ...] sorted ascending by count
+        self.likes = likes
+        self.comments = comments
+        self._like_keys = [pair[0] for pair in likes]
+        self._comment_keys = [pair[0] for pair in comments]
+        self._videos = {i for i, r in enumerate(records) if r["is_video"]}
+        self._carousels = {i for i, r in enumerate(records) if r["has_multiple_images"]}
+
+    @classmethod
+    def build(cls, posts: Iterable[Any]) -> "PostIndex":
+        """
+        Build an index from `InstagramPostData`-like objects
+
+        Args:
+            posts: Objects exposing shortcode, username, caption, like_count,
+                comment_count, is_video, has_multiple_images and taken_at_timestamp
+
+        Returns:
+            A ready-to-query PostIndex
+        """
+        records = []
+        postings: Dict[str, List[int]] = {}
+        for position, post in enumerate(posts):
+            records.append({
+                "shortcode": post.shortcode,
+                "username": post.username,
+                "caption": post.caption,
+                "likes": post.like_count,
+                "comments": post.comment_count,
+                "is_video": post.is_video,
+                "has_multiple_images": post.has_multiple_images,
+                "taken_at_timestamp": post.taken_at_timestamp,
+            })
+            for token in set(tokenize(post.caption)):
+                postings.setdefault(token, []).append(position)
+
+        likes = sorted([r["likes"], i] for i, r in enumerate(records))
+        comments = sorted([r["comments"], i] for i, r in enumerate(records))
+        return cls(records, postings, likes, comments)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "records": self.records,
+            "postings": self.postings,
+            "likes": self.likes,
+            "comments": self.comments,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PostIndex":
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported post index version: {data.get('version')}")
+        return cls(data["records"], data["postings"], data["likes"], data["comments"])
+
+    def save(self, path: str) -> None:
+        """Persist the index atomically as JSON"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PostIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _term_positions(self, term: str) -> Set[int]:
+        """Positions of posts containing any token starting with `term`"""
+        term = term.lower()
+        positions: Set[int] = set()
+        start = bisect.bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            positions.update(self.postings[token])
+        return positions
+
+    def _at_least(self, keys: List[int], pairs: List[List[int]], minimum: int) -> Set[int]:
+        start = bisect.bisect_left(keys, minimum)
+        return {pair[1] for pair in pairs[start:]}
+
+    def search(self,
+               terms: Optional[List[str]] = None,
+               match_all: bool = True,
+               hashtags: Optional[List[str]] = None,
+               mentions: Optional[List[str]] = None,
+               min_likes: Optional[int] = None,
+               min_comments: Optional[int] = None,
+               content_type: Optional[str] = None) -> List[int]:
+        """
+        Find posts matching all of the given criteria
+
+        Args:
+            terms: Caption words; each term also matches words it is a prefix of
+            match_all: Require every term (AND) instead of any term (OR)
+            hashtags: Hashtags the post must all contain (with or without `#`)
+            mentions: Usernames the post must all mention (with or without `@`)
+            min_likes: Minimum like count
+            min_comments: Minimum comment count
+            content_type: "video", "image" or "carousel"
+
+        Returns:
+            Matching post positions in original post order
+        """
+        candidate_sets: List[Set[int]] = []
+
+        if terms:
+            term_sets = [self._term_positions(term) for term in terms if term.strip()]
+            if term_sets:
+                if match_all:
+                    candidate_sets.extend(term_sets)
+                else:
+                    candidate_sets.append(set().union(*term_sets))
+        for tag in hashtags or []:
+            candidate_sets.append(set(self.postings.get(_normalize_tag(tag, "#"), ())))
+        for mention in mentions or []:
+            candidate_sets.append(set(self.postings.get(_normalize_tag(mention, "@"), ())))
+        if min_likes:
+            candidate_sets.append(self._at_least(self._like_keys, self.likes, min_likes))
+        if min_comments:
+            candidate_sets.append(self._at_least(self._comment_keys, self.comments, min_comments))
+
+        if content_type:
+            kind = content_type.lower()
+            if kind == "video":
+                candidate_sets.append(self._videos)
+            elif kind == "carousel":
+                candidate_sets.append(self._carousels)
+            elif kind == "image":
+                candidate_sets.append(set(range(len(self.records))) - self._videos)
+
+        if not candidate_sets:
+            return list(range(len(self.records)))
+
+        # Intersect smallest-first so the work is bounded by the rarest filter
+        candidate_sets.sort(key=len)
+        result = set(candidate_sets[0])
+        for other in candidate_sets[1:]:
+            if not result:
+                break
+            result &= other
+        return sorted(result)
+
+
+def index_path(digest: str) -> str:
+    return os.path.join(INDEX_DIR, f"{digest}.json")
+
+
+def get_post_index(raw_data: Dict[str, Any], load_posts: Callable[[], Iterable[Any]]) -> PostIndex:
+    """
+    Return the index for a dataset, building and persisting it on first use
+
+    Args:
+        raw_data: Raw EnsembleData API response used as the cache key
+        load_posts: Called only on a cache miss to produce the structured posts
+
+    Returns:
+        PostIndex for the dataset
+    """
+    digest = dataset_hash(raw_data)
+    index = _INDEX_CACHE.get(digest)
+    if index is not None:
+        return index
+
+    path = index_path(digest)
+    if os.path.exists(path):
+        try:
+            index = PostIndex.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable post index {path}: {e}")
+
+    if index is None:
+        index = PostIndex.build(load_posts())
+        try:
+            index.save(path)
+        except OSError as e:
+            print(f"Could not persist post index to {path}: {e}")
+
+    _INDEX_CACHE[digest] = index
+    return index
@@ -0,0 +1,263 @@
+"""
+Deterministic fast path for Instagram analytics questions
+
+Recognizes common metric, ranking and time-pattern questions and answers them
+directly from aggregates precomputed once per dataset, so only open-ended
+questions need a full LLM agent run.
+"""
+
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Questions containing these words need interpretation, not arithmetic
+OPEN_ENDED_RE = re.compile(
+    r"\b(why|theme|themes|topic|topics|about|sentiment|tone|recommend|suggest|should|"
+    r"strategy|improve|insight|insights|explain|describe|summar\w*|mood|style)\b"
+)
+
+TOP_N_RE = re.compile(r"\btop\s+(\d+)\b")
+
+NUMBER_WORDS = {"three": 3, "five": 5, "ten": 10, "two": 2, "four": 4}
+TOP_N_WORDS_RE = re.compile(rf"\btop\s+({'|'.join(NUMBER_WORDS)})\b")
+TOP_RE = re.compile(r"\btop\b")
+
+# Rankings answer "top N by raw count"; "top N" anywhere else restricts the posts the answer covers
+RANKING_INTENTS = {"top_likes", "top_comments"}
+# Per-post ratios and rates rank differently from the raw counts
+RELATIVE_RE = re.compile(r"\b(per|relative|rate|rates|ratio|ratios|proportion|percent\w*|divided)\b")
+
+# The aggregates only hold whole-dataset answers: thresholds, dates and content filters need the agent
+QUALIFIER_RE = re.compile(
+    r"\d|\b(mention\w*|with|without|contain\w*|includ\w*|hashtags?|caption\w*|keywords?|word|words|"
+    r"more|less|fewer|over|under|above|below|least|than|since|before|after|between|during|last|past|"
+    r"million|thousand|hundred|k|m|today|yesterday|week|weeks|month|months|year|years|"
+    r"january|february|march|april|may|june|july|august|september|october|november|december|"
+    r"jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec)\b"
+)
+
+# Content-type words filter the posts, except in the intents that compare the types
+TYPE_WORD_RE = re.compile(r"\b(videos?|carousels?|images?|photos?|pictures?|reels?|clips?)\b")
+TYPE_INTENTS = {"content_types", "type_engagement"}
+
+# Words that may surround an intent phrase without changing its meaning
+FILLER_WORDS = frozenset(
+    """a an the of is are was were be what which who how many much do does did has have had they their them
+    this that these those there account user profile dataset data me show give list tell get find can you please
+    i we my our for all across in on post posts posted published created like likes liked comment comments
+    commented count counts number engagement rate rates ratio look looks overall different each every
+    when often usually typically generally got gets received receive""".split()
+)
+
+# Ordered (intent, pattern) pairs; the first match wins
+INTENT_PATTERNS: List[Tuple[str, re.Pattern]] = [
+    ("comment_like_ratio", re.compile(r"\b(comment[- ]to[- ]like|comments? per like|ratio)\b")),
+    ("type_engagement", re.compile(
+        r"\b(type|types|videos?|images?|carousels?|format)\b.*\b(perform|performs|engagement|best|compare|better)\b"
+        r"|\b(perform|performs|engagement|best|compare|better)\b.*\b(type|types|videos?|images?|carousels?|format)\b")),
+    ("content_types", re.compile(r"\b(types? of content|content types?|videos? vs|how many (videos|images|carousels))\b"
+                                 r"|\bwhat (types|kinds?) of\b")),
+    ("top_comments", re.compile(r"\b(most|highest)( number of)? comments\b|\b(most|top) commented\b"
+                                r"|\btop posts? by comments\b")),
+    ("top_likes", re.compile(r"\b(most|highest)( number of)? likes\b|\b(most|top) liked\b"
+                             r"|\btop posts? by likes\b|\bmost popular\b")),
+    ("posting_patterns", re.compile(r"\b(most often|how often|posting (patterns?|times?|schedule)|optimal times?|"
+                                    r"what time|which day|day of (the )?week|hour)\b")),
+    ("date_range", re.compile(r"\b(when (were|was)|date range|earliest|latest|oldest|newest|created)\b")),
+    ("averages", re.compile(r"\b(average|avg|mean|per post)\b")),
+    ("totals", re.compile(r"\b(total|overall|sum)\b.*\b(likes|comments|engagement)\b")),
+    ("post_count", re.compile(r"\bhow many posts\b|\bnumber of posts\b|\bpost count\b")),
+]
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case, strip punctuation and collapse whitespace for cache keys"""
+    text = question.lower().replace("'s", " is")
+    text = re.sub(r"[^\w\s-]", " ", text)
+    return " ".join(text.split())
+
+
+def classify_question(question: str) -> Optional[str]:
+    """
+    Return the fast-path intent for a question, or None for open-ended ones
+
+    Args:
+        question: Raw or normalized user question
+
+    Returns:
+        Intent name from INTENT_PATTERNS, or None if the agent should answer (open-ended
+        questions, and questions with a threshold, date or content filter)
+    """
+    text = normalize_question(question)
+    if OPEN_ENDED_RE.search(text):
+        return None
+    # The count in "top N" is read by answer_question; keep "top" to tell rankings from filtered questions
+    core = TOP_N_WORDS_RE.sub("top", TOP_N_RE.sub("top", text))
+    if QUALIFIER_RE.search(core):
+        return None
+    for intent, pattern in INTENT_PATTERNS:
+        if not pattern.search(core):
+            continue
+        rest = pattern.sub(" ", core)
+        if intent in RANKING_INTENTS:
+            if RELATIVE_RE.search(core):
+                return None
+            rest = TOP_RE.sub(" ", rest)
+        elif TOP_RE.search(core):
+            return None
+        if intent in TYPE_INTENTS:
+            rest = TYPE_WORD_RE.sub(" ", rest)
+        elif TYPE_WORD_RE.search(core):
+            return None
+        # Only the intent phrase and filler: anything else may be a filter the aggregates ignore
+        return intent if set(rest.split()) <= FILLER_WORDS else None
+    return None
+
+
+def _preview(caption: str, limit: int = 100) -> str:
+    return caption[:limit] + "..." if len(caption) > limit else caption
+
+
+def _post_type(post: Any) -> str:
+    if post.is_video:
+        return "video"
+    if post.has_multiple_images:
+        return "carousel"
+    return "image"
+
+
+class DatasetAggregates:
+    """Metrics, rankings and time patterns computed once per dataset"""
+
+    def __init__(self, posts: Iterable[Any]):
+        posts = list(posts)
+        self.total_posts = len(posts)
+        self.usernames = sorted({p.username for p in posts})
+        self.total_likes = sum(p.like_count for p in posts)
+        self.total_comments = sum(p.comment_count for p in posts)
+        self.average_likes = round(self.total_likes / self.total_posts, 2) if posts else 0
+        self.average_comments = round(self.total_comments / self.total_posts, 2) if posts else 0
+
+        self.summaries = [{
+            "shortcode": p.shortcode,
+            "likes": p.like_count,
+            "comments": p.comment_count,
+            "type": _post_type(p),
+            "caption_preview": _preview(p.caption),
+            "posted_date": datetime.fromtimestamp(p.taken_at_timestamp).strftime("%Y-%m-%d %H:%M"),
+        } for p in posts]
+        self.by_likes = sorted(self.summaries, key=lambda s: s["likes"], reverse=True)
+        self.by_comments = sorted(self.summaries, key=lambda s: s["comments"], reverse=True)
+
+        type_counts: Counter = Counter()
+        type_likes: Counter = Counter()
+        type_comments: Counter = Counter()
+        for summary in self.summaries:
+            type_counts[summary["type"]] += 1
+            type_likes[summary["type"]] += summary["likes"]
+            type_comments[summary["type"]] += summary["comments"]
+        self.type_counts = dict(type_counts)
+        self.type_engagement = {
+            kind: {
+                "posts": count,
+                "average_likes": round(type_likes[kind] / count, 2),
+                "average_comments": round(type_comments[kind] / count, 2),
+            }
+            for kind, count in type_counts.items()
+        }
+
+        times = [datetime.fromtimestamp(p.taken_at_timestamp) for p in posts]
+        self.hour_distribution = dict(sorted(Counter(t.hour for t in times).items()))
+        self.day_distribution = dict(Counter(t.strftime("%A") for t in times).most_common())
+        self.earliest = min(times).strftime("%Y-%m-%d") if times else None
+        self.latest = max(times).strftime("%Y-%m-%d") if times else None
+
+
+def _top_n(question: str, default: int = 1) -> int:
+    text = normalize_question(question)
+    match = TOP_N_RE.search(text)
+    if match:
+        return max(1, int(match.group(1)))
+    for word, number in NUMBER_WORDS.items():
+        if re.search(rf"\btop {word}\b", text):
+            return number
+    return default
+
+
+def answer_question(intent: str, question: str, agg: DatasetAggregates) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build an answer for a recognized intent from precomputed aggregates
+
+    Returns:
+        Tuple of (answer text, supporting data)
+    """
+    if agg.total_posts == 0:
+        return "There are no posts in this dataset.", {"total_posts": 0}
+
+    if intent == "post_count":
+        return (f"The dataset contains {agg.total_posts} posts.",
+                {"total_posts": agg.total_posts, "usernames": agg.usernames})
+
+    if intent in ("averages", "totals"):
+        data = {
+            "total_posts": agg.total_posts,
+            "total_likes": agg.total_likes,
+            "total_comments": agg.total_comments,
+            "average_likes": agg.average_likes,
+            "average_comments": agg.average_comments,
+        }
+        if intent == "averages":
+            answer = (f"Across {agg.total_posts} posts the average is {agg.average_likes:,.2f} likes "
+                      f"and {agg.average_comments:,.2f} comments per post.")
+        else:
+            answer = (f"Across {agg.total_posts} posts there are {agg.total_likes:,} likes "
+                      f"and {agg.total_comments:,} comments in total.")
+        return answer, data
+
+    if intent in ("top_likes", "top_comments"):
+        metric = "likes" if intent == "top_likes" else "comments"
+        ranking = agg.by_likes if metric == "likes" else agg.by_comments
+        top = ranking[:_top_n(question)]
+        if len(top) == 1:
+            post = top[0]
+            answer = (f"Post {post['shortcode']} has the most {metric} with {post[metric]:,} "
+                      f"({post['type']}, posted {post['posted_date']}).")
+        else:
+            listing = "; ".join(f"{p['shortcode']} ({p[metric]:,} {metric})" for p in top)
+            answer = f"The top {len(top)} posts by {metric} are: {listing}."
+        return answer, {f"top_posts_by_{metric}": top}
+
+    if intent == "content_types":
+        parts = ", ".join(f"{count} {kind}{'s' if count != 1 else ''}" for kind, count in agg.type_counts.items())
+        distribution = {kind: round(count / agg.total_posts * 100, 1) for kind, count in agg.type_counts.items()}
+        return (f"Of {agg.total_posts} posts there are {parts}.",
+                {"type_counts": agg.type_counts, "percentage": distribution})
+
+    if intent == "type_engagement":
+        best = max(agg.type_engagement.items(), key=lambda item: item[1]["average_likes"])
+        return (f"{best[0].capitalize()} posts perform best with an average of "
+                f"{best[1]['average_likes']:,.2f} likes per post.",
+                {"engagement_by_type": agg.type_engagement})
+
+    if intent == "comment_like_ratio":
+        ratio = agg.total_comments / agg.total_likes if agg.total_likes else 0
+        per_post = {s["shortcode"]: round(s["comments"] / s["likes"], 4) if s["likes"] else None
+                    for s in agg.summaries}
+        return (f"The overall comment-to-like ratio is {ratio:.4f} "
+                f"({agg.total_comments:,} comments for {agg.total_likes:,} likes).",
+                {"overall_ratio": round(ratio, 4), "ratio_by_post": per_post})
+
+    if intent == "posting_patterns":
+        hour, hour_posts = max(agg.hour_distribution.items(), key=lambda item: item[1])
+        day, day_posts = next(iter(agg.day_distribution.items()))
+        return (f"Posts are most often published on {day} ({day_posts} posts) "
+                f"and at {hour}:00 ({hour_posts} posts).",
+                {"hour_distribution": agg.hour_distribution, "day_distribution": agg.day_distribution})
+
+    if intent == "date_range":
+        return (f"The posts were created between {agg.earliest} and {agg.latest}.",
+                {"date_range": {"earliest": agg.earliest, "latest": agg.latest},
+                 "posts": [{"shortcode": s["shortcode"], "posted_date": s["posted_date"]} for s in agg.summaries]})
+
+    raise ValueError(f"Unknown intent: {intent}")
@@ -1,21 +1,14 @@
-import requests
-import os
-from dotenv import load_dotenv
+import json
+from instagram_fetcher import InstagramPostFetcher
 
-# Load environment variables from .env file
-load_dotenv()
-
-root = "https://ensembledata.com/apis"
-endpoint = "/instagram/user/posts"
-params = {
-  "user_id": 18428658,
-  "depth": 1,
-  "oldest_timestamp": 1666262030,
-  "chunk_size": 10,
-  "start_cursor": "",
-  "alternative_method": False,
-  "token": os.getenv("ENSEMBLE_DATA_API")
-}
-
-res = requests.get(root+endpoint, params=params)
-print(res.json())
+# Pages are cached locally, so re-running this script costs no API units
+fetcher = InstagramPostFetcher()
+res = fetcher.fetch_user_posts(
+  user_id=18428658,
+  max_pages=3,
+  depth=1,
+  chunk_size=10,
+  oldest_timestamp=1666262030,
+)
+print(json.dumps(res))
+print(f"API calls: {fetcher.api_calls}, cache hits: {fetcher.cache_hits}, units spent: {fetcher.budget.units_spent}")
@@ -0,0 +1,134 @@
+"""
+Test the EnsembleData fetcher against recorded API responses
+"""
+
+import json
+import os
+import threading
+
+import requests
+
+from instagram_fetcher import InstagramPostFetcher, ResponseCache, UnitBudget
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class RecordedResponse:
+    def __init__(self, recording):
+        self.headers = recording["headers"]
+        self._body = recording["body"]
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._body
+
+
+class RecordedSession:
+    """Replays fixtures/user_posts_<user_id>_<cursor>.json instead of calling the API"""
+
+    def __init__(self):
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        with self._lock:
+            self.requests.append(dict(params))
+        cursor = params["start_cursor"] or "first"
+        path = os.path.join(FIXTURES_DIR, f"user_posts_{params['user_id']}_{cursor}.json")
+        if not os.path.exists(path):
+            raise requests.exceptions.HTTPError(f"No recording for {path}")
+        with open(path, encoding="utf-8") as f:
+            return RecordedResponse(json.load(f))
+
+
+def make_fetcher(tmp_path, session, **kwargs):
+    return InstagramPostFetcher(
+        token="test-token",
+        cache=ResponseCache(str(tmp_path), ttl_seconds=60),
+        session=session,
+        **kwargs,
+    )
+
+
+def test_follows_pagination_cursors(tmp_path):
+    session = RecordedSession()
+    result = make_fetcher(tmp_path, session).fetch_user_posts(18428658, max_pages=5)
+
+    shortcodes = [p["node"]["shortcode"] for p in result["data"]["posts"]]
+    assert shortcodes == ["SC3439159241662512720", "SC3439159241662512721", "SC3439159241662512722"]
+    assert result["data"]["count"] == 6255
+    assert [r["start_cursor"] for r in session.requests] == ["", "QVFDbnZzcllvOW56YTZtUExNd2JuVV9nZXNy"]
+    assert all(r["token"] == "test-token" for r in session.requests)
+
+
+def test_repeat_fetch_is_served_from_cache(tmp_path):
+    first = make_fetcher(tmp_path, RecordedSession())
+    first.fetch_user_posts(18428658)
+    assert first.budget.units_spent == 4
+
+    session = RecordedSession()
+    second = make_fetcher(tmp_path, session)
+    result = second.fetch_user_posts(18428658)
+    assert len(result["data"]["posts"]) == 3
+    assert session.requests == []
+    assert second.cache_hits == 2
+    assert second.budget.units_spent == 0
+
+
+def test_expired_cache_entries_are_refetched(tmp_path):
+    make_fetcher(tmp_path, RecordedSession()).fetch_user_posts(460563723)
+    session = RecordedSession()
+    fetcher = InstagramPostFetcher(
+        token="test-token",
+        cache=ResponseCache(str(tmp_path), ttl_seconds=0),
+        session=session,
+    )
+    fetcher.fetch_user_posts(460563723)
+    assert len(session.requests) == 1
+
+
+def test_fetch_users_concurrently(tmp_path):
+    results = make_fetcher(tmp_path, RecordedSession()).fetch_users([18428658, 460563723])
+    assert len(results[18428658]["data"]["posts"]) == 3
+    assert results[460563723]["data"]["posts"][0]["node"]["owner"]["username"] == "selenagomez"
+
+
+def test_unit_budget_stops_pagination(tmp_path):
+    session = RecordedSession()
+    fetcher = make_fetcher(tmp_path, session, budget=UnitBudget(max_units=3), units_per_page=2)
+    result = fetcher.fetch_user_posts(18428658, max_pages=5)
+
+    assert len(session.requests) == 1
+    assert len(result["data"]["posts"]) == 2
+    assert fetcher.budget.remaining == 1
+
+
+def test_reservations_grow_to_the_observed_page_cost(tmp_path):
+    # Pages cost 2 units but the estimate is 1: after the first charge,
+    # the second page reserves 2 and no longer fits in the budget
+    session = RecordedSession()
+    fetcher = make_fetcher(tmp_path, session, budget=UnitBudget(max_units=3), units_per_page=1)
+    fetcher.fetch_user_posts(18428658, max_pages=5)
+
+    assert len(session.requests) == 1
+    assert fetcher.budget.units_spent == 2
+
+
+def test_unit_budget_overshoot_is_bounded_by_requests_in_flight():
+    budget = UnitBudget(max_units=4)
+    held = [budget.reserve(1) for _ in range(3)]  # three requests in flight
+    assert held == [1, 1, 1] and budget.remaining == 1
+    assert budget.reserve(2) is None
+    for reserved in held:
+        budget.settle(reserved, 2)
+    # Overshoot: 3 in flight x (2 charged - 1 reserved)
+    assert budget.units_spent == 6
+
+    budget = UnitBudget(max_units=10)
+    budget.settle(budget.reserve(1), 3)
+    reserved = budget.reserve(1)
+    assert reserved == 3 and budget.remaining == 4
+    budget.settle(reserved, 1)  # unused units are refunded
+    assert budget.remaining == 6
@@ -0,0 +1,98 @@
+"""
+Tests for the Instagram post inverted index
+"""
+
+from types import SimpleNamespace
+
+import instagram_post_index
+from instagram_post_index import PostIndex, dataset_hash, get_post_index, tokenize
+
+
+def make_post(shortcode, caption, likes, comments, is_video=False, carousel=False):
+    return SimpleNamespace(
+        shortcode=shortcode,
+        username="kimkardashian",
+        caption=caption,
+        like_count=likes,
+        comment_count=comments,
+        is_video=is_video,
+        has_multiple_images=carousel,
+        taken_at_timestamp=1724199751,
+    )
+
+
+def sample_posts():
+    return [
+        make_post("A", "🧁 Sweet treats for a sweet day! #cupcakes #dessert", 642848, 4653, carousel=True),
+        make_post("B", "Behind the scenes magic ✨ #BTS #filming with @kourtney", 890234, 12456, is_video=True),
+        make_post("C", "Golden hour vibes 🌅 #sunset #photography", 1234567, 8901),
+    ]
+
+
+def test_tokenize_keeps_hashtags_and_bare_words():
+    tokens = tokenize("Golden #Sunset with @Kourtney")
+    assert "#sunset" in tokens and "sunset" in tokens
+    assert "@kourtney" in tokens and "kourtney" in tokens
+
+
+def test_terms_and_or():
+    index = PostIndex.build(sample_posts())
+    assert index.search(terms=["sweet", "day"]) == [0]
+    assert index.search(terms=["sweet", "golden"]) == []
+    assert index.search(terms=["sweet", "golden"], match_all=False) == [0, 2]
+
+
+def test_prefix_matching_preserves_substring_style_queries():
+    index = PostIndex.build(sample_posts())
+    assert index.search(terms=["sun"]) == [2]
+
+
+def test_hashtag_and_mention_lookup():
+    index = PostIndex.build(sample_posts())
+    assert index.search(hashtags=["BTS"]) == [1]
+    assert index.search(hashtags=["#dessert", "cupcakes"]) == [0]
+    assert index.search(mentions=["kourtney"]) == [1]
+
+
+def test_numeric_and_type_filters():
+    index = PostIndex.build(sample_posts())
+    assert index.search(min_likes=800000) == [1, 2]
+    assert index.search(min_likes=800000, min_comments=10000) == [1]
+    assert index.search(content_type="video") == [1]
+    assert index.search(content_type="image") == [0, 2]
+    assert index.search(content_type="carousel") == [0]
+    assert index.search() == [0, 1, 2]
+
+
+def test_index_is_built_once_and_persisted(tmp_path, monkeypatch):
+    monkeypatch.setattr(instagram_post_index, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(instagram_post_index, "_INDEX_CACHE", {})
+    raw = {"data": {"posts": [{"node": {"id": "1"}}]}}
+    calls = []
+
+    def load_posts():
+        calls.append(1)
+        return sample_posts()
+
+    first = get_post_index(raw, load_posts)
+    assert get_post_index(raw, load_posts) is first
+    assert len(calls) == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # A fresh process reloads from disk instead of rebuilding
+    monkeypatch.setattr(instagram_post_index, "_INDEX_CACHE", {})
+    reloaded = get_post_index(raw, load_posts)
+    assert len(calls) == 1
+    assert reloaded.search(hashtags=["sunset"]) == [2]
+
+
+def test_dataset_hash_is_computed_once_per_response(monkeypatch):
+    monkeypatch.setattr(instagram_post_index, "_DIGEST_CACHE", instagram_post_index.OrderedDict())
+    dumps = []
+    real_dumps = instagram_post_index.json.dumps
+    monkeypatch.setattr(instagram_post_index.json, "dumps", lambda *a, **k: dumps.append(1) or real_dumps(*a, **k))
+    raw = {"data": {"posts": [{"node": {"id": "1"}}]}}
+    digest = dataset_hash(raw)
+    assert dataset_hash(raw) == digest and len(dumps) == 1
+    # An equal response loaded separately hashes to the same digest
+    assert dataset_hash({"data": {"posts": [{"node": {"id": "1"}}]}}) == digest and len(dumps) == 2
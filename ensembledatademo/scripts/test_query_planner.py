@@ -0,0 +1,102 @@
+"""
+Tests for the deterministic Instagram question planner
+"""
+
+from types import SimpleNamespace
+
+from instagram_query_planner import DatasetAggregates, answer_question, classify_question, normalize_question
+
+
+def make_post(shortcode, caption, likes, comments, is_video=False, carousel=False, ts=1724199751):
+    return SimpleNamespace(
+        shortcode=shortcode,
+        username="kimkardashian",
+        caption=caption,
+        like_count=likes,
+        comment_count=comments,
+        is_video=is_video,
+        has_multiple_images=carousel,
+        taken_at_timestamp=ts,
+    )
+
+
+def sample_aggregates():
+    return DatasetAggregates([
+        make_post("A", "Sweet treats #cupcakes", 642848, 4653, carousel=True),
+        make_post("B", "Behind the scenes #BTS", 890234, 12456, is_video=True, ts=1724199800),
+        make_post("C", "Golden hour #sunset", 1234567, 8901, ts=1724199900),
+    ])
+
+
+def test_normalize_question_is_stable_across_punctuation_and_case():
+    assert normalize_question("What's the AVERAGE like count?") == normalize_question("what is the average like count")
+
+
+def test_classifies_common_questions():
+    assert classify_question("What is the average like count?") == "averages"
+    assert classify_question("Show me the top 3 most liked posts") == "top_likes"
+    assert classify_question("Which post has the most comments?") == "top_comments"
+    assert classify_question("When do they post most often?") == "posting_patterns"
+    assert classify_question("Compare the engagement rates across different post types") == "type_engagement"
+    assert classify_question("How does the comment-to-like ratio look?") == "comment_like_ratio"
+    assert classify_question("How many posts are there?") == "post_count"
+    assert classify_question("How many videos are there?") == "content_types"
+    assert classify_question("Show me the top three most commented posts") == "top_comments"
+    assert classify_question("When were the posts created?") == "date_range"
+    assert classify_question("What are the top 5 posts by likes?") == "top_likes"
+    assert classify_question("Which post has the highest number of comments?") == "top_comments"
+    assert classify_question("What is the most popular post?") == "top_likes"
+    assert classify_question("Which posts got the most likes?") == "top_likes"
+
+
+def test_open_ended_questions_fall_back_to_agent():
+    assert classify_question("What are the main themes in the captions?") is None
+    assert classify_question("Which post has the most likes and what is it about?") is None
+    assert classify_question("Show me posts with more than 500k likes") is None
+
+
+def test_filtered_questions_fall_back_to_agent():
+    # Each of these matches an intent phrase, but its whole-dataset answer would be wrong
+    for question in [
+        "How many posts have more than 1 million likes?",
+        "How many posts mention cupcakes?",
+        "How many posts were made in July?",
+        "How many posts since 2024-08-01?",
+        "average likes for video posts",
+        "total likes on carousel posts",
+        "Which video has the most likes?",
+        "Which image has the most comments?",
+        "What is the average like count for posts with hashtags?",
+        "Which post from last week has the most likes?",
+        "What is the average number of likes on the top 3 posts?",
+        "What are the total comments of the top five posts?",
+    ]:
+        assert classify_question(question) is None, question
+
+
+def test_ratio_and_rate_rankings_fall_back_to_agent():
+    # Ranking by a ratio is not ranking by either raw count
+    for question in [
+        "Which post has the most likes per comment?",
+        "Which post has the most likes relative to comments?",
+        "Which post has the most comments per like?",
+        "Which post has the highest engagement rate?",
+        "Which post is the most engaging?",
+    ]:
+        assert classify_question(question) is None, question
+
+
+def test_answers_from_aggregates():
+    agg = sample_aggregates()
+
+    _, data = answer_question("averages", "average likes", agg)
+    assert data["average_likes"] == round((642848 + 890234 + 1234567) / 3, 2)
+
+    _, data = answer_question("top_likes", "top 2 most liked posts", agg)
+    assert [p["shortcode"] for p in data["top_posts_by_likes"]] == ["C", "B"]
+
+    answer, data = answer_question("content_types", "what types of content", agg)
+    assert data["type_counts"] == {"carousel": 1, "video": 1, "image": 1}
+
+    answer, _ = answer_question("type_engagement", "which type performs best", agg)
+    assert answer.startswith("Image posts perform best")
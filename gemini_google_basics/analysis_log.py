@@ -0,0 +1,117 @@
+"""
+Append-only JSONL results log for batch video analysis.
+
+- One fsync'd JSON record per analyzed video, keyed by the video's content hash.
+- On rerun, videos already in the log are skipped (resume after a crash is free).
+- finalize() compacts the log into the plain JSON array the rest of the tooling reads.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def file_sha256(path: Path) -> str:
+    """Content hash of a file, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_files(paths: Sequence[Path], workers: int = 4) -> List[str]:
+    """Hash several files in parallel (hashlib releases the GIL on large reads)."""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(file_sha256, paths))
+
+
+class AnalysisLog:
+    """JSONL log of {"video_sha256", "video_filename", "result"} records."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._tail_checked = False
+
+    def _ends_mid_line(self) -> bool:
+        """True if the log ends in a partial record left by a crash."""
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return False
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def load(self) -> Dict[str, dict]:
+        """
+        Return {video_sha256: result} for every complete record.
+
+        A partially written last line (crash mid-append) is ignored, so the
+        video it belonged to is simply analyzed again.
+        """
+        done: Dict[str, dict] = {}
+        if not self.path.exists():
+            return done
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                done[record["video_sha256"]] = record["result"]
+        return done
+
+    def append(self, video_sha256: str, video_filename: str, result: dict):
+        """Append one record and fsync it before returning."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(
+            {"video_sha256": video_sha256, "video_filename": video_filename, "result": result},
+            ensure_ascii=False,
+        )
+        if not self._tail_checked:
+            # Start on a fresh line so a torn record can't swallow this one
+            if self._ends_mid_line():
+                line = "\n" + line
+            self._tail_checked = True
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def reset(self):
+        """Discard all records (forces a full re-analysis)."""
+        if self.path.exists():
+            self.path.unlink()
+        self._tail_checked = False
+
+    def ordered_results(self, video_hashes: Iterable[str]) -> List[dict]:
+        """Logged results ordered like video_hashes, one per distinct hash (identical files share a result)."""
+        done = self.load()
+        results, seen = [], set()
+        for h in video_hashes:
+            if h in done and h not in seen:
+                seen.add(h)
+                results.append(done[h])
+        return results
+
+    def finalize(self, json_path: Path, video_hashes: Iterable[str]) -> int:
+        """
+        Compact the log into a JSON array ordered like video_hashes.
+
+        The array is written to a temp file and renamed over json_path, so
+        readers never see a half-written file. Returns the number of objects.
+        """
+        results = self.ordered_results(video_hashes)
+        json_path = Path(json_path)
+        tmp_path = json_path.with_name(json_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, json_path)
+        return len(results)
@@ -0,0 +1,43 @@
+"""
+Non-blocking auto-refresh for the Gemini Streamlit apps.
+
+The old loop slept inside the script thread for up to a minute and then
+reran the whole app, so every session with auto-refresh on pinned a server
+thread. Here the refreshed part of the page is a fragment with run_every:
+Streamlit's timer reruns just that fragment, and the script thread is free
+between ticks.
+
+Usage:
+  auto_refresh_sidebar(lambda: st.caption(f"{len(st.session_state.messages)} messages"))
+"""
+
+from datetime import datetime
+from typing import Callable, Optional
+
+import streamlit as st
+
+
+def _fragment(run_every: float):
+    # st.fragment is the stable name from Streamlit 1.37; older releases ship it as experimental
+    decorator = getattr(st, "fragment", None) or st.experimental_fragment
+    return decorator(run_every=run_every)
+
+
+def _status_panel(render: Optional[Callable[[], None]]):
+    st.caption(f"Last refreshed at {datetime.now().strftime('%H:%M:%S')}")
+    if render is not None:
+        render()
+
+
+def auto_refresh_sidebar(render: Optional[Callable[[], None]] = None):
+    """
+    Sidebar toggle + interval; when enabled, rerun `render` on a timer.
+
+    Only the fragment (the timestamp and whatever `render` draws) reruns
+    on each tick; the rest of the page is left alone.
+    """
+    if not st.sidebar.checkbox("Enable auto-refresh"):
+        return
+    refresh_interval = st.sidebar.slider("Refresh interval (seconds)", 5, 60, 30)
+    with st.sidebar:
+        _fragment(refresh_interval)(_status_panel)(render)
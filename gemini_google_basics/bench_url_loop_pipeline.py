@@ -0,0 +1,138 @@
+"""
+Benchmark: sequential vs pipelined gemini_video_analysis_url_loop.
+
+Runs both flows against local fakes, so no API key or network is needed:
+- a local HTTP server that serves fake video bytes with a per-request delay
+- a fake Gemini client whose files stay PROCESSING for a while and whose
+  generate_content_stream yields chunks slowly
+
+Usage:
+  python bench_url_loop_pipeline.py --videos 12
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from gemini_video_analysis_url_loop import analyze_file, build_result, download_video, generate, upload_and_activate
+from video_batch_runner import ProviderBackoff
+
+DOWNLOAD_DELAY_S = 0.3
+UPLOAD_DELAY_S = 0.2
+PROCESSING_S = 0.6
+STREAM_CHUNKS = 5
+CHUNK_DELAY_S = 0.08
+POLL_INTERVAL_S = 0.05
+VIDEO_BYTES = b"\x00" * 256 * 1024
+
+
+class FakeVideoHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(DOWNLOAD_DELAY_S)
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(VIDEO_BYTES)))
+        self.end_headers()
+        self.wfile.write(VIDEO_BYTES)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeFiles:
+    """In-memory stand-in for client.files: upload, then PROCESSING for a while."""
+
+    def __init__(self):
+        self._ready_at = {}
+        self._lock = threading.Lock()
+
+    def upload(self, file):
+        time.sleep(UPLOAD_DELAY_S)
+        name = f"files/{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._ready_at[name] = time.monotonic() + PROCESSING_S
+        return SimpleNamespace(name=name, state="PROCESSING", uri=f"https://fake/{name}", mime_type="video/mp4")
+
+    def get(self, name):
+        with self._lock:
+            ready = time.monotonic() >= self._ready_at[name]
+        return SimpleNamespace(
+            name=name, state="ACTIVE" if ready else "PROCESSING", uri=f"https://fake/{name}", mime_type="video/mp4"
+        )
+
+
+class FakeModels:
+    def generate_content_stream(self, model, contents, config):
+        body = json.dumps({"scenes": [{"scene_number": 1}], "full_transcription": "fake"})
+        step = len(body) // STREAM_CHUNKS + 1
+        for i in range(0, len(body), step):
+            time.sleep(CHUNK_DELAY_S)
+            yield SimpleNamespace(text=body[i:i + step])
+
+
+class FakeGeminiClient:
+    def __init__(self):
+        self.files = FakeFiles()
+        self.models = FakeModels()
+
+
+def run_sequential(urls, client):
+    """The original flow: each URL fully handled before the next starts."""
+    backoff = ProviderBackoff()
+    results = []
+    for url in urls:
+        path = download_video(url)
+        try:
+            file_info = upload_and_activate(client, path, backoff, poll_interval=POLL_INTERVAL_S)
+        finally:
+            os.remove(path)
+        results.append(build_result(url, analyze_file(client, file_info, backoff)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the url_loop download→upload→analyze pipeline.")
+    parser.add_argument("--videos", type=int, default=12, help="Number of fake video URLs.")
+    parser.add_argument("--workers", type=int, default=3, help="Threads per pipeline stage.")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeVideoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_port}/video_{i}.mp4" for i in range(args.videos)]
+
+    start = time.perf_counter()
+    sequential = run_sequential(urls, FakeGeminiClient())
+    sequential_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        pipelined = generate(
+            urls,
+            client=FakeGeminiClient(),
+            download_workers=args.workers,
+            upload_workers=args.workers,
+            analyze_workers=args.workers,
+            queue_size=args.workers,
+            poll_interval=POLL_INTERVAL_S,
+            output_filepath=os.path.join(tmp, "results.json"),
+        )
+        pipelined_s = time.perf_counter() - start
+    server.shutdown()
+
+    assert [r["url"] for r in pipelined] == urls, "pipelined results must keep input order"
+    assert all("analysis" in r for r in sequential + pipelined)
+
+    print(f"\nVideos: {args.videos}, workers per stage: {args.workers}")
+    print(f"Sequential: {sequential_s:.2f}s ({sequential_s / args.videos:.2f}s/video)")
+    print(f"Pipelined:  {pipelined_s:.2f}s ({pipelined_s / args.videos:.2f}s/video)")
+    print(f"Speedup:    {sequential_s / pipelined_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Token-budgeted prompt context for the Gemini chat app.
+
+Sending the whole PDF plus every message on each turn makes latency and cost
+grow with the conversation until the request fails. ContextWindow keeps each
+prompt under a fixed token budget:
+
+- The most recent turns are sent verbatim.
+- Older turns are folded into a rolling summary. Summaries are computed on a
+  background thread, in batches, for turns that are about to leave the
+  verbatim window, so a turn never waits for one and the summary is usually
+  ready by the time the turns it covers no longer fit.
+- Only the top-k PDF chunks most relevant to the question are included,
+  not the whole document.
+
+Usage:
+  ctx = ContextWindow(summarize_fn)
+  ctx.set_document(pdf_text)
+  prompt = ctx.build_prompt(st.session_state.messages, query)
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from token_accounting import count_tokens
+
+# Shared by all sessions; summaries are short, infrequent requests
+_SUMMARY_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summary")
+
+WORD_RE = re.compile(r"\w+")
+
+DEFAULT_BUDGET = 6000
+DEFAULT_DOCUMENT_BUDGET = 3000
+DEFAULT_SUMMARY_BUDGET = 600
+DEFAULT_TOP_K = 4
+CHUNK_TOKENS = 400
+SUMMARY_BATCH = 4  # messages folded into the summary per background call
+
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a user and an assistant. "
+    "Keep facts, decisions, names, numbers and open questions; drop small talk. "
+    "Answer with the updated summary only, in at most {words} words.\n\n"
+    "Current summary:\n{summary}\n\nNew messages:\n{messages}"
+)
+
+
+def format_messages(messages: Sequence[Dict[str, str]]) -> str:
+    return "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in messages)
+
+
+def chunk_text(text: str, chunk_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """Split text into paragraph-aligned chunks of roughly chunk_tokens tokens."""
+    units: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) > chunk_tokens:
+            # PDF text often has no blank lines; fall back to line boundaries
+            units.extend(line for line in paragraph.splitlines() if line.strip())
+        else:
+            units.append(paragraph)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for paragraph in units:
+        tokens = count_tokens(paragraph)
+        if current and size + tokens > chunk_tokens:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+class ChunkIndex:
+    """
+    Relevance scoring over document chunks, built once per document.
+
+    Uses cosine similarity when chunk embeddings and a query embedder are
+    given, TF-IDF otherwise (or if embedding the query fails).
+    """
+
+    def __init__(
+        self,
+        chunks: Sequence[str],
+        embeddings: Optional[np.ndarray] = None,
+        embed_query: Optional[Callable[[str], Sequence[float]]] = None,
+    ):
+        self.chunks = list(chunks)
+        self.embed_query = embed_query
+        self.embeddings = None
+        if embeddings is not None and len(embeddings) == len(self.chunks):
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            self.embeddings = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        self.token_counts = [count_tokens(c) for c in self.chunks]
+        self._tf = [Counter(w.lower() for w in WORD_RE.findall(c)) for c in self.chunks]
+        df = Counter(term for tf in self._tf for term in tf)
+        n = len(self.chunks)
+        self._idf = {term: math.log(1 + n / count) for term, count in df.items()}
+
+    def scores(self, query: str) -> List[float]:
+        if self.embeddings is not None and self.embed_query is not None:
+            try:
+                q = np.asarray(self.embed_query(query), dtype=np.float32)
+                return (self.embeddings @ (q / max(float(np.linalg.norm(q)), 1e-12))).tolist()
+            except Exception as e:
+                print(f"Query embedding failed ({e}); using keyword scoring.")
+        terms = set(w.lower() for w in WORD_RE.findall(query))
+        return [
+            sum((1 + math.log(tf[t])) * self._idf[t] for t in terms if t in tf)
+            for tf in self._tf
+        ]
+
+    def top_k(self, query: str, k: int = DEFAULT_TOP_K, budget: int = DEFAULT_DOCUMENT_BUDGET) -> List[str]:
+        """Best k chunks that fit in budget tokens, returned in document order."""
+        if not self.chunks:
+            return []
+        scores = self.scores(query)
+        ranked = sorted(range(len(self.chunks)), key=lambda i: scores[i], reverse=True)
+        picked, used = [], 0
+        for i in ranked:
+            if len(picked) == k:
+                break
+            if used + self.token_counts[i] > budget:
+                continue
+            picked.append(i)
+            used += self.token_counts[i]
+        return [self.chunks[i] for i in sorted(picked)]
+
+
+class ContextWindow:
+    """
+    Builds bounded prompts from a growing conversation.
+
+    summarize_fn(summary, messages_text, max_words) -> str is called on a
+    background thread to fold older turns into the running summary.
+    Keep one instance per session (e.g. in st.session_state).
+    """
+
+    def __init__(
+        self,
+        summarize_fn: Callable[[str, str, int], str],
+        budget: int = DEFAULT_BUDGET,
+        document_budget: int = DEFAULT_DOCUMENT_BUDGET,
+        summary_budget: int = DEFAULT_SUMMARY_BUDGET,
+        top_k: int = DEFAULT_TOP_K,
+    ):
+        self.summarize_fn = summarize_fn
+        self.budget = budget
+        self.document_budget = document_budget
+        self.summary_budget = summary_budget
+        self.top_k = top_k
+        self.summary = ""
+        self.summarized_upto = 0  # messages[:summarized_upto] are in the summary
+        self.document: Optional[ChunkIndex] = None
+        self._document_key = None
+        self._pending: Optional[Future] = None
+        self._lock = threading.Lock()
+        self._tokens: Dict[int, int] = {}
+        self._seen = 0
+
+    def reset(self):
+        with self._lock:
+            self.summary = ""
+            self.summarized_upto = 0
+            self._pending = None
+            self._tokens.clear()
+            self._seen = 0
+
+    def set_document(self, text: Optional[str], key=None):
+        """Chunk and index a document (skipped if key/text is unchanged)."""
+        key = key if key is not None else text
+        if key == self._document_key:
+            return
+        self._document_key = key
+        self.document = ChunkIndex(chunk_text(text)) if text else None
+
+    def set_chunks(self, chunks: Sequence[str], key, embeddings=None, embed_query=None):
+        """Use pre-chunked (optionally embedded) document text; skipped if key is unchanged."""
+        if key == self._document_key:
+            return
+        self._document_key = key
+        self.document = ChunkIndex(chunks, embeddings, embed_query) if chunks else None
+
+    def _message_tokens(self, idx: int, message: Dict[str, str]) -> int:
+        if idx not in self._tokens:
+            self._tokens[idx] = count_tokens(message["content"]) + 4
+        return self._tokens[idx]
+
+    def history(self, messages: Sequence[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+        """
+        Messages to send for the history part of the prompt, within budget.
+
+        Returns [summary message] + newest messages that fit, oldest first.
+        """
+        if len(messages) < self._seen:
+            # Conversation was cleared or replaced
+            self.reset()
+        self._seen = len(messages)
+        with self._lock:
+            summary, covered = self.summary, self.summarized_upto
+
+        summary_tokens = count_tokens(summary) if summary else 0
+        remaining = budget - summary_tokens
+        # Turns older than the newest half of the budget get summarized ahead of need
+        horizon_budget = remaining // 2
+        start = horizon = len(messages)
+        while start > covered:
+            cost = self._message_tokens(start - 1, messages[start - 1])
+            if cost > remaining and start < len(messages):
+                break
+            remaining -= cost
+            start -= 1
+            if remaining >= horizon_budget:
+                horizon = start
+
+        if horizon - covered >= SUMMARY_BATCH or start > covered:
+            self._schedule_summary(messages, horizon)
+
+        selected = list(messages[start:])
+        if start > covered:
+            selected.insert(0, {"role": "note", "content": f"{start - covered} earlier messages omitted."})
+        if summary:
+            selected.insert(0, {"role": "summary", "content": summary})
+        return selected
+
+    def _schedule_summary(self, messages: Sequence[Dict[str, str]], upto: int):
+        """Fold messages[summarized_upto:upto] into the summary in the background."""
+        with self._lock:
+            if self._pending is not None or upto <= self.summarized_upto:
+                return
+            summary, start = self.summary, self.summarized_upto
+            batch = format_messages(messages[start:upto])
+            future = _SUMMARY_POOL.submit(
+                self.summarize_fn, summary, batch, max(50, int(self.summary_budget * 0.7))
+            )
+            self._pending = future
+
+        def done(f: Future):
+            with self._lock:
+                if self._pending is not f:
+                    return  # reset() while running
+                self._pending = None
+                try:
+                    text = (f.result() or "").strip()
+                except Exception as e:
+                    print(f"Background summary failed: {e}")
+                    return
+                if text:
+                    self.summary = text
+                    self.summarized_upto = upto
+
+        future.add_done_callback(done)
+
+    def document_context(self, query: str) -> List[str]:
+        if self.document is None:
+            return []
+        return self.document.top_k(query, self.top_k, self.document_budget)
+
+    def build_prompt(self, messages: Sequence[Dict[str, str]], query: str = "") -> str:
+        """Document excerpts relevant to query, then the budgeted history."""
+        query = query or (messages[-1]["content"] if messages else "")
+        excerpts = self.document_context(query)
+        used = sum(count_tokens(c) for c in excerpts)
+        parts = []
+        if excerpts:
+            parts.append("Relevant document excerpts:\n\n" + "\n\n---\n\n".join(excerpts))
+        parts.append(format_messages(self.history(messages, self.budget - used)))
+        return "\n\n".join(parts)
@@ -15,6 +15,7 @@ Usage:
 
 Optional:
   --extra "Focus on hooks and CTAs."
+  --workers 4   (videos analyzed concurrently; 1 streams output to stdout)
 """
 
 import os
@@ -26,6 +27,8 @@ from typing import Optional, List
 from google import genai
 from google.genai import types
 
+from video_batch_runner import DEFAULT_WORKERS, ProviderBackoff, run_bounded
+
 # -------------------------
 # Defaults
 # -------------------------
@@ -56,17 +59,24 @@ def _require_api_key() -> str:
 def _is_video_file(p: Path) -> bool:
     return p.is_file() and p.suffix.lower() in VIDEO_EXTS
 
-def _wait_for_active(client: genai.Client, file_name: str, max_attempts: int = 30, interval_sec: int = 5):
+def _wait_for_active(
+    client: genai.Client,
+    file_name: str,
+    max_attempts: int = 30,
+    interval_sec: int = 5,
+    backoff: Optional[ProviderBackoff] = None,
+):
     """Poll the file status until ACTIVE or raise on timeout/failure."""
+    backoff = backoff or ProviderBackoff()
     attempt = 1
     while attempt <= max_attempts:
-        info = client.files.get(name=file_name)
+        info = backoff.call(client.files.get, name=file_name)
         state = info.state
         if state == "ACTIVE":
-            print("File is ACTIVE. Proceeding...")
+            print(f"{file_name} is ACTIVE. Proceeding...")
             return info
         if state == "PROCESSING":
-            print(f"Attempt {attempt}/{max_attempts}: still PROCESSING – waiting {interval_sec}s...")
+            print(f"{file_name}: attempt {attempt}/{max_attempts}, still PROCESSING – waiting {interval_sec}s...")
             time.sleep(interval_sec)
             attempt += 1
             continue
@@ -93,17 +103,19 @@ def analyze_video_to_markdown(
     model: str,
     base_prompt: str,
     extra_input: Optional[str] = None,
-    stream_to_stdout: bool = True
+    stream_to_stdout: bool = True,
+    backoff: Optional[ProviderBackoff] = None,
 ) -> str:
     """
     Uploads a video, waits until ACTIVE, asks Gemini for Markdown,
     streams output, and returns the aggregated Markdown string.
     """
+    backoff = backoff or ProviderBackoff()
     print(f"\nUploading: {video_path.name}")
-    uploaded = client.files.upload(file=str(video_path))
+    uploaded = backoff.call(client.files.upload, file=str(video_path))
     print(f"Uploaded file name: {uploaded.name} (state={uploaded.state})")
 
-    file_info = _wait_for_active(client, uploaded.name)
+    file_info = _wait_for_active(client, uploaded.name, backoff=backoff)
 
     parts = [
         types.Part.from_uri(file_uri=file_info.uri, mime_type=file_info.mime_type),
@@ -122,16 +134,21 @@ def analyze_video_to_markdown(
     )
 
     print("Starting analysis (streaming Markdown)...")
-    chunks: List[str] = []
-    for chunk in client.models.generate_content_stream(
-        model=model,
-        contents=contents,
-        config=config,
-    ):
-        if chunk.text:
-            chunks.append(chunk.text)
-            if stream_to_stdout:
-                print(chunk.text, end="")
+
+    def _generate() -> List[str]:
+        chunks: List[str] = []
+        for chunk in client.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=config,
+        ):
+            if chunk.text:
+                chunks.append(chunk.text)
+                if stream_to_stdout:
+                    print(chunk.text, end="")
+        return chunks
+
+    chunks = backoff.call(_generate)
     print()  # newline
     return "".join(chunks)
 
@@ -142,38 +159,45 @@ def run_folder(
     folder: Path,
     creator: str,
     model: str = DEFAULT_MODEL,
-    extra_input: Optional[str] = None
+    extra_input: Optional[str] = None,
+    workers: int = DEFAULT_WORKERS,
 ):
     api_key = _require_api_key()
     client = genai.Client(api_key=api_key)
+    backoff = ProviderBackoff()
 
     videos = _list_videos(folder)
     outdir = _ensure_creator_outdir(creator)
 
-    print(f"Found {len(videos)} videos in {folder}")
+    print(f"Found {len(videos)} videos in {folder} (workers={workers})")
     print(f"Outputs will be written to: {outdir.resolve()}")
 
-    for idx, v in enumerate(videos, 1):
-        print(f"\n[{idx}/{len(videos)}] Processing {v.name} ...")
-        try:
-            md = analyze_video_to_markdown(
-                client=client,
-                video_path=v,
-                model=model,
-                base_prompt=BASE_ANALYSIS_PROMPT,
-                extra_input=extra_input,
-                stream_to_stdout=True,
-            )
-            # Write one .md per video
-            outfile = outdir / f"{v.stem}.md"
-            outfile.write_text(md, encoding="utf-8")
-            print(f"[OK] Wrote Markdown → {outfile.name}")
-        except Exception as e:
-            print(f"[ERROR] {v.name}: {e}")
-            # Continue to next file
-            continue
-        # Small delay to be gentle with the API
-        time.sleep(0.8)
+    def _analyze(v: Path) -> str:
+        return analyze_video_to_markdown(
+            client=client,
+            video_path=v,
+            model=model,
+            base_prompt=BASE_ANALYSIS_PROMPT,
+            extra_input=extra_input,
+            # Interleaved streams from several workers are unreadable
+            stream_to_stdout=workers == 1,
+            backoff=backoff,
+        )
+
+    done = 0
+
+    def _on_progress(idx: int, v: Path, md: Optional[str], error: Optional[BaseException]):
+        nonlocal done
+        done += 1
+        if error is not None:
+            print(f"[{done}/{len(videos)}] [ERROR] {v.name}: {error}")
+            return
+        # Write one .md per video
+        outfile = outdir / f"{v.stem}.md"
+        outfile.write_text(md, encoding="utf-8")
+        print(f"[{done}/{len(videos)}] [OK] Wrote Markdown → {outfile.name}")
+
+    run_bounded(videos, _analyze, workers=workers, on_progress=_on_progress)
 
 # -------------------------
 # CLI
@@ -184,6 +208,7 @@ def main():
     parser.add_argument("--creator", type=str, required=True, help="Creator handle/name used for output folder.")
     parser.add_argument("--model", type=str, default=DEFAULT_MODEL, help=f"Gemini model (default: {DEFAULT_MODEL})")
     parser.add_argument("--extra", type=str, default=None, help="Optional extra instruction appended to the prompt.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Videos analyzed concurrently (default: {DEFAULT_WORKERS})")
     args = parser.parse_args()
 
     folder = Path(args.folder)
@@ -194,7 +219,8 @@ def main():
         folder=folder,
         creator=args.creator,
         model=args.model,
-        extra_input=args.extra
+        extra_input=args.extra,
+        workers=args.workers,
     )
 
 if __name__ == "__main__":
@@ -3,6 +3,8 @@ Batch video analysis to CSV (Gemini).
 
 - Iterates over all videos in a given folder (one creator).
 - Uploads each video, waits until ACTIVE, and asks Gemini to return a single CSV row per video.
+- Appends each row to ./outputs/<creator>/<creator>_analysis_rows.jsonl as soon as it is ready
+  and skips videos (by content hash) already in that log, so interrupted runs resume cheaply.
 - Aggregates all rows into one CSV file saved at ./outputs/<creator>/<creator>_analysis.csv
 
 Usage:
@@ -14,6 +16,8 @@ Usage:
 
 Optional:
   --extra "Focus on hooks and CTAs."
+  --workers 4   (videos analyzed concurrently; 1 streams output to stdout)
+  --fresh       (ignore the results log and re-analyze everything)
 """
 
 import os
@@ -21,11 +25,14 @@ import time
 import argparse
 import csv
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from google import genai
 from google.genai import types
 
+from analysis_log import AnalysisLog, hash_files
+from video_batch_runner import DEFAULT_WORKERS, ProviderBackoff, run_bounded
+
 # -------------------------
 # Defaults
 # -------------------------
@@ -74,17 +81,24 @@ def _require_api_key() -> str:
 def _is_video_file(p: Path) -> bool:
     return p.is_file() and p.suffix.lower() in VIDEO_EXTS
 
-def _wait_for_active(client: genai.Client, file_name: str, max_attempts: int = 30, interval_sec: int = 5):
+def _wait_for_active(
+    client: genai.Client,
+    file_name: str,
+    max_attempts: int = 30,
+    interval_sec: int = 5,
+    backoff: Optional[ProviderBackoff] = None,
+):
     """Poll the file status until ACTIVE or raise on timeout/failure."""
+    backoff = backoff or ProviderBackoff()
     attempt = 1
     while attempt <= max_attempts:
-        info = client.files.get(name=file_name)
+        info = backoff.call(client.files.get, name=file_name)
         state = info.state
         if state == "ACTIVE":
-            print("File is ACTIVE. Proceeding...")
+            print(f"{file_name} is ACTIVE. Proceeding...")
             return info
         if state == "PROCESSING":
-            print(f"Attempt {attempt}/{max_attempts}: still PROCESSING – waiting {interval_sec}s...")
+            print(f"{file_name}: attempt {attempt}/{max_attempts}, still PROCESSING – waiting {interval_sec}s...")
             time.sleep(interval_sec)
             attempt += 1
             continue
@@ -112,16 +126,18 @@ def analyze_video_to_csv_row(
     base_prompt: str,
     extra_input: Optional[str] = None,
     stream_to_stdout: bool = True,
+    backoff: Optional[ProviderBackoff] = None,
 ) -> str:
     """
     Uploads a video, waits until ACTIVE, asks Gemini for ONE CSV row,
     optionally streams output, and returns the aggregated CSV line as a string.
     """
+    backoff = backoff or ProviderBackoff()
     print(f"\nUploading: {video_path.name}")
-    uploaded = client.files.upload(file=str(video_path))
+    uploaded = backoff.call(client.files.upload, file=str(video_path))
     print(f"Uploaded file name: {uploaded.name} (state={uploaded.state})")
 
-    file_info = _wait_for_active(client, uploaded.name)
+    file_info = _wait_for_active(client, uploaded.name, backoff=backoff)
 
     # Prepend video filename context to ensure the first column can be filled reliably
     video_context = f"The video filename is: {video_path.name}."
@@ -142,16 +158,21 @@ def analyze_video_to_csv_row(
     )
 
     print("Starting analysis (streaming CSV row)...")
-    chunks: List[str] = []
-    for chunk in client.models.generate_content_stream(
-        model=model,
-        contents=contents,
-        config=config,
-    ):
-        if chunk.text:
-            chunks.append(chunk.text)
-            if stream_to_stdout:
-                print(chunk.text, end="")
+
+    def _generate() -> List[str]:
+        chunks: List[str] = []
+        for chunk in client.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=config,
+        ):
+            if chunk.text:
+                chunks.append(chunk.text)
+                if stream_to_stdout:
+                    print(chunk.text, end="")
+        return chunks
+
+    chunks = backoff.call(_generate)
     print()  # newline
 
     # Combined CSV row text
@@ -176,16 +197,21 @@ def run_folder(
     folder: Path,
     creator: str,
     model: str = DEFAULT_MODEL,
-    extra_input: Optional[str] = None
+    extra_input: Optional[str] = None,
+    workers: int = DEFAULT_WORKERS,
+    fresh: bool = False,
 ):
     api_key = _require_api_key()
     client = genai.Client(api_key=api_key)
+    backoff = ProviderBackoff()
 
     videos = _list_videos(folder)
     outdir = _ensure_creator_outdir(creator)
 
-    print(f"Found {len(videos)} videos in {folder}")
+    print(f"Found {len(videos)} videos in {folder} (workers={workers})")
     csv_path = outdir / f"{creator}_analysis.csv"
+    log = AnalysisLog(outdir / f"{creator}_analysis_rows.jsonl")
+    print(f"Results log: {log.path.resolve()}")
     print(f"Aggregated CSV will be written to: {csv_path.resolve()}")
 
     # Prepare CSV header (we control this locally and ask the model to return only rows)
@@ -206,30 +232,58 @@ def run_folder(
         "views_if_visible",
     ]
 
-    # Create/overwrite and write header
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+    if fresh:
+        log.reset()
+    hashes = hash_files(videos, workers=workers)
+    done_rows = log.load()
+
+    # Skip videos already in the log (and duplicate files within the folder)
+    pending: List[Tuple[Path, str]] = []
+    queued = set(done_rows)
+    for v, h in zip(videos, hashes):
+        if h not in queued:
+            pending.append((v, h))
+            queued.add(h)
+    if len(pending) < len(videos):
+        print(f"Skipping {len(videos) - len(pending)} videos already analyzed")
+
+    def _analyze(job: Tuple[Path, str]) -> str:
+        return analyze_video_to_csv_row(
+            client=client,
+            video_path=job[0],
+            model=model,
+            base_prompt=BASE_ANALYSIS_PROMPT,
+            extra_input=extra_input,
+            # Interleaved streams from several workers are unreadable
+            stream_to_stdout=workers == 1,
+            backoff=backoff,
+        )
+
+    completed = 0
+
+    def _on_progress(idx: int, job: Tuple[Path, str], row_text: Optional[str], error: Optional[BaseException]):
+        nonlocal completed
+        completed += 1
+        v, h = job
+        if error is not None:
+            print(f"[{completed}/{len(pending)}] [ERROR] {v.name}: {error}")
+            return
+        # One fsync'd line per video: crash-safe and O(1) bytes per result
+        log.append(h, v.name, {"row": row_text})
+        print(f"[{completed}/{len(pending)}] [OK] Logged CSV row for → {v.name}")
+
+    run_bounded(pending, _analyze, workers=workers, on_progress=_on_progress)
+
+    # Rows in folder order, written to a temp file and renamed over the CSV
+    rows = [result["row"] for result in log.ordered_results(hashes)]
+    tmp_path = csv_path.with_name(csv_path.name + ".tmp")
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerow(header)
-
-    for idx, v in enumerate(videos, 1):
-        print(f"\n[{idx}/{len(videos)}] Processing {v.name} ...")
-        try:
-            row_text = analyze_video_to_csv_row(
-                client=client,
-                video_path=v,
-                model=model,
-                base_prompt=BASE_ANALYSIS_PROMPT,
-                extra_input=extra_input,
-                stream_to_stdout=True,
-            )
-            # Append the row to the CSV file
-            with open(csv_path, "a", newline="", encoding="utf-8") as f:
-                f.write(row_text + "\n")
-            print(f"[OK] Appended CSV row for → {v.name}")
-        except Exception as e:
-            print(f"[ERROR] {v.name}: {e}")
-            continue
-        time.sleep(0.8)
+        for row_text in rows:
+            f.write(row_text + "\n")
+    os.replace(tmp_path, csv_path)
+    print(f"Wrote {len(rows)}/{len(videos)} rows to {csv_path.name}")
 
 # -------------------------
 # CLI
@@ -240,6 +294,8 @@ def main():
     parser.add_argument("--creator", type=str, required=True, help="Creator handle/name used for output folder.")
     parser.add_argument("--model", type=str, default=DEFAULT_MODEL, help=f"Gemini model (default: {DEFAULT_MODEL})")
     parser.add_argument("--extra", type=str, default=None, help="Optional extra instruction appended to the prompt.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Videos analyzed concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the results log and re-analyze every video.")
     args = parser.parse_args()
 
     folder = Path(args.folder)
@@ -250,7 +306,9 @@ def main():
         folder=folder,
         creator=args.creator,
         model=args.model,
-        extra_input=args.extra
+        extra_input=args.extra,
+        workers=args.workers,
+        fresh=args.fresh,
     )
 
 if __name__ == "__main__":
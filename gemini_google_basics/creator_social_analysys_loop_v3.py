@@ -3,7 +3,9 @@ Batch video analysis to JSON (Gemini).
 
 - Iterates over all videos in a given folder (one creator).
 - Uploads each video, waits until ACTIVE, and asks Gemini to return a single JSON object per video.
-- Aggregates all objects into one JSON array saved at ./outputs/<creator>/<creator>_analysis.json
+- Appends each object to ./outputs/<creator>/<creator>_analysis.jsonl as soon as it is ready
+  and skips videos (by content hash) already in that log, so interrupted runs resume cheaply.
+- Compacts the log into one JSON array saved at ./outputs/<creator>/<creator>_analysis.json
 
 Usage:
   export GEMINI_API_KEY=your_key
@@ -14,6 +16,9 @@ Usage:
 
 Optional:
   --extra "Focus on hooks and CTAs."
+  --workers 4   (videos analyzed concurrently; 1 streams output to stdout)
+  --fresh       (ignore the results log and re-analyze everything)
+  --transcode analysis   (downsample with ffmpeg before upload; cached by source hash)
 """
 
 import os
@@ -22,11 +27,15 @@ import argparse
 import json
 import re
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from google import genai
 from google.genai import types
 
+from analysis_log import AnalysisLog, hash_files
+from video_batch_runner import DEFAULT_WORKERS, ProviderBackoff, run_bounded
+from video_transcode import PROFILES, VideoTranscoder
+
 # -------------------------
 # Defaults
 # -------------------------
@@ -75,17 +84,24 @@ def _require_api_key() -> str:
 def _is_video_file(p: Path) -> bool:
     return p.is_file() and p.suffix.lower() in VIDEO_EXTS
 
-def _wait_for_active(client: genai.Client, file_name: str, max_attempts: int = 30, interval_sec: int = 5):
+def _wait_for_active(
+    client: genai.Client,
+    file_name: str,
+    max_attempts: int = 30,
+    interval_sec: int = 5,
+    backoff: Optional[ProviderBackoff] = None,
+):
     """Poll the file status until ACTIVE or raise on timeout/failure."""
+    backoff = backoff or ProviderBackoff()
     attempt = 1
     while attempt <= max_attempts:
-        info = client.files.get(name=file_name)
+        info = backoff.call(client.files.get, name=file_name)
         state = info.state
         if state == "ACTIVE":
-            print("File is ACTIVE. Proceeding...")
+            print(f"{file_name} is ACTIVE. Proceeding...")
             return info
         if state == "PROCESSING":
-            print(f"Attempt {attempt}/{max_attempts}: still PROCESSING – waiting {interval_sec}s...")
+            print(f"{file_name}: attempt {attempt}/{max_attempts}, still PROCESSING – waiting {interval_sec}s...")
             time.sleep(interval_sec)
             attempt += 1
             continue
@@ -113,16 +129,21 @@ def analyze_video_to_json(
     base_prompt: str,
     extra_input: Optional[str] = None,
     stream_to_stdout: bool = True,
+    backoff: Optional[ProviderBackoff] = None,
+    transcoder: Optional[VideoTranscoder] = None,
+    source_hash: Optional[str] = None,
 ) -> dict:
     """
-    Uploads a video, waits until ACTIVE, asks Gemini for ONE JSON object,
-    optionally streams output, and returns it parsed as a Python dict.
+    Uploads a video (optionally downsampled by `transcoder` first), waits until ACTIVE,
+    asks Gemini for ONE JSON object, optionally streams output, and returns it parsed as a Python dict.
     """
+    backoff = backoff or ProviderBackoff()
+    upload_path = transcoder.prepare(video_path, source_hash=source_hash) if transcoder else video_path
     print(f"\nUploading: {video_path.name}")
-    uploaded = client.files.upload(file=str(video_path))
+    uploaded = backoff.call(client.files.upload, file=str(upload_path))
     print(f"Uploaded file name: {uploaded.name} (state={uploaded.state})")
 
-    file_info = _wait_for_active(client, uploaded.name)
+    file_info = _wait_for_active(client, uploaded.name, backoff=backoff)
 
     # Prepend video filename context to ensure the first column can be filled reliably
     video_context = f"The video filename is: {video_path.name}."
@@ -143,16 +164,21 @@ def analyze_video_to_json(
     )
 
     print("Starting analysis (streaming JSON)...")
-    chunks: List[str] = []
-    for chunk in client.models.generate_content_stream(
-        model=model,
-        contents=contents,
-        config=config,
-    ):
-        if chunk.text:
-            chunks.append(chunk.text)
-            if stream_to_stdout:
-                print(chunk.text, end="")
+
+    def _generate() -> List[str]:
+        chunks: List[str] = []
+        for chunk in client.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=config,
+        ):
+            if chunk.text:
+                chunks.append(chunk.text)
+                if stream_to_stdout:
+                    print(chunk.text, end="")
+        return chunks
+
+    chunks = backoff.call(_generate)
     print()  # newline
 
     # Combine and sanitize
@@ -189,40 +215,76 @@ def run_folder(
     folder: Path,
     creator: str,
     model: str = DEFAULT_MODEL,
-    extra_input: Optional[str] = None
+    extra_input: Optional[str] = None,
+    workers: int = DEFAULT_WORKERS,
+    fresh: bool = False,
+    transcode: Optional[str] = None,
 ):
     api_key = _require_api_key()
     client = genai.Client(api_key=api_key)
+    backoff = ProviderBackoff()
 
     videos = _list_videos(folder)
     outdir = _ensure_creator_outdir(creator)
 
-    print(f"Found {len(videos)} videos in {folder}")
+    print(f"Found {len(videos)} videos in {folder} (workers={workers})")
     json_path = outdir / f"{creator}_analysis.json"
+    log = AnalysisLog(outdir / f"{creator}_analysis.jsonl")
+    print(f"Results log: {log.path.resolve()}")
     print(f"Aggregated JSON will be written to: {json_path.resolve()}")
 
-    results: List[dict] = []
-
-    for idx, v in enumerate(videos, 1):
-        print(f"\n[{idx}/{len(videos)}] Processing {v.name} ...")
-        try:
-            obj = analyze_video_to_json(
-                client=client,
-                video_path=v,
-                model=model,
-                base_prompt=BASE_ANALYSIS_PROMPT,
-                extra_input=extra_input,
-                stream_to_stdout=True,
-            )
-            results.append(obj)
-            # Write the array incrementally (safe on long runs)
-            with open(json_path, "w", encoding="utf-8") as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
-            print(f"[OK] Appended JSON object for → {v.name}")
-        except Exception as e:
-            print(f"[ERROR] {v.name}: {e}")
-            continue
-        time.sleep(0.8)
+    if fresh:
+        log.reset()
+    hashes = hash_files(videos, workers=workers)
+    done = log.load()
+
+    # Skip videos already in the log (and duplicate files within the folder)
+    pending: List[Tuple[Path, str]] = []
+    queued = set(done)
+    for v, h in zip(videos, hashes):
+        if h not in queued:
+            pending.append((v, h))
+            queued.add(h)
+    if len(pending) < len(videos):
+        print(f"Skipping {len(videos) - len(pending)} videos already analyzed")
+
+    transcoder = VideoTranscoder(transcode, workers=workers) if transcode else None
+
+    def _analyze(job: Tuple[Path, str]) -> dict:
+        return analyze_video_to_json(
+            client=client,
+            video_path=job[0],
+            model=model,
+            base_prompt=BASE_ANALYSIS_PROMPT,
+            extra_input=extra_input,
+            # Interleaved streams from several workers are unreadable
+            stream_to_stdout=workers == 1,
+            backoff=backoff,
+            transcoder=transcoder,
+            source_hash=job[1],
+        )
+
+    completed = 0
+
+    def _on_progress(idx: int, job: Tuple[Path, str], obj: Optional[dict], error: Optional[BaseException]):
+        nonlocal completed
+        completed += 1
+        v, h = job
+        if error is not None:
+            print(f"[{completed}/{len(pending)}] [ERROR] {v.name}: {error}")
+            return
+        # One fsync'd line per video: crash-safe and O(1) bytes per result
+        log.append(h, v.name, obj)
+        print(f"[{completed}/{len(pending)}] [OK] Logged JSON object for → {v.name}")
+
+    try:
+        run_bounded(pending, _analyze, workers=workers, on_progress=_on_progress)
+    finally:
+        if transcoder:
+            transcoder.close()
+
+    count = log.finalize(json_path, hashes)
+    print(f"Wrote {count}/{len(videos)} objects to {json_path.name}")
 
 # -------------------------
 # CLI
@@ -233,6 +295,10 @@ def main():
     parser.add_argument("--creator", type=str, required=True, help="Creator handle/name used for output folder.")
     parser.add_argument("--model", type=str, default=DEFAULT_MODEL, help=f"Gemini model (default: {DEFAULT_MODEL})")
     parser.add_argument("--extra", type=str, default=None, help="Optional extra instruction appended to the prompt.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Videos analyzed concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--fresh", action="store_true", help="Ignore the results log and re-analyze every video.")
+    parser.add_argument("--transcode", choices=sorted(PROFILES), default=None,
+                        help="Downsample videos locally with ffmpeg to this profile before upload.")
     args = parser.parse_args()
 
     folder = Path(args.folder)
@@ -243,7 +309,10 @@ def main():
         folder=folder,
         creator=args.creator,
         model=args.model,
-        extra_input=args.extra
+        extra_input=args.extra,
+        workers=args.workers,
+        fresh=args.fresh,
+        transcode=args.transcode,
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,294 @@
+"""
+Recursive Google Drive folder sync with concurrent download and transcription.
+
+- Walks a folder tree through the Drive v3 REST API (1000 items per page).
+- Keeps a local JSON manifest of file id → modifiedTime / md5Checksum, so
+  files that did not change since the last run are skipped.
+- Downloads stream to <name>.part in ranged chunks; an interrupted download
+  resumes from the bytes already on disk.
+- Finished downloads feed a bounded transcription pool, so transcription of
+  early files overlaps with downloading the rest.
+
+The HTTP session is injected: pass google.auth.transport.requests.AuthorizedSession
+for real Drive, or a plain requests.Session plus base_url for a local fake.
+
+Usage:
+  client = DriveClient(AuthorizedSession(creds))
+  report = DriveSync(client, Path("drive_mirror"), transcribe_fn).sync(folder_id)
+"""
+
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+FOLDER_MIME = "application/vnd.google-apps.folder"
+GOOGLE_APPS_PREFIX = "application/vnd.google-apps."  # Docs/Sheets/...: no binary content
+TRANSCRIBABLE_PREFIXES = ("audio/", "video/")
+LIST_FIELDS = "nextPageToken, files(id, name, mimeType, modifiedTime, md5Checksum, size)"
+DOWNLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+MANIFEST_SAVE_EVERY = 25
+
+UNSAFE_NAME_RE = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+class DriveClient:
+    """Minimal Drive v3 REST client over an (authorized) requests-style session."""
+
+    def __init__(self, session, base_url: str = "https://www.googleapis.com", page_size: int = 1000):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.page_size = page_size
+
+    def list_children(self, folder_id: str) -> Iterator[dict]:
+        """Every non-trashed child of folder_id, following nextPageToken."""
+        params = {
+            "q": f"'{folder_id}' in parents and trashed=false",
+            "fields": LIST_FIELDS,
+            "pageSize": self.page_size,
+            "supportsAllDrives": "true",
+            "includeItemsFromAllDrives": "true",
+        }
+        while True:
+            response = self.session.get(f"{self.base_url}/drive/v3/files", params=params, timeout=60)
+            response.raise_for_status()
+            payload = response.json()
+            yield from payload.get("files", [])
+            token = payload.get("nextPageToken")
+            if not token:
+                return
+            params["pageToken"] = token
+
+    def download(
+        self,
+        file_id: str,
+        dest: Path,
+        size: Optional[int] = None,
+        version: str = "",
+        chunk_size: int = DOWNLOAD_CHUNK_BYTES,
+    ):
+        """
+        Download file content to dest in ranged chunks.
+
+        Bytes go to dest + ".part" first; if that file exists from an earlier,
+        interrupted run of the same version (md5/modifiedTime), the download
+        continues where it stopped.
+        """
+        dest = Path(dest)
+        part = dest.with_name(dest.name + ".part")
+        marker = dest.with_name(dest.name + ".part.version")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if part.exists() and (not marker.exists() or marker.read_text() != version):
+            part.unlink()  # leftover from another version of the file
+        marker.write_text(version)
+        offset = part.stat().st_size if part.exists() else 0
+        url = f"{self.base_url}/drive/v3/files/{file_id}"
+        params = {"alt": "media", "supportsAllDrives": "true"}
+
+        with open(part, "ab") as f:
+            while size is None or offset < size:
+                headers = {"Range": f"bytes={offset}-{offset + chunk_size - 1}"}
+                response = self.session.get(url, params=params, headers=headers, stream=True, timeout=120)
+                if response.status_code == 416:  # offset already at the end
+                    break
+                response.raise_for_status()
+                if response.status_code == 200 and offset:
+                    # Server ignored Range; start over
+                    f.seek(0)
+                    f.truncate()
+                    offset = 0
+                for block in response.iter_content(chunk_size=1024 * 1024):
+                    f.write(block)
+                    offset += len(block)
+                total = _content_range_total(response.headers.get("Content-Range"))
+                if total is not None:
+                    size = total
+                if response.status_code == 200 or size is None:
+                    break
+        os.replace(part, dest)
+        marker.unlink()
+
+
+def _content_range_total(header: Optional[str]) -> Optional[int]:
+    # "bytes 0-8388607/52428800"
+    if not header or "/" not in header:
+        return None
+    total = header.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+class Manifest:
+    """
+    file id → {path, modifiedTime, md5Checksum, status}; saved atomically as JSON.
+
+    status is "downloaded" (content on disk) or "done" (transcribed, or
+    nothing to transcribe). Audio/video synced without a transcriber stays
+    "downloaded", so a later run with one transcribes it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = 0
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def is_current(self, item: dict, want_status: str) -> bool:
+        """True if the file is unchanged since it last reached want_status."""
+        entry = self.entries.get(item["id"])
+        accepted = ("downloaded", "done") if want_status == "downloaded" else ("done",)
+        if not entry or entry.get("status") not in accepted:
+            return False
+        if item.get("md5Checksum") and entry.get("md5Checksum"):
+            return item["md5Checksum"] == entry["md5Checksum"]
+        return item.get("modifiedTime") == entry.get("modifiedTime")
+
+    def update(self, item: dict, path: Path, status: str):
+        with self._lock:
+            self.entries[item["id"]] = {
+                "name": item.get("name"),
+                "path": str(path),
+                "modifiedTime": item.get("modifiedTime"),
+                "md5Checksum": item.get("md5Checksum"),
+                "status": status,
+            }
+            self._dirty += 1
+            if self._dirty >= MANIFEST_SAVE_EVERY:
+                self._save_locked()
+
+    def save(self):
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp, self.path)
+        self._dirty = 0
+
+
+@dataclass
+class SyncReport:
+    listed: int = 0
+    skipped: int = 0
+    downloaded: int = 0
+    transcribed: int = 0
+    failed: List[str] = field(default_factory=list)
+
+
+class DriveSync:
+    """
+    Mirror a Drive folder tree into dest_dir and transcribe audio/video files.
+
+    transcribe_fn(path) -> str is optional; its output is written next to
+    the file as <name>.txt.
+    """
+
+    def __init__(
+        self,
+        client: DriveClient,
+        dest_dir: Path,
+        transcribe_fn: Optional[Callable[[Path], str]] = None,
+        download_workers: int = 6,
+        transcribe_workers: int = 2,
+        manifest_path: Optional[Path] = None,
+    ):
+        self.client = client
+        self.dest_dir = Path(dest_dir)
+        self.transcribe_fn = transcribe_fn
+        self.download_workers = download_workers
+        self.transcribe_workers = transcribe_workers
+        self.manifest = Manifest(manifest_path or self.dest_dir / ".drive_manifest.json")
+        self._report_lock = threading.Lock()
+
+    def walk(self, folder_id: str) -> Iterator[tuple]:
+        """(item, relative Path) for every file under folder_id, depth-first."""
+        stack = [(folder_id, Path())]
+        while stack:
+            current, rel = stack.pop()
+            for item in self.client.list_children(current):
+                name = UNSAFE_NAME_RE.sub("_", item.get("name") or item["id"])
+                if item.get("mimeType") == FOLDER_MIME:
+                    stack.append((item["id"], rel / name))
+                elif not item.get("mimeType", "").startswith(GOOGLE_APPS_PREFIX):
+                    yield item, rel / name
+
+    @staticmethod
+    def _is_transcribable(item: dict) -> bool:
+        return item.get("mimeType", "").startswith(TRANSCRIBABLE_PREFIXES)
+
+    def _wants_transcript(self, item: dict) -> bool:
+        return self.transcribe_fn is not None and self._is_transcribable(item)
+
+    def sync(self, folder_id: str) -> SyncReport:
+        report = SyncReport()
+        # Bounded hand-off: downloaders block instead of piling up finished files
+        transcribe_slots = threading.BoundedSemaphore(self.transcribe_workers * 2)
+        transcribe_pool = ThreadPoolExecutor(max_workers=max(1, self.transcribe_workers), thread_name_prefix="transcribe")
+        download_pool = ThreadPoolExecutor(max_workers=max(1, self.download_workers), thread_name_prefix="download")
+
+        def record(**counts):
+            with self._report_lock:
+                for key, value in counts.items():
+                    if key == "failed":
+                        report.failed.append(value)
+                    else:
+                        setattr(report, key, getattr(report, key) + value)
+
+        def transcribe(item: dict, path: Path):
+            try:
+                text = self.transcribe_fn(path)
+                if not text:
+                    raise RuntimeError("empty transcript")
+                path.with_name(path.name + ".txt").write_text(text, encoding="utf-8")
+                self.manifest.update(item, path, "done")
+                record(transcribed=1)
+            except Exception as e:
+                record(failed=f"{path} (transcribe: {e})")
+            finally:
+                transcribe_slots.release()
+
+        def download(item: dict, path: Path, needs_download: bool):
+            try:
+                if needs_download:
+                    size = int(item["size"]) if item.get("size") else None
+                    version = item.get("md5Checksum") or item.get("modifiedTime") or ""
+                    self.client.download(item["id"], path, size=size, version=version)
+                    self.manifest.update(item, path, "downloaded")
+                    record(downloaded=1)
+            except Exception as e:
+                record(failed=f"{path} (download: {e})")
+                return
+            if self._wants_transcript(item):
+                transcribe_slots.acquire()
+                transcribe_pool.submit(transcribe, item, path)
+            elif not self._is_transcribable(item):
+                self.manifest.update(item, path, "done")
+
+        try:
+            for item, rel in self.walk(folder_id):
+                report.listed += 1
+                path = self.dest_dir / rel
+                # Without a transcriber, audio/video is finished once downloaded
+                target = "downloaded" if self._is_transcribable(item) and self.transcribe_fn is None else "done"
+                # A missing transcript also covers manifests that marked such files "done" without one
+                transcript_missing = self._wants_transcript(item) and not path.with_name(path.name + ".txt").exists()
+                if self.manifest.is_current(item, target) and path.exists() and not transcript_missing:
+                    report.skipped += 1
+                    continue
+                # Downloaded but not yet transcribed (e.g. transcription failed last time)
+                needs_download = not (self.manifest.is_current(item, "downloaded") and path.exists())
+                download_pool.submit(download, item, path, needs_download)
+        finally:
+            download_pool.shutdown(wait=True)
+            transcribe_pool.shutdown(wait=True)
+            self.manifest.save()
+        return report
@@ -3,13 +3,15 @@ import google.generativeai as genai
 from dotenv import load_dotenv
 import os
 import time
-from PyPDF2 import PdfReader
-from io import BytesIO
 import json
-import tiktoken
 from streamlit_float import *
 from datetime import datetime
 
+from auto_refresh import auto_refresh_sidebar
+from context_window import SUMMARY_PROMPT, ContextWindow, format_messages
+from pdf_ingest import ingest_pdf
+from token_accounting import add_message, clear_messages, init_token_state, tokens_by_role, total_tokens
+
 # Load environment variables
 load_dotenv()
 
@@ -30,6 +32,15 @@ def get_llminfo():
     maxtokens = st.sidebar.slider("Maximum Tokens:", min_value=100, max_value=8194, value=2000, step=100)
     return model, temp, topp, maxtokens
 
+def summarize_conversation(summary, messages_text, max_words):
+    # Runs on a background thread; always uses the fast model
+    summary_model = genai.GenerativeModel(model_name="gemini-1.5-flash")
+    response = summary_model.generate_content(
+        SUMMARY_PROMPT.format(words=max_words, summary=summary or "(empty)", messages=messages_text),
+        generation_config={"temperature": 0.2, "max_output_tokens": max_words * 2},
+    )
+    return response.text
+
 def process_text(user_input, gemini_model, temperature, top_p, max_tokens):
     try:
         response = gemini_model.generate_content(
@@ -73,13 +84,22 @@ def process_image(image_file, prompt, gemini_model, temperature, top_p, max_toke
             os.remove(image_file.name)
         return None
 
+EMBED_MODEL = "models/text-embedding-004"
+
+def embed_documents(texts):
+    vectors = []
+    for start in range(0, len(texts), 100):
+        result = genai.embed_content(model=EMBED_MODEL, content=texts[start:start + 100], task_type="retrieval_document")
+        vectors.extend(result["embedding"])
+    return vectors
+
+def embed_query(text):
+    return genai.embed_content(model=EMBED_MODEL, content=text, task_type="retrieval_query")["embedding"]
+
 def process_pdf(pdf_file):
+    # Parsed, chunked and embedded once per file (cached by content hash)
     try:
-        pdf_reader = PdfReader(BytesIO(pdf_file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text
+        return ingest_pdf(pdf_file.getvalue(), embed_fn=embed_documents, embed_model=EMBED_MODEL)
     except Exception as e:
         st.error(f"An error occurred while processing the PDF: {str(e)}")
         return None
@@ -88,10 +108,8 @@ def process_image_with_context(image_file, prompt, conversation_history, gemini_
     try:
         image_data = image_file.getvalue()
         
-        # Construct a context-aware prompt
-        context_prompt = "Previous conversation:\n"
-        for message in conversation_history:
-            context_prompt += f"{message['role'].capitalize()}: {message['content']}\n"
+        # Construct a context-aware prompt (conversation_history is already token-budgeted)
+        context_prompt = f"Previous conversation:\n{format_messages(conversation_history)}\n"
         context_prompt += f"\nNew image uploaded. {prompt}"
         
         response = gemini_model.generate_content(
@@ -110,9 +128,7 @@ def process_image_with_context(image_file, prompt, conversation_history, gemini_
 
 def process_text_with_image_context(user_input, image_data, conversation_history, gemini_model, temperature, top_p, max_tokens):
     try:
-        context_prompt = "Previous conversation:\n"
-        for message in conversation_history:
-            context_prompt += f"{message['role'].capitalize()}: {message['content']}\n"
+        context_prompt = f"Previous conversation:\n{format_messages(conversation_history)}\n"
         context_prompt += f"\nUser: {user_input}"
         
         response = gemini_model.generate_content(
@@ -155,12 +171,14 @@ def main():
 
     gemini_model = genai.GenerativeModel(model_name=model)
 
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-    if "pdf_content" not in st.session_state:
-        st.session_state.pdf_content = None
+    init_token_state(st.session_state, model)
+    if "pdf_document" not in st.session_state:
+        st.session_state.pdf_document = None
     if "chat_started" not in st.session_state:
         st.session_state.chat_started = False
+    if "context_window" not in st.session_state:
+        st.session_state.context_window = ContextWindow(summarize_conversation)
+    context_window = st.session_state.context_window
 
     input_type = st.radio("Choose input type:", ("Text", "Image", "PDF"))
 
@@ -172,8 +190,8 @@ def main():
                 if response and response.parts:
                     st.markdown("### Response:")
                     st.markdown(response.text)
-                    st.session_state.messages.append({"role": "user", "content": user_input})
-                    st.session_state.messages.append({"role": "assistant", "content": response.text})
+                    add_message(st.session_state, "user", user_input)
+                    add_message(st.session_state, "assistant", response.text)
                     st.session_state.chat_started = True
                 elif response:
                     st.warning("Content generation was blocked or no valid content was generated.")
@@ -189,8 +207,8 @@ def main():
                 if response and response.parts:
                     st.markdown("### Response:")
                     st.markdown(response.text)
-                    st.session_state.messages.append({"role": "user", "content": f"[Image uploaded] {prompt}"})
-                    st.session_state.messages.append({"role": "assistant", "content": response.text})
+                    add_message(st.session_state, "user", f"[Image uploaded] {prompt}")
+                    add_message(st.session_state, "assistant", response.text)
                     st.session_state.chat_started = True
                 elif response:
                     st.warning("Content generation was blocked or no valid content was generated.")
@@ -200,20 +218,27 @@ def main():
     elif input_type == "PDF":
         uploaded_file = st.file_uploader("Choose a PDF file", type=["pdf"])
         if uploaded_file is not None:
-            pdf_content = process_pdf(uploaded_file)
-            if pdf_content:
-                st.success("PDF processed successfully!")
-                st.session_state.pdf_content = pdf_content
+            pdf_document = process_pdf(uploaded_file)
+            if pdf_document:
+                st.success(f"PDF processed successfully! ({len(pdf_document.pages)} pages)")
+                st.session_state.pdf_document = pdf_document
+                context_window.set_chunks(
+                    pdf_document.chunks, pdf_document.sha256, pdf_document.embeddings, embed_query
+                )
                 query = st.text_area("Enter your query about the PDF:")
                 if st.button("Submit Query"):
                     if query:
-                        full_prompt = f"{pdf_content}\n\nUser: {query}"
+                        # The query joins the chat below, so build it on the session's history: a
+                        # one-message list would look like a cleared chat and reset the summary
+                        full_prompt = context_window.build_prompt(
+                            st.session_state.messages + [{"role": "user", "content": query}], query
+                        )
                         response = process_text(full_prompt, gemini_model, temperature, top_p, max_tokens)
                         if response and response.parts:
                             st.markdown("### Initial Response:")
                             st.markdown(response.text)
-                            st.session_state.messages.append({"role": "user", "content": query})
-                            st.session_state.messages.append({"role": "assistant", "content": response.text})
+                            add_message(st.session_state, "user", query)
+                            add_message(st.session_state, "assistant", response.text)
                             st.session_state.chat_started = True
                         else:
                             st.warning("No valid response generated.")
@@ -232,7 +257,7 @@ def main():
 
         user_input = st.chat_input("Ask a follow-up question:")
         if user_input:
-            st.session_state.messages.append({"role": "user", "content": user_input})
+            add_message(st.session_state, "user", user_input)
             with st.chat_message("user"):
                 st.markdown(user_input)
 
@@ -241,20 +266,19 @@ def main():
                 response = process_text_with_image_context(
                     user_input,
                     st.session_state.current_image,
-                    st.session_state.messages,
+                    context_window.history(st.session_state.messages, context_window.budget),
                     gemini_model,
                     temperature,
                     top_p,
                     max_tokens
                 )
             else:
-                # Process without image context
-                full_prompt = f"{st.session_state.pdf_content}\n\n" if st.session_state.pdf_content else ""
-                full_prompt += "\n".join([f"{m['role'].capitalize()}: {m['content']}" for m in st.session_state.messages])
+                # Process without image context; relevant PDF chunks + budgeted history
+                full_prompt = context_window.build_prompt(st.session_state.messages, user_input)
                 response = process_text(full_prompt, gemini_model, temperature, top_p, max_tokens)
 
             if response and response.parts:
-                st.session_state.messages.append({"role": "assistant", "content": response.text})
+                add_message(st.session_state, "assistant", response.text)
                 with st.chat_message("assistant"):
                     st.markdown(response.text)
             else:
@@ -284,16 +308,17 @@ def main():
             )
 
         with col2:
-            enc = tiktoken.get_encoding("cl100k_base")
-            tokenized_full_text = enc.encode(" ".join([item["content"] for item in st.session_state.messages]))
-            label = f"💬 {len(tokenized_full_text)} tokens"
-            st.link_button(label, "https://platform.openai.com/tokenizer")
+            label = f"💬 {total_tokens(st.session_state)} tokens"
+            by_role = ", ".join(f"{role}: {n}" for role, n in tokens_by_role(st.session_state).items())
+            st.link_button(label, "https://platform.openai.com/tokenizer", help=by_role)
 
         with col3:
             if st.button("🧹 Clear Chat"):
-                st.session_state.messages = []
-                st.session_state.pdf_content = None
+                clear_messages(st.session_state)
+                st.session_state.pdf_document = None
                 st.session_state.chat_started = False
+                context_window.reset()
+                context_window.set_document(None)
                 st.rerun()
 
         with col4:
@@ -309,15 +334,15 @@ def main():
                 image_response = process_image_with_context(
                     uploaded_file, 
                     prompt,
-                    st.session_state.messages,
+                    context_window.history(st.session_state.messages, context_window.budget),
                     gemini_model, 
                     temperature, 
                     top_p, 
                     max_tokens
                 )
                 if image_response and image_response.parts:
-                    st.session_state.messages.append({"role": "user", "content": f"[Image uploaded] {prompt}"})
-                    st.session_state.messages.append({"role": "assistant", "content": image_response.text})
+                    add_message(st.session_state, "user", f"[Image uploaded] {prompt}")
+                    add_message(st.session_state, "assistant", image_response.text)
                     with st.chat_message("assistant"):
                         st.markdown(image_response.text)
                     st.success("Image processed and added to the conversation.")
@@ -329,15 +354,10 @@ def main():
             else:
                 st.warning("Please enter a prompt for the image.")
 
-    # Auto-refresh feature
-    auto_refresh = st.sidebar.checkbox("Enable auto-refresh")
-    if auto_refresh:
-        refresh_interval = st.sidebar.slider("Refresh interval (seconds)", 5, 60, 30)
-        timer_placeholder = st.sidebar.empty()
-        for remaining in range(refresh_interval, 0, -1):
-            timer_placeholder.text(f"Refreshing in {remaining} seconds...")
-            time.sleep(1)
-        st.rerun()
+    # Auto-refresh feature: a timer-driven fragment, so only the status panel reruns
+    auto_refresh_sidebar(
+        lambda: st.caption(f"{len(st.session_state.messages)} messages · {total_tokens(st.session_state)} tokens")
+    )
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -4,18 +4,28 @@
 import base64
 import os
 import time
+from pathlib import Path
+from typing import Optional
 from google import genai
 from google.genai import types
 
-def generate():
+from video_transcode import VideoTranscoder
+
+def generate(video_path: str = "rflkt-2348972.mp4", transcode_profile: Optional[str] = None):
     client = genai.Client(
         api_key=os.environ.get("GEMINI_API_KEY"),
     )
 
+    # Optionally downsample locally first (Gemini only samples ~1 fps anyway)
+    upload_path = Path(video_path)
+    if transcode_profile:
+        with VideoTranscoder(transcode_profile) as transcoder:
+            upload_path = transcoder.prepare(upload_path)
+
     # Upload the video file
     print("Uploading video file...")
     files = [
-        client.files.upload(file="rflkt-2348972.mp4"),
+        client.files.upload(file=str(upload_path)),
     ]
     
     # Check the file's state and wait until it's ACTIVE
@@ -134,4 +144,5 @@ Ensure the response starts and ends strictly with the JSON object. No introducto
         print(chunk.text, end="")
 
 if __name__ == "__main__":
-    generate()
\ No newline at end of file
+    # e.g. GEMINI_TRANSCODE_PROFILE=analysis python gemini_video_analysis.py
+    generate(transcode_profile=os.environ.get("GEMINI_TRANSCODE_PROFILE"))
\ No newline at end of file
@@ -1,99 +1,25 @@
 # To run this code you need to install the following dependencies:
 # pip install google-genai
 
-import base64
 import os
 import time
 import requests
-import io
+import queue
 import tempfile
+import threading
 import json # Added for JSON handling
 import uuid # Added for random filename generation
+from pathlib import Path
 from google import genai
 from google.genai import types
 
-def generate(video_urls):
-    """
-    Analyzes a list of videos from URLs using the Gemini API and saves the results to a JSON file.
+from video_batch_runner import ProviderBackoff
+from video_transcode import VideoTranscoder
 
-    Args:
-        video_urls (list): A list of strings, where each string is a URL to a video file.
-    """
-    client = genai.Client(
-        api_key=os.environ.get("GEMINI_API_KEY"),
-    )
+MODEL = "gemini-1.5-flash" # Using 1.5 Flash
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
 
-    all_results = [] # Store results for all videos
-
-    for video_url in video_urls:
-        print(f"--- Processing URL: {video_url} ---")
-        video_filename = video_url.split("/")[-1] # Extract filename from URL
-        temp_file = None
-        temp_file_path = None # Initialize path
-        analysis_result_text = "" # Store concatenated chunks for one video
-
-        try:
-            # Download the video from the URL
-            print(f"Downloading video from {video_url}...")
-            response = requests.get(video_url, stream=True)
-            response.raise_for_status() # Raise an exception for bad status codes
-            video_bytes = response.content # Read the content into memory
-
-            # Create a temporary file and write the video content to it
-            temp_file = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False)
-            temp_file.write(video_bytes)
-            temp_file_path = temp_file.name
-            temp_file.close() # Close the file handle so the API can read it
-            print(f"Video saved temporarily to: {temp_file_path}")
-
-            # Upload the temporary video file
-            print(f"Uploading temporary video file {temp_file_path}...")
-            # It's crucial the client can access the file path correctly
-            # Ensure the path is accessible if running in different environments (e.g., containers)
-            files = [
-                client.files.upload(file=temp_file_path), # Upload using the file path
-            ]
-
-            # Check the file's state and wait until it's ACTIVE
-            uploaded_file = files[0] # Get the uploaded file object
-            print(f"File uploaded with name: {uploaded_file.name}. Checking file state...")
-
-            max_attempts = 30  # Maximum number of attempts to check (30 * 5s = 150s)
-            attempt = 1
-            while attempt <= max_attempts:
-                file_info = client.files.get(name=uploaded_file.name) # Use name= instead of file_id=
-                file_state = file_info.state
-
-                if file_state == "ACTIVE":
-                    print("File is in ACTIVE state. Proceeding with analysis...")
-                    break
-                elif file_state == "PROCESSING":
-                    print(f"Attempt {attempt}/{max_attempts}: File is still PROCESSING. Waiting 5 seconds...")
-                    time.sleep(5)  # Wait 5 seconds before checking again
-                    attempt += 1
-                else:
-                    # If the file is in a FAILED or other state, raise an error
-                    raise Exception(f"File processing failed. State: {file_state}. Cannot proceed with analysis.")
-
-            if attempt > max_attempts:
-                raise Exception("Timeout: File did not reach ACTIVE state within the allowed time.")
-
-            # Proceed with the analysis once the file is ACTIVE
-            model = "gemini-1.5-flash" # Using 1.5 Flash
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_uri(
-                            file_uri=files[0].uri,
-                            mime_type=files[0].mime_type,
-                        ),
-                    ],
-                ),
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(text="""Task:
+ANALYSIS_PROMPT = """Task:
 
 You are an advanced video scene analyst and expert AI visual prompt engineer. Analyze this video and return a structured JSON breakdown of distinct visual scenes for AI-powered video reproduction in a cinematic, high-contrast graphic-novel style.
 
@@ -150,54 +76,245 @@ When generating the ai_prompt, always apply these principles to stay true to the
 
 Final Note:
 
-Ensure the response starts and ends strictly with the JSON object. No introductory text, no explanations—pure data, ready for automation."""),
-                    ],
-                ),
-            ]
-            generate_content_config = types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(
-                    thinking_budget=0,
+Ensure the response starts and ends strictly with the JSON object. No introductory text, no explanations—pure data, ready for automation."""
+
+# Sentinel passed down the pipeline once a stage has no more work
+_DONE = object()
+
+
+def download_video(video_url, session=requests):
+    """
+    Streams a video URL to a temporary .mp4 file and returns its path.
+    The caller owns the file and must delete it.
+    """
+    print(f"Downloading video from {video_url}...")
+    response = session.get(video_url, stream=True, timeout=120)
+    response.raise_for_status() # Raise an exception for bad status codes
+    temp_file = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False)
+    try:
+        with temp_file:
+            for block in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                temp_file.write(block)
+    except Exception:
+        os.remove(temp_file.name)
+        raise
+    print(f"Video saved temporarily to: {temp_file.name}")
+    return temp_file.name
+
+
+def upload_and_activate(client, file_path, backoff, max_attempts=30, poll_interval=5):
+    """Uploads a local file and waits until Gemini reports it ACTIVE."""
+    print(f"Uploading video file {file_path}...")
+    uploaded_file = backoff.call(client.files.upload, file=file_path)
+    print(f"File uploaded with name: {uploaded_file.name}. Checking file state...")
+
+    attempt = 1
+    while attempt <= max_attempts:
+        file_info = backoff.call(client.files.get, name=uploaded_file.name) # Use name= instead of file_id=
+        file_state = file_info.state
+
+        if file_state == "ACTIVE":
+            print(f"{uploaded_file.name} is in ACTIVE state.")
+            return file_info
+        elif file_state == "PROCESSING":
+            time.sleep(poll_interval)
+            attempt += 1
+        else:
+            # If the file is in a FAILED or other state, raise an error
+            raise Exception(f"File processing failed. State: {file_state}. Cannot proceed with analysis.")
+
+    raise Exception("Timeout: File did not reach ACTIVE state within the allowed time.")
+
+
+def analyze_file(client, file_info, backoff, model=MODEL):
+    """Streams the scene analysis for an ACTIVE file and returns the concatenated text."""
+    contents = [
+        types.Content(
+            role="user",
+            parts=[
+                types.Part.from_uri(
+                    file_uri=file_info.uri,
+                    mime_type=file_info.mime_type,
                 ),
-                response_mime_type="text/plain",
-            )
-
-            print("Starting video analysis...")
-            response_stream = client.models.generate_content_stream(
-                model=model,
-                contents=contents,
-                config=generate_content_config,
-            )
-            for chunk in response_stream:
-                analysis_result_text += chunk.text # Concatenate chunks
-
-            print("Analysis complete for this video.")
-            # Try to parse the result as JSON, otherwise store the raw text
+            ],
+        ),
+        types.Content(
+            role="user",
+            parts=[types.Part.from_text(text=ANALYSIS_PROMPT)],
+        ),
+    ]
+    generate_content_config = types.GenerateContentConfig(
+        thinking_config=types.ThinkingConfig(
+            thinking_budget=0,
+        ),
+        response_mime_type="text/plain",
+    )
+
+    def _stream():
+        analysis_result_text = "" # Store concatenated chunks for one video
+        for chunk in client.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=generate_content_config,
+        ):
+            analysis_result_text += chunk.text or "" # Concatenate chunks
+        return analysis_result_text
+
+    return backoff.call(_stream)
+
+
+def build_result(video_url, analysis_result_text):
+    """Parses the model output as JSON, falling back to the raw text."""
+    try:
+        # Remove potential markdown backticks if present
+        cleaned_text = analysis_result_text.strip().strip('```json').strip('```')
+        return {"url": video_url, "analysis": json.loads(cleaned_text)}
+    except json.JSONDecodeError as e:
+        print(f"Warning: Could not parse JSON for {video_url}. Storing raw text. Error: {e}")
+        return {"url": video_url, "analysis_raw": analysis_result_text}
+
+
+def _run_stage(name, fn, in_q, out_q, workers, report_error):
+    """
+    Starts `workers` threads that apply fn to items from in_q and put results on out_q.
+    Returns the closer thread, which forwards _DONE once every worker has finished.
+    """
+    def _worker():
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                in_q.put(_DONE) # Let sibling workers see it too
+                return
+            idx, video_url, payload = item
             try:
-                # Remove potential markdown backticks if present
-                cleaned_text = analysis_result_text.strip().strip('```json').strip('```')
-                parsed_result = json.loads(cleaned_text)
-                all_results.append({"url": video_url, "analysis": parsed_result})
-            except json.JSONDecodeError as e:
-                print(f"Warning: Could not parse JSON for {video_url}. Storing raw text. Error: {e}")
-                all_results.append({"url": video_url, "analysis_raw": analysis_result_text})
+                result = fn(video_url, payload)
+            except Exception as e:
+                print(f"Error in {name} stage for {video_url}: {e}")
+                report_error(idx, video_url, e)
+                continue
+            out_q.put((idx, video_url, result))
+
+    threads = [threading.Thread(target=_worker, name=f"{name}-{i}", daemon=True) for i in range(max(1, workers))]
+    for t in threads:
+        t.start()
+
+    def _close():
+        for t in threads:
+            t.join()
+        out_q.put(_DONE)
+
+    closer = threading.Thread(target=_close, name=f"{name}-closer", daemon=True)
+    closer.start()
+    return closer
+
+
+def _append_jsonl(path, record):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def generate(
+    video_urls,
+    transcode_profile=None,
+    client=None,
+    download_workers=2,
+    upload_workers=2,
+    analyze_workers=2,
+    queue_size=2,
+    poll_interval=5,
+    output_filepath=None,
+    session=requests,
+):
+    """
+    Analyzes a list of videos from URLs using the Gemini API and saves the results to a JSON file.
 
-        except Exception as e:
-            print(f"Error processing {video_url}: {e}")
-            all_results.append({"url": video_url, "error": str(e)}) # Record the error
+    Downloads, upload + activation, and analysis run as a three-stage pipeline with
+    bounded queues in between, so the network, the Gemini PROCESSING queue and
+    generation overlap across videos. Each result is appended to a .jsonl file as
+    soon as it is ready; the ordered JSON array is written at the end.
+
+    Args:
+        video_urls (list): A list of strings, where each string is a URL to a video file.
+        transcode_profile (str, optional): Downsample each video locally with ffmpeg
+            to this profile (see video_transcode.PROFILES) before uploading.
+        client (genai.Client, optional): Client to use; created from GEMINI_API_KEY if omitted.
+        download_workers / upload_workers / analyze_workers (int): Threads per stage.
+        queue_size (int): Max items waiting between two stages (bounds temp files on disk).
+        poll_interval (float): Seconds between file state checks.
+        output_filepath (str, optional): Where to write the JSON array.
+
+    Returns:
+        list: One result dict per URL, in input order.
+    """
+    if client is None:
+        client = genai.Client(
+            api_key=os.environ.get("GEMINI_API_KEY"),
+        )
+    transcoder = VideoTranscoder(transcode_profile) if transcode_profile else None
+    backoff = ProviderBackoff()
+
+    if output_filepath is None:
+        output_filename = f"video_analysis_results_{uuid.uuid4()}.json"
+        output_filepath = os.path.join(os.getcwd(), output_filename) # Save in current dir
+    jsonl_filepath = os.path.splitext(output_filepath)[0] + ".jsonl"
+
+    results = {}
+    results_lock = threading.Lock()
+
+    def _record(idx, record):
+        # Flush every video as soon as it finishes
+        with results_lock:
+            results[idx] = record
+            _append_jsonl(jsonl_filepath, {"index": idx, **record})
 
+    def _report_error(idx, video_url, error):
+        _record(idx, {"url": video_url, "error": str(error)}) # Record the error
+
+    def _upload(video_url, temp_file_path):
+        try:
+            upload_path = temp_file_path
+            if transcoder:
+                upload_path = str(transcoder.prepare(Path(temp_file_path)))
+            return upload_and_activate(client, upload_path, backoff, poll_interval=poll_interval)
         finally:
             # Clean up the temporary file for this video
-            if temp_file_path and os.path.exists(temp_file_path):
-                print(f"Deleting temporary file: {temp_file_path}")
-                try:
-                    os.remove(temp_file_path)
-                except OSError as e:
-                    print(f"Error deleting temporary file {temp_file_path}: {e}")
-
-    # After processing all URLs, write the results to a file
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+
+    download_q = queue.Queue(maxsize=queue_size)
+    upload_q = queue.Queue(maxsize=queue_size)
+    analyze_q = queue.Queue(maxsize=queue_size)
+    done_q = queue.Queue()
+
+    _run_stage("download", lambda url, _: download_video(url, session), download_q, upload_q, download_workers, _report_error)
+    _run_stage("upload", _upload, upload_q, analyze_q, upload_workers, _report_error)
+    _run_stage("analyze", lambda url, file_info: analyze_file(client, file_info, backoff), analyze_q, done_q, analyze_workers, _report_error)
+
+    def _feed():
+        for idx, video_url in enumerate(video_urls):
+            print(f"--- Queued URL: {video_url} ---")
+            download_q.put((idx, video_url, None))
+        download_q.put(_DONE)
+
+    threading.Thread(target=_feed, name="feeder", daemon=True).start()
+
+    while True:
+        item = done_q.get()
+        if item is _DONE:
+            break
+        idx, video_url, analysis_result_text = item
+        print(f"Analysis complete for {video_url}.")
+        _record(idx, build_result(video_url, analysis_result_text))
+
+    if transcoder:
+        transcoder.close()
+
+    all_results = [results[idx] for idx in sorted(results)]
+
+    # After processing all URLs, write the ordered results to a file
     if all_results:
-        output_filename = f"video_analysis_results_{uuid.uuid4()}.json"
-        output_filepath = os.path.join(os.getcwd(), output_filename) # Save in current dir
         print(f"Writing all results to {output_filepath}...")
         try:
             with open(output_filepath, 'w') as f:
@@ -207,6 +324,7 @@ Ensure the response starts and ends strictly with the JSON object. No introducto
             print(f"Error writing results to file: {e}")
     else:
         print("No results were generated.")
+    return all_results
 
 
 if __name__ == "__main__":
@@ -221,4 +339,4 @@ if __name__ == "__main__":
     if not urls_to_process:
         print("No video URLs provided in the script. Exiting.")
     else:
-        generate(urls_to_process)
\ No newline at end of file
+        generate(urls_to_process, transcode_profile=os.environ.get("GEMINI_TRANSCODE_PROFILE"))
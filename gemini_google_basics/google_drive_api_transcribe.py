@@ -1,11 +1,16 @@
+import argparse
+import mimetypes
 import os.path
 import sys
-from google.auth.transport.requests import Request
+from pathlib import Path
+from google.auth.transport.requests import AuthorizedSession, Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from drive_sync import DriveClient, DriveSync
+
 # If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 CREDENTIALS_FILE = 'credentials.json' # Downloaded from Google Cloud Console
@@ -57,6 +62,7 @@ def list_files_in_folder(service, folder_id):
                 q=f"'{folder_id}' in parents and mimeType != 'application/vnd.google-apps.folder' and trashed=false",
                 spaces='drive',
                 fields='nextPageToken, files(id, name)',
+                pageSize=1000,
                 pageToken=page_token
             ).execute()
 
@@ -79,8 +85,44 @@ def list_files_in_folder(service, folder_id):
 
     return files_list
 
+def transcribe_downloaded_file(path):
+    """Transcribe a synced audio/video file (chunked when it is large)."""
+    # Imported lazily: it needs GEMINI_API_KEY, which listing/syncing alone does not
+    from google_transcribe_binary_audio import LONG_AUDIO_BYTES, transcribe_audio_bytes, transcribe_long_audio_file
+
+    if path.stat().st_size > LONG_AUDIO_BYTES:
+        return transcribe_long_audio_file(str(path))
+    mime_type = mimetypes.guess_type(path.name)[0] or "audio/mpeg"
+    return transcribe_audio_bytes(path.read_bytes(), mime_type=mime_type)
+
+def sync_folder(creds, folder_id, dest_dir, transcribe, download_workers, transcribe_workers):
+    """Mirror folder_id recursively into dest_dir, skipping files unchanged since the last sync."""
+    client = DriveClient(AuthorizedSession(creds))
+    syncer = DriveSync(
+        client,
+        Path(dest_dir),
+        transcribe_downloaded_file if transcribe else None,
+        download_workers=download_workers,
+        transcribe_workers=transcribe_workers,
+    )
+    report = syncer.sync(folder_id)
+    print(
+        f"Listed {report.listed}, skipped {report.skipped} unchanged, "
+        f"downloaded {report.downloaded}, transcribed {report.transcribed}, failed {len(report.failed)}"
+    )
+    for failure in report.failed:
+        print(f"  failed: {failure}")
+
 if __name__ == '__main__':
-    target_folder_id = input("1XdYXUh-HEnM9isRpAsPCFZhGeVnMTZ2H")
+    parser = argparse.ArgumentParser(description="List or sync a Google Drive folder.")
+    parser.add_argument("folder_id", nargs="?", help="Drive folder ID (prompted for if omitted).")
+    parser.add_argument("--sync", metavar="DEST", help="Recursively mirror the folder into DEST.")
+    parser.add_argument("--transcribe", action="store_true", help="With --sync, transcribe audio/video files.")
+    parser.add_argument("--download-workers", type=int, default=6)
+    parser.add_argument("--transcribe-workers", type=int, default=2)
+    args = parser.parse_args()
+
+    target_folder_id = args.folder_id or input("Enter the Google Drive folder ID: ")
     if not target_folder_id:
         print("Folder ID cannot be empty.")
         sys.exit(1)
@@ -92,6 +134,12 @@ if __name__ == '__main__':
         print("Authentication failed. Exiting.")
         sys.exit(1)
 
+    if args.sync:
+        sync_folder(
+            creds, target_folder_id, args.sync, args.transcribe, args.download_workers, args.transcribe_workers
+        )
+        sys.exit(0)
+
     try:
         print("Building Drive service...")
         service = build('drive', 'v3', credentials=creds)
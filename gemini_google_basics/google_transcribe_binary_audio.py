@@ -1,7 +1,11 @@
 import google.generativeai as genai
+import argparse
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
+from long_audio import TIMESTAMP_PROMPT, transcribe_long_audio
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -12,58 +16,97 @@ if not api_key:
     raise ValueError("GEMINI_API_KEY environment variable is not set.")
 genai.configure(api_key=api_key)
 
-def transcribe_audio_bytes(audio_bytes: bytes, mime_type: str = "audio/mpeg"):
+MODEL_NAME = 'models/gemini-1.5-flash-latest'
+# Inline requests are capped at 20 MB; above this, split the recording
+LONG_AUDIO_BYTES = 15 * 1024 * 1024
+
+def _generate_transcript(audio_bytes: bytes, mime_type: str, prompt: str) -> str:
+    """One Gemini request for the audio; API errors (including 429s) propagate."""
+    # Use the recommended stable model
+    model = genai.GenerativeModel(MODEL_NAME)
+
+    # Prepare the audio data part for the API request
+    audio_file_part = {
+        "mime_type": mime_type,
+        "data": audio_bytes,
+    }
+
+    # Prepare the full request content
+    contents = [
+       {"parts": [audio_file_part, {"text": prompt}]}
+    ]
+
+    # Generate the transcription
+    response = model.generate_content(contents=contents)
+
+    # Check if response contains text
+    if hasattr(response, 'text') and response.text:
+        return response.text
+    # Attempt to access text via parts if direct access fails (though less common for text-only responses)
+    try:
+        return response.parts[0].text if response.parts else ""
+    except (AttributeError, IndexError):
+        return ""
+
+def transcribe_audio_bytes(audio_bytes: bytes, mime_type: str = "audio/mpeg", prompt: str = "Transcribe the audio."):
     """Transcribes audio file bytes using the Gemini API.
 
     Args:
         audio_bytes: The bytes of the audio file.
         mime_type: The mime type of the audio file (e.g., "audio/mpeg", "audio/wav").
                    Defaults to "audio/mpeg".
+        prompt: The instruction sent with the audio.
 
     Returns:
         The transcription as a string, or None if there's an error.
     """
     try:
-        # Use the recommended stable model
-        model = genai.GenerativeModel('models/gemini-1.5-flash-latest')
-
-        # Prepare the audio data part for the API request
-        audio_file_part = {
-            "mime_type": mime_type,
-            "data": audio_bytes,
-        }
-
-        # Prepare the full request content
-        prompt = "Transcribe the audio." # Simple transcription prompt
-        contents = [
-           {"parts": [audio_file_part, {"text": prompt}]}
-        ]
-
-        # Generate the transcription
-        response = model.generate_content(contents=contents)
-
-        # Check if response contains text
-        if hasattr(response, 'text') and response.text:
-            return response.text
-        else:
-            # Log potential issues if response structure is unexpected or text is empty
-            print(f"Warning: Transcription successful but returned empty text or unexpected response format.")
-            # Attempt to access text via parts if direct access fails (though less common for text-only responses)
-            try:
-                return response.parts[0].text if response.parts else "Transcription result empty."
-            except (AttributeError, IndexError):
-                 print(f"Error: Could not extract text from response parts.")
-                 return None
+        text = _generate_transcript(audio_bytes, mime_type, prompt)
+    except Exception as e:
+        print(f"An error occurred during transcription: {e}")
+        return None
+    if not text:
+        # Log potential issues if response structure is unexpected or text is empty
+        print(f"Warning: Transcription successful but returned empty text or unexpected response format.")
+        return "Transcription result empty."
+    return text
 
+def transcribe_chunk_file(chunk_path: Path) -> str:
+    """Long-audio worker: transcribe one MP3 chunk.
+
+    Errors propagate (rate limits to the shared backoff, the rest fail the
+    chunk so it is retried next run) instead of ending up in the transcript.
+    """
+    text = _generate_transcript(Path(chunk_path).read_bytes(), "audio/mpeg", TIMESTAMP_PROMPT)
+    if not text:
+        raise RuntimeError(f"No transcription for {Path(chunk_path).name}")
+    return text
 
+def transcribe_long_audio_file(audio_file_path: str, workers: int = 4):
+    """Splits a long recording on silences and transcribes the chunks concurrently.
+
+    Returns:
+        The stitched transcript with [mm:ss] timestamps, or None if any chunk
+        failed (finished chunks are cached, so rerunning only redoes the rest).
+    """
+    try:
+        return transcribe_long_audio(
+            Path(audio_file_path), transcribe_chunk_file, workers=workers, cache_tag=MODEL_NAME + TIMESTAMP_PROMPT
+        )
     except Exception as e:
-        print(f"An error occurred during transcription: {e}")
+        print(f"An error occurred during long-audio transcription: {e}")
         return None
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Transcribe an audio file with Gemini.")
+    parser.add_argument("audio_file", nargs="?", default='../audio/kratos_1.mp3', help="Path to the audio file.")
+    parser.add_argument("--long", action="store_true", help="Split on silences and transcribe chunks concurrently.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent chunk transcriptions in long mode.")
+    args = parser.parse_args()
+
     # --- Configuration ---
-    # Replace with the actual path to YOUR audio file
-    audio_file_path = '../audio/kratos_1.mp3'
+    # Pass the path to YOUR audio file as the first argument
+    audio_file_path = args.audio_file
     # Ensure this matches the actual format of your audio file!
     # Common types: "audio/mpeg" (MP3), "audio/wav", "audio/ogg", "audio/flac", "audio/aac"
     mime_type_of_audio = "audio/mpeg"
@@ -82,8 +125,11 @@ if __name__ == '__main__':
         print(f"Error reading audio file: {e}")
         exit()
 
-    # Perform the transcription
-    transcription = transcribe_audio_bytes(audio_data, mime_type=mime_type_of_audio)
+    # Perform the transcription (long recordings are chunked automatically)
+    if args.long or len(audio_data) > LONG_AUDIO_BYTES:
+        transcription = transcribe_long_audio_file(audio_file_path, workers=args.workers)
+    else:
+        transcription = transcribe_audio_bytes(audio_data, mime_type=mime_type_of_audio)
 
     # Output the result
     if transcription:
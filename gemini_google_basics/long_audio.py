@@ -0,0 +1,236 @@
+"""
+Long-audio transcription: split on silence, transcribe chunks concurrently.
+
+Sending a whole recording in one request hits request-size limits and
+transcribes it serially. This module:
+
+- finds silences with ffmpeg's silencedetect filter and cuts the audio
+  into ~5 minute chunks at silence midpoints (hard cut at max_chunk_s);
+- transcribes chunks on a bounded thread pool with shared rate-limit backoff;
+- shifts the [mm:ss] timestamps in each chunk's transcript by the chunk's
+  start time and stitches the pieces in order;
+- caches each chunk's transcript under ./.audio_cache/<source sha256>/, so a
+  rerun after a failure only redoes the chunks that failed.
+
+Usage:
+  text = transcribe_long_audio(Path("talk.mp3"), transcribe_chunk)
+  # transcribe_chunk(chunk_path) -> transcript text with [mm:ss] stamps
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from analysis_log import file_sha256
+from video_batch_runner import ProviderBackoff, run_bounded
+from video_transcode import ffmpeg_available
+
+CACHE_DIR = Path(os.getenv("GEMINI_AUDIO_CACHE", "./.audio_cache"))
+TARGET_CHUNK_S = 300.0
+MAX_CHUNK_S = 480.0
+MIN_SILENCE_S = 0.5
+SILENCE_DB = -35
+DEFAULT_WORKERS = 4
+
+TIMESTAMP_PROMPT = (
+    "Transcribe the audio verbatim. Start each new speaker turn or paragraph on a new line "
+    "prefixed with its start time as [mm:ss] measured from the beginning of this clip. "
+    "Output the transcript only, no other text."
+)
+
+SILENCE_START_RE = re.compile(r"silence_start: (-?[\d.]+)")
+SILENCE_END_RE = re.compile(r"silence_end: ([\d.]+)")
+DURATION_RE = re.compile(r"Duration: (\d+):(\d+):([\d.]+)")
+STAMP_RE = re.compile(r"\[(?:(\d+):)?(\d{1,2}):(\d{2})\]")
+
+
+@dataclass
+class Chunk:
+    index: int
+    start: float
+    end: float
+
+    @property
+    def key(self) -> str:
+        return f"{int(self.start * 1000):010d}-{int(self.end * 1000):010d}"
+
+
+def parse_silencedetect(stderr: str) -> Tuple[List[Tuple[float, float]], Optional[float]]:
+    """(silence intervals, total duration) from ffmpeg silencedetect output."""
+    starts = [max(0.0, float(x)) for x in SILENCE_START_RE.findall(stderr)]
+    ends = [float(x) for x in SILENCE_END_RE.findall(stderr)]
+    duration = None
+    match = DURATION_RE.search(stderr)
+    if match:
+        h, m, s = match.groups()
+        duration = int(h) * 3600 + int(m) * 60 + float(s)
+    return list(zip(starts, ends)), duration
+
+
+def detect_silences(path: Path) -> Tuple[List[Tuple[float, float]], Optional[float]]:
+    """Run silencedetect over the whole file (decode only, no output written)."""
+    result = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-nostats", "-i", str(path),
+            "-af", f"silencedetect=noise={SILENCE_DB}dB:d={MIN_SILENCE_S}",
+            "-f", "null", "-",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_silencedetect(result.stderr)
+
+
+def plan_chunks(
+    silences: Sequence[Tuple[float, float]],
+    duration: float,
+    target_s: float = TARGET_CHUNK_S,
+    max_s: float = MAX_CHUNK_S,
+) -> List[Chunk]:
+    """
+    Chunk boundaries at silence midpoints close to target_s.
+
+    From each chunk start, cut at the midpoint of the silence nearest to
+    start + target_s that lies within (start, start + max_s]; with no
+    silence in range, cut hard at start + max_s.
+    """
+    cuts = sorted((s + e) / 2 for s, e in silences)
+    chunks: List[Chunk] = []
+    start = 0.0
+    while duration - start > max_s:
+        candidates = [c for c in cuts if start + 1.0 < c <= start + max_s]
+        end = min(candidates, key=lambda c: abs(c - (start + target_s))) if candidates else start + max_s
+        chunks.append(Chunk(len(chunks), start, end))
+        start = end
+    chunks.append(Chunk(len(chunks), start, duration))
+    return chunks
+
+
+def extract_chunk(src: Path, chunk: Chunk, dst: Path):
+    """Re-encode one chunk to small mono MP3 (accurate cuts, small uploads)."""
+    tmp = dst.with_name(dst.name + ".tmp.mp3")
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-ss", f"{chunk.start:.3f}", "-t", f"{chunk.end - chunk.start:.3f}",
+            "-i", str(src), "-vn", "-ac", "1", "-ar", "16000", "-c:a", "libmp3lame", "-b:a", "48k",
+            str(tmp),
+        ],
+        check=True,
+    )
+    os.replace(tmp, dst)
+
+
+def format_stamp(seconds: float) -> str:
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"[{h}:{m:02d}:{s:02d}]" if h else f"[{m:02d}:{s:02d}]"
+
+
+def offset_timestamps(text: str, offset_s: float) -> str:
+    """Shift every [mm:ss] / [h:mm:ss] stamp in text by offset_s seconds."""
+
+    def shift(match: re.Match) -> str:
+        h, m, s = match.groups()
+        return format_stamp(int(h or 0) * 3600 + int(m) * 60 + int(s) + offset_s)
+
+    return STAMP_RE.sub(shift, text)
+
+
+def stitch(chunks: Sequence[Chunk], texts: Sequence[str]) -> str:
+    parts = []
+    for chunk, text in zip(chunks, texts):
+        text = (text or "").strip()
+        if STAMP_RE.search(text):
+            parts.append(offset_timestamps(text, chunk.start))
+        else:
+            # Model ignored the timestamp instruction; mark the chunk start at least
+            parts.append(f"{format_stamp(chunk.start)} {text}")
+    return "\n".join(parts)
+
+
+def transcribe_long_audio(
+    path: Path,
+    transcribe_chunk: Callable[[Path], str],
+    workers: int = DEFAULT_WORKERS,
+    cache_dir: Path = CACHE_DIR,
+    cache_tag: str = "",
+    target_s: float = TARGET_CHUNK_S,
+    max_s: float = MAX_CHUNK_S,
+) -> str:
+    """
+    Transcribe a long recording chunk by chunk.
+
+    Args:
+        path: Audio (or video) file
+        transcribe_chunk: Called with a chunk's MP3 path; returns its transcript
+        workers: Chunks transcribed concurrently
+        cache_dir: Root of the per-chunk cache
+        cache_tag: Extra cache key (e.g. model + prompt), so changing either
+            does not reuse old transcripts
+        target_s / max_s: Preferred / maximum chunk length in seconds
+
+    Returns:
+        The stitched transcript. Raises RuntimeError listing failed chunks
+        (successful ones stay cached for the next run).
+    """
+    path = Path(path)
+    if not ffmpeg_available():
+        raise RuntimeError("ffmpeg is required for long-audio mode (silence detection and splitting).")
+
+    tag = hashlib.sha256(cache_tag.encode("utf-8")).hexdigest()[:12]
+    work_dir = Path(cache_dir) / file_sha256(path)
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    plan_path = work_dir / f"plan_{int(target_s)}_{int(max_s)}.json"
+    if plan_path.exists():
+        # Same source, same chunking: skip the silence-detection pass
+        with open(plan_path, "r", encoding="utf-8") as f:
+            plan = json.load(f)
+        duration = plan["duration"]
+        chunks = [Chunk(i, start, end) for i, (start, end) in enumerate(plan["chunks"])]
+    else:
+        silences, duration = detect_silences(path)
+        if duration is None:
+            raise RuntimeError(f"Could not read the duration of {path}")
+        chunks = plan_chunks(silences, duration, target_s, max_s)
+        with open(plan_path, "w", encoding="utf-8") as f:
+            json.dump({"duration": duration, "chunks": [[c.start, c.end] for c in chunks]}, f)
+    print(f"{path.name}: {duration / 60:.1f} min → {len(chunks)} chunks")
+
+    backoff = ProviderBackoff()
+
+    def run(chunk: Chunk) -> str:
+        result_path = work_dir / f"{chunk.key}_{tag}.json"
+        if result_path.exists():
+            with open(result_path, "r", encoding="utf-8") as f:
+                return json.load(f)["text"]
+        audio_path = work_dir / f"{chunk.key}.mp3"
+        if not audio_path.exists():
+            extract_chunk(path, chunk, audio_path)
+        text = backoff.call(transcribe_chunk, audio_path)
+        if not text:
+            raise RuntimeError("empty transcript")
+        tmp = result_path.with_name(result_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"start": chunk.start, "end": chunk.end, "text": text}, f, ensure_ascii=False)
+        os.replace(tmp, result_path)
+        return text
+
+    def progress(idx, chunk, result, error):
+        status = f"failed: {error}" if error else "done"
+        print(f"  chunk {idx + 1}/{len(chunks)} {format_stamp(chunk.start)}–{format_stamp(chunk.end)} {status}")
+
+    outcomes = run_bounded(chunks, run, workers=workers, on_progress=progress)
+    failed = [chunks[i] for i, (_, error) in enumerate(outcomes) if error is not None]
+    if failed:
+        spans = ", ".join(f"{format_stamp(c.start)}–{format_stamp(c.end)}" for c in failed)
+        raise RuntimeError(f"{len(failed)} chunk(s) failed ({spans}); rerun to retry only those.")
+    return stitch(chunks, [text for text, _ in outcomes])
@@ -0,0 +1,170 @@
+"""
+Chunked, cached PDF ingestion for the Gemini chat app.
+
+- Page text is extracted in parallel on a process pool (PyPDF2 is pure
+  Python, so threads would not help), one contiguous page range per task.
+- Pages are collected into lists and joined once, never grown with +=.
+- Results are cached by the file's content hash, in memory and on disk
+  under ./.pdf_cache/: page text, page-level chunks and (optionally) chunk
+  embeddings. A PDF is parsed and embedded once, not on every rerun.
+
+Usage:
+  doc = ingest_pdf(uploaded_file.getvalue(), embed_fn=embed_texts)
+  doc.chunks, doc.chunk_pages, doc.embeddings
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from PyPDF2 import PdfReader
+
+from context_window import chunk_text
+
+CACHE_DIR = Path(os.getenv("GEMINI_PDF_CACHE", "./.pdf_cache"))
+WORKERS = max(1, min(8, (os.cpu_count() or 1) - 1))
+MIN_PAGES_PER_TASK = 32  # each task re-opens the PDF, so keep tasks coarse
+CHUNK_TOKENS = 400
+MEMORY_CACHE_SIZE = 8
+
+_pool: Optional[ProcessPoolExecutor] = None
+_memory_cache: Dict[str, "PdfDocument"] = {}
+_embed_failed: set = set()  # don't retry a failing embedder on every rerun
+
+
+@dataclass
+class PdfDocument:
+    sha256: str
+    pages: List[str]
+    chunks: List[str]
+    chunk_pages: List[int]  # 1-based page number of each chunk
+    embeddings: Optional[np.ndarray] = field(default=None, repr=False)
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(self.pages)
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=WORKERS)
+    return _pool
+
+
+def _extract_pages(data: bytes, start: int, end: int) -> List[str]:
+    """Process-pool worker: text of pages[start:end]."""
+    reader = PdfReader(BytesIO(data))
+    return [(reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+def extract_pages(data: bytes) -> List[str]:
+    """Text of every page, in order."""
+    page_count = len(PdfReader(BytesIO(data)).pages)
+    tasks = min(WORKERS * 2, page_count // MIN_PAGES_PER_TASK)
+    if WORKERS == 1 or tasks < 2:
+        return _extract_pages(data, 0, page_count)
+    step = -(-page_count // tasks)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    futures = [_executor().submit(_extract_pages, data, start, end) for start, end in ranges]
+    pages: List[str] = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
+
+
+def chunk_pages(pages: Sequence[str], chunk_tokens: int = CHUNK_TOKENS):
+    """Page-level chunks (long pages are split further) and their page numbers."""
+    chunks: List[str] = []
+    numbers: List[int] = []
+    for number, page in enumerate(pages, start=1):
+        for chunk in chunk_text(page, chunk_tokens):
+            chunks.append(f"[Page {number}]\n{chunk}")
+            numbers.append(number)
+    return chunks, numbers
+
+
+def _atomic_write_bytes(path: Path, data: bytes):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _load_cached(sha256: str, cache_dir: Path, embed_model: Optional[str]) -> Optional[PdfDocument]:
+    meta_path = cache_dir / f"{sha256}.json"
+    if not meta_path.exists():
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    doc = PdfDocument(sha256, meta["pages"], meta["chunks"], meta["chunk_pages"])
+    if embed_model:
+        emb_path = cache_dir / f"{sha256}_{embed_model.replace('/', '_')}.npy"
+        if emb_path.exists():
+            doc.embeddings = np.load(emb_path)
+    return doc
+
+
+def _save_cached(doc: PdfDocument, cache_dir: Path, embed_model: Optional[str]):
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    meta = {"pages": doc.pages, "chunks": doc.chunks, "chunk_pages": doc.chunk_pages}
+    _atomic_write_bytes(cache_dir / f"{doc.sha256}.json", json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+    if embed_model and doc.embeddings is not None:
+        buf = BytesIO()
+        np.save(buf, doc.embeddings)
+        _atomic_write_bytes(cache_dir / f"{doc.sha256}_{embed_model.replace('/', '_')}.npy", buf.getvalue())
+
+
+def ingest_pdf(
+    data: bytes,
+    embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    embed_model: Optional[str] = None,
+    cache_dir: Path = CACHE_DIR,
+) -> PdfDocument:
+    """
+    Parse, chunk and optionally embed a PDF, reusing cached results.
+
+    Args:
+        data: Raw PDF bytes
+        embed_fn: Maps a batch of chunk texts to embedding vectors; if it
+            fails, the document is returned without embeddings
+        embed_model: Name used to key the embedding cache (required with embed_fn)
+        cache_dir: Directory for the on-disk cache
+
+    Returns:
+        PdfDocument with pages, chunks, chunk_pages and embeddings (or None)
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    cache_dir = Path(cache_dir)
+    embed_model = embed_model if embed_fn else None
+
+    doc = _memory_cache.get(sha256) or _load_cached(sha256, cache_dir, embed_model)
+    fresh = doc is None
+    if fresh:
+        pages = extract_pages(data)
+        chunks, numbers = chunk_pages(pages)
+        doc = PdfDocument(sha256, pages, chunks, numbers)
+
+    needs_embeddings = (
+        embed_fn is not None and doc.embeddings is None and doc.chunks and sha256 not in _embed_failed
+    )
+    if needs_embeddings:
+        try:
+            doc.embeddings = np.asarray(embed_fn(doc.chunks), dtype=np.float32)
+        except Exception as e:
+            _embed_failed.add(sha256)
+            print(f"Embedding PDF chunks failed ({e}); falling back to keyword retrieval.")
+
+    if fresh or (needs_embeddings and doc.embeddings is not None):
+        _save_cached(doc, cache_dir, embed_model)
+    _memory_cache.pop(sha256, None)
+    _memory_cache[sha256] = doc
+    while len(_memory_cache) > MEMORY_CACHE_SIZE:
+        _memory_cache.pop(next(iter(_memory_cache)))
+    return doc
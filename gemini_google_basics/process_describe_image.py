@@ -5,10 +5,12 @@ import os
 import time
 from io import BytesIO
 import json
-import tiktoken
 from streamlit_float import *
 from datetime import datetime
 
+from auto_refresh import auto_refresh_sidebar
+from token_accounting import add_message, clear_messages, init_token_state, tokens_by_role, total_tokens
+
 # Load environment variables
 load_dotenv()
 
@@ -83,8 +85,7 @@ def main():
 
     gemini_model = genai.GenerativeModel(model_name=model)
 
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    init_token_state(st.session_state, model)
     if "chat_started" not in st.session_state:
         st.session_state.chat_started = False
 
@@ -96,8 +97,8 @@ def main():
             if response and response.parts:
                 st.markdown("### Response:")
                 st.markdown(response.text)
-                st.session_state.messages.append({"role": "user", "content": f"[Image uploaded] {prompt}"})
-                st.session_state.messages.append({"role": "assistant", "content": response.text})
+                add_message(st.session_state, "user", f"[Image uploaded] {prompt}")
+                add_message(st.session_state, "assistant", response.text)
                 st.session_state.chat_started = True
             elif response:
                 st.warning("Content generation was blocked or no valid content was generated.")
@@ -114,7 +115,7 @@ def main():
 
         user_input = st.chat_input("Ask a follow-up question:")
         if user_input:
-            st.session_state.messages.append({"role": "user", "content": user_input})
+            add_message(st.session_state, "user", user_input)
             with st.chat_message("user"):
                 st.markdown(user_input)
 
@@ -134,7 +135,7 @@ def main():
                 response = process_text(user_input, gemini_model, temperature, top_p, max_tokens)
 
             if response and response.parts:
-                st.session_state.messages.append({"role": "assistant", "content": response.text})
+                add_message(st.session_state, "assistant", response.text)
                 with st.chat_message("assistant"):
                     st.markdown(response.text)
             else:
@@ -164,14 +165,13 @@ def main():
             )
 
         with col2:
-            enc = tiktoken.get_encoding("cl100k_base")
-            tokenized_full_text = enc.encode(" ".join([item["content"] for item in st.session_state.messages]))
-            label = f"💬 {len(tokenized_full_text)} tokens"
-            st.link_button(label, "https://platform.openai.com/tokenizer")
+            label = f"💬 {total_tokens(st.session_state)} tokens"
+            by_role = ", ".join(f"{role}: {n}" for role, n in tokens_by_role(st.session_state).items())
+            st.link_button(label, "https://platform.openai.com/tokenizer", help=by_role)
 
         with col3:
             if st.button("🧹 Clear Chat"):
-                st.session_state.messages = []
+                clear_messages(st.session_state)
                 st.session_state.chat_started = False
                 st.rerun()
 
@@ -195,8 +195,8 @@ def main():
                     max_tokens
                 )
                 if image_response and image_response.parts:
-                    st.session_state.messages.append({"role": "user", "content": f"[Image uploaded] {prompt}"})
-                    st.session_state.messages.append({"role": "assistant", "content": image_response.text})
+                    add_message(st.session_state, "user", f"[Image uploaded] {prompt}")
+                    add_message(st.session_state, "assistant", image_response.text)
                     with st.chat_message("assistant"):
                         st.markdown(image_response.text)
                     st.success("Image processed and added to the conversation.")
@@ -208,15 +208,10 @@ def main():
             else:
                 st.warning("Please enter a prompt for the image.")
 
-    # Auto-refresh feature
-    auto_refresh = st.sidebar.checkbox("Enable auto-refresh")
-    if auto_refresh:
-        refresh_interval = st.sidebar.slider("Refresh interval (seconds)", 5, 60, 30)
-        timer_placeholder = st.sidebar.empty()
-        for remaining in range(refresh_interval, 0, -1):
-            timer_placeholder.text(f"Refreshing in {remaining} seconds...")
-            time.sleep(1)
-        st.rerun()
+    # Auto-refresh feature: a timer-driven fragment, so only the status panel reruns
+    auto_refresh_sidebar(
+        lambda: st.caption(f"{len(st.session_state.messages)} messages · {total_tokens(st.session_state)} tokens")
+    )
 
 if __name__ == '__main__':
     main()
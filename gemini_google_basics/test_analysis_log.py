@@ -0,0 +1,58 @@
+"""
+Test the JSONL results log: append/load, recovery from a torn last line and compaction
+"""
+
+import json
+
+from analysis_log import AnalysisLog, file_sha256, hash_files
+
+
+def test_append_and_load(tmp_path):
+    log = AnalysisLog(tmp_path / "out" / "log.jsonl")
+    assert log.load() == {}
+    log.append("a" * 64, "one.mp4", {"score": 1})
+    log.append("b" * 64, "two.mp4", {"score": 2})
+    # A new run reads the same file
+    assert AnalysisLog(log.path).load() == {"a" * 64: {"score": 1}, "b" * 64: {"score": 2}}
+
+
+def test_torn_last_line_is_skipped_and_not_merged(tmp_path):
+    log = AnalysisLog(tmp_path / "log.jsonl")
+    log.append("a", "one.mp4", {"score": 1})
+    with open(log.path, "a", encoding="utf-8") as f:
+        f.write('{"video_sha256": "b", "video_filename": "two.mp4", "res')  # crash mid-append
+    assert AnalysisLog(log.path).load() == {"a": {"score": 1}}
+
+    # The rerun analyzes "b" again; its record starts on a fresh line
+    rerun = AnalysisLog(log.path)
+    rerun.append("b", "two.mp4", {"score": 2})
+    rerun.append("c", "three.mp4", {"score": 3})
+    assert rerun.load() == {"a": {"score": 1}, "b": {"score": 2}, "c": {"score": 3}}
+
+
+def test_reset_discards_records(tmp_path):
+    log = AnalysisLog(tmp_path / "log.jsonl")
+    log.append("a", "one.mp4", {"score": 1})
+    log.reset()
+    assert log.load() == {} and not log.path.exists()
+
+
+def test_finalize_orders_by_input_and_writes_each_hash_once(tmp_path):
+    log = AnalysisLog(tmp_path / "log.jsonl")
+    log.append("b", "two.mp4", {"name": "two"})
+    log.append("a", "one.mp4", {"name": "one"})
+    json_path = tmp_path / "analysis.json"
+    # "a" twice: two identical files in the folder; "c" was never analyzed
+    assert log.finalize(json_path, ["a", "b", "a", "c"]) == 2
+    assert json.loads(json_path.read_text(encoding="utf-8")) == [{"name": "one"}, {"name": "two"}]
+    assert not (tmp_path / "analysis.json.tmp").exists()
+
+
+def test_identical_files_hash_alike(tmp_path):
+    paths = [tmp_path / "one.mp4", tmp_path / "copy.mp4", tmp_path / "other.mp4"]
+    paths[0].write_bytes(b"\0" * 3_000_000)
+    paths[1].write_bytes(b"\0" * 3_000_000)
+    paths[2].write_bytes(b"\1" * 10)
+    hashes = hash_files(paths, workers=2)
+    assert hashes[0] == hashes[1] != hashes[2]
+    assert hashes[2] == file_sha256(paths[2])
@@ -0,0 +1,212 @@
+"""
+Test the Drive folder sync against a local fake Drive v3 endpoint
+"""
+
+import hashlib
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from drive_sync import FOLDER_MIME, DriveClient, DriveSync
+
+
+class FakeDrive:
+    """In-memory folder tree served over HTTP: files.list with paging and ranged alt=media."""
+
+    def __init__(self):
+        self.items = {}  # id -> metadata (+ "parent", "content")
+        self.media_requests = []
+        self.fail_at = {}  # id -> range offset whose response is cut short (once)
+        self._lock = threading.Lock()
+
+    def add(self, item_id, name, parent, mime, content=b""):
+        self.items[item_id] = {
+            "id": item_id,
+            "name": name,
+            "mimeType": mime,
+            "parent": parent,
+            "content": content,
+            "modifiedTime": "2024-01-01T00:00:00.000Z",
+            "md5Checksum": hashlib.md5(content).hexdigest() if mime != FOLDER_MIME else None,
+        }
+
+    def change(self, item_id, content):
+        item = self.items[item_id]
+        item["content"] = content
+        item["md5Checksum"] = hashlib.md5(content).hexdigest()
+        item["modifiedTime"] = "2024-02-01T00:00:00.000Z"
+
+    def handler(self):
+        drive = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == "/drive/v3/files":
+                    return self._list(query)
+                return self._media(url.path.rsplit("/", 1)[1], query)
+
+            def _list(self, query):
+                parent = re.match(r"'([^']+)' in parents", query["q"]).group(1)
+                children = [i for i in drive.items.values() if i["parent"] == parent]
+                start = int(query.get("pageToken", 0))
+                size = int(query["pageSize"])
+                page = children[start:start + size]
+                body = {"files": [self._meta(i) for i in page]}
+                if start + size < len(children):
+                    body["nextPageToken"] = str(start + size)
+                self._send(200, json.dumps(body).encode(), {"Content-Type": "application/json"})
+
+            def _meta(self, item):
+                meta = {k: item[k] for k in ("id", "name", "mimeType", "modifiedTime") if item[k]}
+                if item["mimeType"] != FOLDER_MIME:
+                    meta["md5Checksum"] = item["md5Checksum"]
+                    meta["size"] = str(len(item["content"]))
+                return meta
+
+            def _media(self, item_id, query):
+                content = drive.items[item_id]["content"]
+                first, last = map(int, re.match(r"bytes=(\d+)-(\d+)", self.headers["Range"]).groups())
+                with drive._lock:
+                    drive.media_requests.append((item_id, first))
+                    cut = first == drive.fail_at.get(item_id)
+                    if cut:
+                        del drive.fail_at[item_id]
+                if first >= len(content):
+                    return self._send(416, b"", {})
+                body = content[first:last + 1]
+                headers = {"Content-Range": f"bytes {first}-{first + len(body) - 1}/{len(content)}"}
+                if cut:
+                    # Promise the full range, send half of it, then hang up
+                    self.send_response(206)
+                    for key, value in headers.items():
+                        self.send_header(key, value)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body[:len(body) // 2])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self._send(206, body, headers)
+
+            def _send(self, status, body, headers):
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def drive():
+    fake = FakeDrive()
+    fake.add("root", "root", None, FOLDER_MIME)
+    fake.add("talks", "talks", "root", FOLDER_MIME)
+    fake.add("deep", "2024", "talks", FOLDER_MIME)
+    fake.add("a1", "intro.mp3", "root", "audio/mpeg", b"A" * 5000)
+    fake.add("d1", "notes.pdf", "root", "application/pdf", b"%PDF" * 100)
+    fake.add("g1", "Plan", "root", "application/vnd.google-apps.document")
+    fake.add("a2", "keynote.mp4", "talks", "video/mp4", b"V" * 12000)
+    fake.add("a3", "panel.mp3", "deep", "audio/mpeg", b"P" * 3000)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), fake.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    fake.base_url = f"http://127.0.0.1:{server.server_port}"
+    yield fake
+    server.shutdown()
+
+
+def make_sync(drive, tmp_path, transcribe_fn, chunk_size=4096):
+    client = DriveClient(requests.Session(), base_url=drive.base_url, page_size=2)
+    original = client.download
+    client.download = lambda *args, **kwargs: original(*args, chunk_size=chunk_size, **kwargs)
+    return DriveSync(client, tmp_path / "mirror", transcribe_fn, download_workers=3, transcribe_workers=2)
+
+
+def fake_transcribe(path):
+    return f"transcript of {path.name} ({path.stat().st_size} bytes)"
+
+
+def test_recursive_sync_then_skips_unchanged(drive, tmp_path):
+    report = make_sync(drive, tmp_path, fake_transcribe).sync("root")
+
+    mirror = tmp_path / "mirror"
+    assert report.listed == 4 and report.downloaded == 4 and report.transcribed == 3 and not report.failed
+    assert (mirror / "talks" / "2024" / "panel.mp3").read_bytes() == b"P" * 3000
+    assert (mirror / "talks" / "keynote.mp4.txt").read_text() == "transcript of keynote.mp4 (12000 bytes)"
+    assert not (mirror / "notes.pdf.txt").exists()
+    assert not list(mirror.rglob("*.part"))
+
+    drive.media_requests.clear()
+    again = make_sync(drive, tmp_path, fake_transcribe).sync("root")
+    assert again.skipped == 4 and again.downloaded == 0
+    assert drive.media_requests == []
+
+
+def test_changed_file_is_downloaded_again(drive, tmp_path):
+    make_sync(drive, tmp_path, fake_transcribe).sync("root")
+    drive.change("a3", b"Q" * 2000)
+    drive.media_requests.clear()
+
+    report = make_sync(drive, tmp_path, fake_transcribe).sync("root")
+
+    assert report.downloaded == 1 and report.skipped == 3
+    assert {item_id for item_id, _ in drive.media_requests} == {"a3"}
+    assert (tmp_path / "mirror" / "talks" / "2024" / "panel.mp3").read_bytes() == b"Q" * 2000
+
+
+def test_interrupted_download_resumes_from_partial_file(drive, tmp_path):
+    drive.fail_at["a2"] = 4096  # second 4096-byte chunk is cut short
+    first = make_sync(drive, tmp_path, fake_transcribe).sync("root")
+    assert len(first.failed) == 1 and "keynote.mp4" in first.failed[0]
+
+    drive.media_requests.clear()
+    second = make_sync(drive, tmp_path, fake_transcribe).sync("root")
+
+    assert not second.failed and second.downloaded == 1
+    resumed_from = [offset for item_id, offset in drive.media_requests if item_id == "a2"]
+    assert resumed_from[0] >= 4096
+    assert (tmp_path / "mirror" / "talks" / "keynote.mp4").read_bytes() == b"V" * 12000
+
+
+def test_failed_transcription_is_retried_without_downloading(drive, tmp_path):
+    def flaky(path):
+        if path.name == "intro.mp3":
+            raise RuntimeError("quota")
+        return fake_transcribe(path)
+
+    first = make_sync(drive, tmp_path, flaky).sync("root")
+    assert len(first.failed) == 1 and "transcribe" in first.failed[0]
+
+    drive.media_requests.clear()
+    second = make_sync(drive, tmp_path, fake_transcribe).sync("root")
+
+    assert second.transcribed == 1 and second.downloaded == 0
+    assert drive.media_requests == []
+    assert (tmp_path / "mirror" / "intro.mp3.txt").exists()
+
+
+def test_files_mirrored_without_transcriber_are_transcribed_later(drive, tmp_path):
+    first = make_sync(drive, tmp_path, None).sync("root")
+    assert first.downloaded == 4 and first.transcribed == 0
+    assert not list((tmp_path / "mirror").rglob("*.txt"))
+
+    drive.media_requests.clear()
+    again = make_sync(drive, tmp_path, None).sync("root")
+    assert again.skipped == 4 and drive.media_requests == []
+
+    second = make_sync(drive, tmp_path, fake_transcribe).sync("root")
+    assert second.transcribed == 3 and second.downloaded == 0 and second.skipped == 1
+    assert drive.media_requests == []
+    assert (tmp_path / "mirror" / "talks" / "keynote.mp4.txt").exists()
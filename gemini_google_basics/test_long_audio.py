@@ -0,0 +1,65 @@
+"""
+Test the pure parts of long-audio transcription: silence parsing, chunk planning and timestamp shifting
+"""
+
+from long_audio import Chunk, format_stamp, offset_timestamps, parse_silencedetect, plan_chunks, stitch
+
+SILENCEDETECT_STDERR = """
+Input #0, mp3, from 'talk.mp3':
+  Duration: 00:20:05.50, start: 0.025057, bitrate: 128 kb/s
+[silencedetect @ 0x1] silence_start: -0.01
+[silencedetect @ 0x1] silence_end: 1.2 | silence_duration: 1.21
+[silencedetect @ 0x1] silence_start: 290.4
+[silencedetect @ 0x1] silence_end: 291.6 | silence_duration: 1.2
+[silencedetect @ 0x1] silence_start: 610
+[silencedetect @ 0x1] silence_end: 611 | silence_duration: 1
+"""
+
+
+def test_parse_silencedetect():
+    silences, duration = parse_silencedetect(SILENCEDETECT_STDERR)
+    assert silences == [(0.0, 1.2), (290.4, 291.6), (610.0, 611.0)]
+    assert duration == 20 * 60 + 5.5
+
+
+def test_parse_silencedetect_without_duration():
+    assert parse_silencedetect("no ffmpeg output") == ([], None)
+
+
+def test_chunks_cut_at_silence_nearest_the_target():
+    chunks = plan_chunks([(290.0, 292.0), (350.0, 352.0), (600.0, 602.0)], 1000.0, target_s=300, max_s=480)
+    assert [(c.start, c.end) for c in chunks] == [(0.0, 291.0), (291.0, 601.0), (601.0, 1000.0)]
+    assert [c.index for c in chunks] == [0, 1, 2]
+
+
+def test_chunks_cut_hard_without_silence_in_range():
+    chunks = plan_chunks([(900.0, 901.0)], 1100.0, target_s=300, max_s=480)
+    assert [(c.start, c.end) for c in chunks] == [(0.0, 480.0), (480.0, 900.5), (900.5, 1100.0)]
+
+
+def test_short_audio_is_one_chunk():
+    assert [(c.start, c.end) for c in plan_chunks([(10.0, 11.0)], 200.0)] == [(0.0, 200.0)]
+
+
+def test_silence_at_the_chunk_start_is_not_a_cut():
+    # A cut within a second of the start would make an empty chunk
+    chunks = plan_chunks([(0.0, 1.0), (0.5, 1.5)], 600.0, target_s=300, max_s=480)
+    assert chunks[0].end == 480.0
+
+
+def test_format_stamp():
+    assert format_stamp(65.9) == "[01:05]"
+    assert format_stamp(3725) == "[1:02:05]"
+
+
+def test_offset_timestamps():
+    text = "[00:00] Hello\n[01:30] Next turn\n[1:00:05] Late"
+    assert offset_timestamps(text, 300.0) == "[05:00] Hello\n[06:30] Next turn\n[1:05:05] Late"
+    # Crossing the hour switches to [h:mm:ss]
+    assert offset_timestamps("[59:30] x", 60) == "[1:00:30] x"
+
+
+def test_stitch_offsets_each_chunk_and_marks_unstamped_ones():
+    chunks = [Chunk(0, 0.0, 291.0), Chunk(1, 291.0, 601.0)]
+    text = stitch(chunks, ["[00:00] Intro\n[02:10] Topic\n", "no stamps here"])
+    assert text == "[00:00] Intro\n[02:10] Topic\n[04:51] no stamps here"
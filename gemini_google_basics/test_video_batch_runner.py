@@ -0,0 +1,126 @@
+"""
+Test the batch runner: rate-limit detection, shared backoff, bounded concurrency and result ordering
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from video_batch_runner import ProviderBackoff, is_rate_limit_error, run_bounded
+
+
+class ApiError(Exception):
+    def __init__(self, message, code=None, response=None):
+        super().__init__(message)
+        self.code = code
+        self.response = response
+
+
+def test_rate_limit_errors_are_recognized():
+    assert is_rate_limit_error(ApiError("slow down", code=429))
+    assert is_rate_limit_error(ApiError("slow down", response=SimpleNamespace(status_code=429)))
+    assert is_rate_limit_error(RuntimeError("429 Too Many Requests"))
+    assert is_rate_limit_error(RuntimeError("status: RESOURCE_EXHAUSTED (quota)"))
+
+
+def test_other_errors_are_not_rate_limits():
+    assert not is_rate_limit_error(ApiError("not found", code=404))
+    assert not is_rate_limit_error(RuntimeError("video 14291.mp4 failed"))
+    assert not is_rate_limit_error(RuntimeError("processed 4290 frames"))
+    assert not is_rate_limit_error(ValueError("bad input"))
+
+
+def test_backoff_retries_rate_limits_then_succeeds():
+    backoff = ProviderBackoff(base_delay=0.01, max_delay=0.02)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ApiError("quota", code=429)
+        return "ok"
+
+    assert backoff.call(flaky) == "ok"
+    assert len(calls) == 3
+
+
+def test_backoff_does_not_retry_other_errors_or_past_max_retries():
+    backoff = ProviderBackoff(base_delay=0.01, max_delay=0.01, max_retries=2)
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        backoff.call(broken)
+    assert len(calls) == 1
+
+    def limited():
+        calls.append(1)
+        raise ApiError("quota", code=429)
+
+    calls.clear()
+    with pytest.raises(ApiError):
+        backoff.call(limited)
+    assert len(calls) == 3
+
+
+def test_backoff_is_shared_between_workers():
+    backoff = ProviderBackoff(base_delay=0.3, max_delay=0.3, max_retries=1)
+    limited = threading.Event()
+    attempts = []
+
+    def first():
+        if not limited.is_set():
+            limited.set()
+            raise ApiError("quota", code=429)
+        return "first"
+
+    def second():
+        attempts.append(time.monotonic())
+        return "second"
+
+    worker = threading.Thread(target=backoff.call, args=(first,))
+    worker.start()
+    limited.wait()
+    time.sleep(0.01)  # let the worker push the shared deadline back
+    start = time.monotonic()
+    assert backoff.call(second) == "second"
+    worker.join()
+    # The other worker's 429 delayed this call (jittered delay is at least half of 0.3s)
+    assert attempts[0] - start >= 0.1
+
+
+def test_run_bounded_caps_jobs_in_flight_and_keeps_input_order():
+    lock = threading.Lock()
+    in_flight, peak = [0], [0]
+
+    def job(n):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.02 * (5 - n % 5))  # later items finish first
+        with lock:
+            in_flight[0] -= 1
+        if n == 3:
+            raise ValueError("job 3 failed")
+        return n * 10
+
+    progress, ordered = [], []
+    outcomes = run_bounded(
+        list(range(10)),
+        job,
+        workers=3,
+        on_progress=lambda idx, item, result, error: progress.append(idx),
+        on_ordered=lambda idx, item, result, error: ordered.append(idx),
+    )
+
+    assert peak[0] == 3
+    assert [result for result, _ in outcomes] == [0, 10, 20, None, 40, 50, 60, 70, 80, 90]
+    assert isinstance(outcomes[3][1], ValueError)
+    assert all(error is None for i, (_, error) in enumerate(outcomes) if i != 3)
+    assert ordered == list(range(10))
+    assert sorted(progress) == list(range(10)) and progress != ordered
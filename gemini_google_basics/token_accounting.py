@@ -0,0 +1,105 @@
+"""
+Incremental token accounting for the Streamlit chat apps.
+
+Re-encoding the whole conversation on every rerun is O(history) work per
+keystroke. Instead:
+
+- The tiktoken encoder is built once per process and reused by every session.
+- Each message is tokenized once, when it is appended, and its count is kept
+  in session state next to the message list.
+- Totals and per-role breakdowns are running sums, so reading them is O(1).
+
+Usage:
+  init_token_state(st.session_state, model)
+  add_message(st.session_state, "user", prompt)
+  st.write(total_tokens(st.session_state))
+"""
+
+from functools import lru_cache
+from typing import Dict, MutableMapping, Optional
+
+import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoder(model: Optional[str] = None) -> tiktoken.Encoding:
+    """
+    Tokenizer for model, built once per process.
+
+    Models tiktoken does not know (Gemini, Claude, ...) fall back to
+    cl100k_base, which is close enough for a usage estimate.
+    """
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    return len(get_encoder(model).encode(text or "", disallowed_special=()))
+
+
+def init_token_state(state: MutableMapping, model: Optional[str] = None):
+    """
+    Make sure the token counters exist and match state["messages"].
+
+    If the tokenizer changed (e.g. the user picked another model) the history
+    is recounted once; otherwise only messages appended without add_message
+    are counted.
+    """
+    encoding = get_encoder(model).name
+    if "messages" not in state:
+        state["messages"] = []
+    if state.get("token_encoding") != encoding or "message_tokens" not in state:
+        state["token_encoding"] = encoding
+        state["token_model"] = model
+        state["message_tokens"] = []
+        state["role_tokens"] = {}
+    state["token_model"] = model
+    _sync(state)
+
+
+def _sync(state: MutableMapping):
+    messages, counts = state["messages"], state["message_tokens"]
+    if len(counts) > len(messages):
+        # Messages were removed or replaced behind our back; start over
+        counts.clear()
+        state["role_tokens"] = {}
+    for message in messages[len(counts):]:
+        _record(state, message["role"], count_tokens(message["content"], state.get("token_model")))
+
+
+def _record(state: MutableMapping, role: str, tokens: int):
+    state["message_tokens"].append(tokens)
+    role_tokens = state["role_tokens"]
+    role_tokens[role] = role_tokens.get(role, 0) + tokens
+
+
+def add_message(state: MutableMapping, role: str, content: str) -> int:
+    """Append a chat message and record its token count. Returns the count."""
+    if "message_tokens" not in state:
+        init_token_state(state)
+    _sync(state)
+    tokens = count_tokens(content, state.get("token_model"))
+    state["messages"].append({"role": role, "content": content})
+    _record(state, role, tokens)
+    return tokens
+
+
+def clear_messages(state: MutableMapping):
+    """Drop the conversation and its token counters."""
+    state["messages"] = []
+    state["message_tokens"] = []
+    state["role_tokens"] = {}
+
+
+def total_tokens(state: MutableMapping) -> int:
+    return sum(state.get("role_tokens", {}).values())
+
+
+def tokens_by_role(state: MutableMapping) -> Dict[str, int]:
+    return dict(state.get("role_tokens", {}))
@@ -1,6 +1,10 @@
 import google.generativeai as genai
 from dotenv import load_dotenv
+import argparse
 import os
+from pathlib import Path
+
+from long_audio import TIMESTAMP_PROMPT, transcribe_long_audio
 
 load_dotenv()
 # Fetch the API key from environment variables
@@ -10,9 +14,30 @@ if GEMINI_API_KEY is None:
 
 genai.configure(api_key=GEMINI_API_KEY)
 
-your_file = genai.upload_file(path='../audio/kratos_1.mp3')
-prompt = "transribe audio only, no other text"
-model = genai.GenerativeModel('models/gemini-2.5-flash')
-response = model.generate_content([prompt, your_file])
-print(response.text)
-     
\ No newline at end of file
+MODEL_NAME = 'models/gemini-2.5-flash'
+model = genai.GenerativeModel(MODEL_NAME)
+
+
+def transcribe_file(path, prompt="transribe audio only, no other text"):
+    your_file = genai.upload_file(path=str(path))
+    response = model.generate_content([prompt, your_file])
+    genai.delete_file(your_file.name)
+    return response.text
+
+
+parser = argparse.ArgumentParser(description="Transcribe an audio file with Gemini.")
+parser.add_argument("audio_file", nargs="?", default='../audio/kratos_1.mp3')
+parser.add_argument("--long", action="store_true", help="Split on silences and transcribe chunks concurrently.")
+parser.add_argument("--workers", type=int, default=4)
+args = parser.parse_args()
+
+if args.long:
+    # Chunks are cached under ./.audio_cache; rerunning after a failure only redoes failed chunks
+    print(transcribe_long_audio(
+        Path(args.audio_file),
+        lambda chunk: transcribe_file(chunk, TIMESTAMP_PROMPT),
+        workers=args.workers,
+        cache_tag=MODEL_NAME + TIMESTAMP_PROMPT,
+    ))
+else:
+    print(transcribe_file(args.audio_file))
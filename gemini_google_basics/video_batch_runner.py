@@ -0,0 +1,126 @@
+"""
+Bounded-concurrency runner for batch Gemini video analysis.
+
+- Runs one analysis job per video on a small thread pool so uploads, the
+  PROCESSING wait and generation of different videos overlap.
+- Reports progress as jobs finish (out of order) and hands results to an
+  ordered callback so files on disk keep the input order.
+- ProviderBackoff is shared by all workers: when any call hits a 429 /
+  RESOURCE_EXHAUSTED, every worker pauses before its next request.
+"""
+
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+try:
+    from google.api_core.exceptions import ResourceExhausted
+except ImportError:
+    ResourceExhausted = None
+
+DEFAULT_WORKERS = 4
+
+# Untyped errors: a standalone 429 or the gRPC status name, not any "429" in the text
+RATE_LIMIT_RE = re.compile(r"\b429\b|RESOURCE_EXHAUSTED")
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """True for provider rate-limit errors (HTTP 429 / RESOURCE_EXHAUSTED)."""
+    if ResourceExhausted is not None and isinstance(exc, ResourceExhausted):
+        return True
+    response = getattr(exc, "response", None)
+    for code in (getattr(exc, "code", None), getattr(exc, "status_code", None), getattr(response, "status_code", None)):
+        if code == 429:
+            return True
+    return RATE_LIMIT_RE.search(str(exc)) is not None
+
+
+class ProviderBackoff:
+    """
+    Exponential backoff with jitter, shared across worker threads.
+
+    A rate-limit error from any worker pushes back a common "resume at"
+    deadline, so the whole pool slows down instead of each worker hammering
+    the provider independently.
+    """
+
+    def __init__(self, base_delay: float = 2.0, max_delay: float = 60.0, max_retries: int = 6):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the shared backoff deadline has passed."""
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _penalize(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = delay * (0.5 + random.random() / 2)
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+        return delay
+
+    def call(self, fn: Callable[..., R], *args, **kwargs) -> R:
+        """Call fn, retrying on rate-limit errors with shared backoff."""
+        attempt = 0
+        while True:
+            self.wait()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._penalize(attempt)
+                print(f"Rate limited ({e.__class__.__name__}); backing off {delay:.1f}s...")
+                attempt += 1
+
+
+def run_bounded(
+    items: Sequence[T],
+    fn: Callable[[T], R],
+    workers: int = DEFAULT_WORKERS,
+    on_progress: Optional[Callable[[int, T, Optional[R], Optional[BaseException]], None]] = None,
+    on_ordered: Optional[Callable[[int, T, Optional[R], Optional[BaseException]], None]] = None,
+) -> List[Tuple[Optional[R], Optional[BaseException]]]:
+    """
+    Run fn over items with at most `workers` jobs in flight.
+
+    on_progress is called in completion order; on_ordered is called in input
+    order as soon as every earlier item has finished. Both run on the calling
+    thread and receive (index, item, result, error).
+
+    Returns a list of (result, error) pairs in input order.
+    """
+    outcomes: Dict[int, Tuple[Optional[R], Optional[BaseException]]] = {}
+    next_ordered = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(fn, item): idx for idx, item in enumerate(items)}
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                outcome = (future.result(), None)
+            except Exception as e:
+                outcome = (None, e)
+            outcomes[idx] = outcome
+            if on_progress:
+                on_progress(idx, items[idx], *outcome)
+            while next_ordered in outcomes:
+                if on_ordered:
+                    on_ordered(next_ordered, items[next_ordered], *outcomes[next_ordered])
+                next_ordered += 1
+
+    return [outcomes[idx] for idx in range(len(items))]
@@ -0,0 +1,134 @@
+"""
+Local pre-transcode stage for Gemini video uploads.
+
+Gemini samples video at roughly 1 fps and low resolution, so uploading a
+4K/60fps source mostly ships bytes that are thrown away server-side. This
+module downsamples a video to a small "analysis profile" with ffmpeg before
+upload:
+
+- Transcodes run in a process pool, so several videos can be prepared at once.
+- Outputs are cached by source content hash + profile under ./.transcode_cache/.
+- If ffmpeg is not installed, the source file is returned unchanged.
+
+Usage:
+  transcoder = VideoTranscoder("analysis")
+  upload_path = transcoder.prepare(Path("clip.mov"))
+"""
+
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from analysis_log import file_sha256
+
+CACHE_DIR = Path(os.getenv("GEMINI_TRANSCODE_CACHE", "./.transcode_cache"))
+
+# Frame rate, height and bitrates tuned for what Gemini actually samples.
+PROFILES: Dict[str, Dict[str, object]] = {
+    # Keeps on-screen text legible and audio good enough for transcription
+    "analysis": {"height": 720, "fps": 2, "crf": 30, "maxrate": "800k", "audio_bitrate": "64k"},
+    # Smallest upload; fine for visual style / scene analysis
+    "low": {"height": 480, "fps": 1, "crf": 34, "maxrate": "300k", "audio_bitrate": "48k"},
+}
+DEFAULT_PROFILE = "analysis"
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def build_ffmpeg_command(src: Path, dst: Path, profile: Dict[str, object]) -> list:
+    """ffmpeg arguments that downsample src to the given profile (never upscales)."""
+    height = profile["height"]
+    return [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-i", str(src),
+        "-vf", f"scale=-2:'min({height},ih)',fps={profile['fps']}",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", str(profile["crf"]),
+        "-maxrate", str(profile["maxrate"]), "-bufsize", str(profile["maxrate"]),
+        "-c:a", "aac", "-b:a", str(profile["audio_bitrate"]), "-ac", "1",
+        "-movflags", "+faststart",
+        str(dst),
+    ]
+
+
+def _transcode_job(src: str, dst: str, profile: Dict[str, object]) -> str:
+    """Process-pool worker: transcode to a temp file, then rename into the cache."""
+    tmp = f"{dst}.{os.getpid()}.tmp.mp4"
+    try:
+        subprocess.run(build_ffmpeg_command(Path(src), Path(tmp), profile), check=True)
+        os.replace(tmp, dst)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return dst
+
+
+class VideoTranscoder:
+    """
+    Downsample videos to an analysis profile before upload, with caching.
+
+    prepare() is safe to call from several threads; the actual ffmpeg work is
+    spread over a process pool of `workers` processes.
+    """
+
+    def __init__(self, profile: str = DEFAULT_PROFILE, workers: int = 2, cache_dir: Path = CACHE_DIR):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown transcode profile '{profile}'. Choose from: {', '.join(PROFILES)}")
+        self.profile_name = profile
+        self.profile = PROFILES[profile]
+        self.cache_dir = Path(cache_dir)
+        self.enabled = ffmpeg_available()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._workers = workers
+        if not self.enabled:
+            print("ffmpeg not found on PATH; uploading source videos without transcoding.")
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=max(1, self._workers))
+        return self._pool
+
+    def cached_path(self, source_hash: str) -> Path:
+        return self.cache_dir / f"{source_hash}_{self.profile_name}.mp4"
+
+    def prepare(self, src: Path, source_hash: Optional[str] = None) -> Path:
+        """
+        Return the path to upload for src: a cached/new transcode, or src itself
+        if ffmpeg is unavailable, the transcode fails, or it would not be smaller.
+        """
+        src = Path(src)
+        if not self.enabled:
+            return src
+        dst = self.cached_path(source_hash or file_sha256(src))
+        if dst.exists():
+            return dst
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            self._executor().submit(_transcode_job, str(src), str(dst), self.profile).result()
+        except (subprocess.CalledProcessError, OSError) as e:
+            print(f"Transcode failed for {src.name} ({e}); uploading the source file.")
+            return src
+
+        src_size, dst_size = src.stat().st_size, dst.stat().st_size
+        if dst_size >= src_size:
+            # Already-small sources gain nothing; remember that by keeping a copy
+            shutil.copyfile(src, dst)
+            return src
+        print(f"Transcoded {src.name}: {src_size / 1e6:.1f} MB → {dst_size / 1e6:.1f} MB ({self.profile_name})")
+        return dst
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,8 +1,14 @@
 import streamlit as st
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 from groq import Groq
 
+# StreamingMarkdown lives in basics/, shared with the other chat apps
+sys.path.append(str(Path(__file__).resolve().parent.parent / "basics"))
+from stream_render import StreamingMarkdown
+
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -28,16 +34,18 @@ if st.button("Submit"):
         {"role": user_role, "content": user_content}
     ]
 
-    chat_completion = client.chat.completions.create(
+    stream = client.chat.completions.create(
         messages=messages,
         model=LLAMA3_70B,
         # Pass the parameters directly
         max_tokens=max_tokens, 
         temperature=temperature, 
         top_p=1, 
-        stream=False,  # Disable streaming for a single output
+        stream=True,  # Render tokens as they arrive
         stop=None
     )
 
-    response = chat_completion.choices[0].message.content
-    st.markdown(f"**Assistant:** {response}", unsafe_allow_html=True)
+    st.markdown("**Assistant:**")
+    with StreamingMarkdown(st.empty()) as out:
+        for chunk in stream:
+            out.write(chunk.choices[0].delta.content or "")
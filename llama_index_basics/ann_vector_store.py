@@ -0,0 +1,291 @@
+"""
+HNSW approximate-nearest-neighbor vector store for large persisted indexes.
+
+MmapVectorStore scores every stored embedding on each query, which is fine
+for a few PDFs but linear in the corpus size. HnswVectorStore keeps the same
+mmap'ed files (so the docstore, metadata filters and float16 option are
+unchanged) and adds an HNSW graph (hnswlib, via the chroma-hnswlib wheel
+already in requirements.txt) next to them:
+
+- <namespace>__vector_store.labels.npy  int64 graph label per row
+- <namespace>__vector_store.hnsw.bin    the graph
+- <namespace>__vector_store.hnsw.json   graph parameters and a digest of the
+                                         node IDs it was built for
+
+The graph is read on the first query (load_index_from_storage stays cheap)
+and rebuilt from the matrix if it is missing or does not match the rows.
+Inserts are added to the graph incrementally and deletes are marked; once
+more than REBUILD_DELETED_FRACTION of the graph is deleted it is rebuilt on
+persist. Queries with metadata filters or node_ids fall back to the exact
+scan of MmapVectorStore.
+
+Recall vs latency is tuned with M / ef_construction (graph quality, fixed at
+build time) and ef_search (per store, or per query with
+vector_store_kwargs={"ef": 128}). Note the graph lives in RAM: about
+(dim * 4 + M * 8) bytes per node. See bench_ann.py for recall@k vs QPS.
+
+Usage:
+  storage_context = load_storage_context("./storage", vector_store_cls=HnswVectorStore, ef_search=64)
+  index = load_index_from_storage(storage_context)
+  retriever = index.as_retriever(similarity_top_k=10, vector_store_kwargs={"ef": 128})
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, List, Optional
+
+import hnswlib
+import numpy as np
+from llama_index.core.vector_stores.types import VectorStoreQuery, VectorStoreQueryMode, VectorStoreQueryResult
+from pydantic import PrivateAttr
+
+from mmap_vector_store import WRITE_BLOCK_ROWS, MmapVectorStore, _base_path
+
+GRAPH_FORMAT_VERSION = 1
+REBUILD_DELETED_FRACTION = 0.3
+MIN_CAPACITY = 1024
+
+
+def _ids_digest(ids: Optional[np.ndarray]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    if ids is not None:
+        for start in range(0, len(ids), WRITE_BLOCK_ROWS):
+            digest.update(np.ascontiguousarray(ids[start:start + WRITE_BLOCK_ROWS]).tobytes())
+    return digest.hexdigest()
+
+
+class HnswVectorStore(MmapVectorStore):
+    """
+    MmapVectorStore with an HNSW graph for approximate top-k queries.
+
+    Args:
+        dtype: "float32" or "float16" storage of the mmap'ed matrix
+        M: Graph out-degree; higher improves recall and costs memory
+        ef_construction: Build-time candidate list size
+        ef_search: Query-time candidate list size (>= top k); higher is
+            slower and more accurate
+    """
+
+    M: int = 16
+    ef_construction: int = 200
+    ef_search: int = 64
+
+    _labels: Optional[np.ndarray] = PrivateAttr(default=None)
+    _new_labels: List[int] = PrivateAttr(default_factory=list)
+    _next_label: int = PrivateAttr(default=0)
+    _graph: Any = PrivateAttr(default=None)
+    _graph_deleted: int = PrivateAttr(default=0)
+    _graph_base: Optional[str] = PrivateAttr(default=None)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HnswVectorStore"
+
+    # ---- loading ---------------------------------------------------------
+
+    @classmethod
+    def from_persist_path(cls, persist_path: str, dtype: Optional[str] = None, **kwargs: Any) -> "HnswVectorStore":
+        store = super().from_persist_path(persist_path, dtype=dtype, **kwargs)
+        store._attach_labels(_base_path(persist_path))
+        return store
+
+    def _attach_labels(self, base: str):
+        """Labels only have to be unique and ascending by row; a missing or stale file is replaced."""
+        self._graph_base = base
+        info = self._graph_info(base)
+        labels = None
+        if self._base_rows and os.path.exists(base + ".labels.npy"):
+            labels = np.load(base + ".labels.npy", mmap_mode="r")
+            if len(labels) != self._base_rows:
+                labels = None
+        if labels is None:
+            labels = np.arange(self._base_rows, dtype=np.int64)
+        self._labels = labels
+        last = int(labels[-1]) + 1 if len(labels) else 0
+        self._next_label = max(info.get("next_label", 0), last, self._next_label)
+
+    @staticmethod
+    def _graph_info(base: str) -> dict:
+        try:
+            with open(base + ".hnsw.json", "r", encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return info if info.get("version") == GRAPH_FORMAT_VERSION else {}
+
+    # ---- graph -------------------------------------------------------------
+
+    @property
+    def _dim(self) -> int:
+        if self._base_rows:
+            return self._matrix.shape[1]
+        return self._new_vectors[0].shape[1] if self._new_vectors else 0
+
+    def _graph_index(self):
+        """The graph, loaded or built on first use and kept in sync afterwards."""
+        if self._graph is None and len(self):
+            if not self._load_graph():
+                self._build_graph()
+        return self._graph
+
+    def _load_graph(self) -> bool:
+        base = self._graph_base
+        if base is None or not self._base_rows or not os.path.exists(base + ".hnsw.bin"):
+            return False
+        info = self._graph_info(base)
+        if info.get("dim") != self._dim or info.get("ids_digest") != _ids_digest(self._ids):
+            return False  # written for other rows (e.g. persisted by a plain MmapVectorStore since)
+        graph = hnswlib.Index(space="ip", dim=self._dim)
+        graph.load_index(base + ".hnsw.bin", max_elements=0)
+        self._graph, self._graph_deleted = graph, info.get("deleted", 0)
+        # Apply the changes made since the graph was saved
+        self._mark_deleted(np.asarray(self._labels)[self._deleted])
+        if self._new_ids:
+            self._graph_add(np.concatenate(self._new_vectors), self._new_labels)
+        return True
+
+    def _build_graph(self):
+        graph = hnswlib.Index(space="ip", dim=self._dim)
+        graph.init_index(max_elements=max(len(self), MIN_CAPACITY), M=self.M, ef_construction=self.ef_construction)
+        self._graph, self._graph_deleted = graph, 0
+        for vectors, _, _, rows in self._live_rows():
+            if len(rows):
+                self._graph_add(vectors, np.asarray(self._labels)[rows])
+        if self._new_ids:
+            self._graph_add(np.concatenate(self._new_vectors), self._new_labels)
+
+    def _graph_add(self, vectors: np.ndarray, labels):
+        graph = self._graph
+        needed = graph.element_count + len(labels)
+        if needed > graph.max_elements:
+            graph.resize_index(max(needed, 2 * graph.max_elements))
+        graph.add_items(np.asarray(vectors, dtype=np.float32), np.asarray(labels, dtype=np.int64))
+
+    def _mark_deleted(self, labels):
+        if self._graph is None:
+            return
+        for label in labels:
+            self._graph.mark_deleted(int(label))
+            self._graph_deleted += 1
+
+    # ---- mutations -----------------------------------------------------------
+
+    def _append(self, vectors: np.ndarray, node_ids: List[str], ref_doc_ids: List[str], metadata: List[dict]):
+        super()._append(vectors, node_ids, ref_doc_ids, metadata)
+        labels = list(range(self._next_label, self._next_label + len(node_ids)))
+        self._next_label += len(node_ids)
+        self._new_labels.extend(labels)
+        if self._graph is not None:
+            self._graph_add(self._new_vectors[-1], labels)
+
+    def _track_base_deletes(self, mutate):
+        before = None if self._deleted is None else self._deleted.copy()
+        mutate()
+        if before is not None:
+            self._mark_deleted(np.asarray(self._labels)[self._deleted & ~before])
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._track_base_deletes(lambda: super(HnswVectorStore, self).delete(ref_doc_id, **delete_kwargs))
+
+    def delete_nodes(self, node_ids: Optional[List[str]] = None, filters=None, **delete_kwargs: Any) -> None:
+        self._track_base_deletes(
+            lambda: super(HnswVectorStore, self).delete_nodes(node_ids, filters, **delete_kwargs)
+        )
+
+    def _compact_new(self, keep: List[int]):
+        kept = set(keep)
+        self._mark_deleted([label for i, label in enumerate(self._new_labels) if i not in kept])
+        self._new_labels = [self._new_labels[i] for i in keep]
+        super()._compact_new(keep)
+
+    def clear(self) -> None:
+        self._track_base_deletes(lambda: super(HnswVectorStore, self).clear())
+        self._mark_deleted(self._new_labels)
+        self._new_labels = []
+
+    # ---- query -----------------------------------------------------------------
+
+    def _label_ids(self, labels: np.ndarray) -> List[str]:
+        base_labels = self._labels if self._base_rows else np.zeros(0, dtype=np.int64)
+        rows = np.searchsorted(base_labels, labels)
+        ids = []
+        for label, row in zip(labels, rows):
+            if row < len(base_labels) and base_labels[row] == label:
+                ids.append(self._ids[row].decode("utf-8"))
+            else:
+                # Rows added since the last persist: labels ascend from the first new one
+                first = self._new_labels[0]
+                pos = label - first
+                if pos >= len(self._new_labels) or self._new_labels[pos] != label:
+                    pos = self._new_labels.index(label)  # gaps left by deletes
+                ids.append(self._new_ids[pos])
+        return ids
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        restricted = query.node_ids is not None or query.filters is not None
+        if restricted or query.mode != VectorStoreQueryMode.DEFAULT or not len(self):
+            return super().query(query, **kwargs)
+        top_k = min(query.similarity_top_k, len(self))
+        graph = self._graph_index()
+        graph.set_ef(max(kwargs.get("ef", self.ef_search), top_k))
+        q = np.asarray(query.query_embedding, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        try:
+            labels, distances = graph.knn_query(q[None, :], k=top_k, num_threads=1)
+        except RuntimeError:
+            # Too few reachable live elements for k (heavily deleted graph); answer exactly
+            return super().query(query, **kwargs)
+        return VectorStoreQueryResult(
+            similarities=(1.0 - distances[0]).tolist(), ids=self._label_ids(labels[0])
+        )
+
+    # ---- persistence -------------------------------------------------------------
+
+    def persist(self, persist_path: str, fs=None) -> None:
+        base = _base_path(persist_path)
+        dirty = (
+            bool(self._new_ids)
+            or (self._deleted is not None and bool(self._deleted.any()))
+            or base != self._graph_base
+            or not os.path.exists(base + ".hnsw.bin")
+        )
+        if not dirty:
+            super().persist(persist_path, fs=fs)  # at most a dtype change; rows and labels stay
+            return
+        self._graph_index()  # bring the graph up to date before rows are renumbered
+        labels = np.concatenate([
+            np.asarray(self._labels)[~self._deleted] if self._base_rows else np.zeros(0, dtype=np.int64),
+            np.asarray(self._new_labels, dtype=np.int64),
+        ])
+        self._labels = None  # release the map before the file is replaced
+        super().persist(persist_path, fs=fs)
+        self._new_labels = []
+
+        if not self._base_rows:
+            for suffix in (".labels.npy", ".hnsw.bin", ".hnsw.json"):
+                if os.path.exists(base + suffix):
+                    os.remove(base + suffix)
+            self._graph, self._graph_deleted = None, 0
+            self._attach_labels(base)
+            return
+
+        np.save(base + ".labels.tmp.npy", labels)
+        os.replace(base + ".labels.tmp.npy", base + ".labels.npy")
+        self._attach_labels(base)
+        if self._graph_deleted > REBUILD_DELETED_FRACTION * self._graph.element_count:
+            self._build_graph()
+        self._graph.save_index(base + ".hnsw.bin.tmp")
+        os.replace(base + ".hnsw.bin.tmp", base + ".hnsw.bin")
+        info = {
+            "version": GRAPH_FORMAT_VERSION,
+            "dim": int(self._dim),
+            "M": self.M,
+            "ef_construction": self.ef_construction,
+            "next_label": self._next_label,
+            "deleted": self._graph_deleted,
+            "ids_digest": _ids_digest(self._ids),
+        }
+        with open(base + ".hnsw.json.tmp", "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        os.replace(base + ".hnsw.json.tmp", base + ".hnsw.json")
@@ -30,12 +30,15 @@ including the GEMINI_API_KEY.
 """
 from llama_index.llms.gemini import Gemini
 from llama_index.core import Settings
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader
+from llama_index.core import VectorStoreIndex
 from llama_index.core.query_engine import RetrieverQueryEngine
 from llama_index.core.retrievers import VectorIndexRetriever
 import os
 from dotenv import load_dotenv
 
+from document_loader import load_documents
+from embedding_cache import enable_embedding_cache
+
 # Load environment variables
 load_dotenv()
 
@@ -51,9 +54,12 @@ llm = Gemini(model="models/gemini-1.5-flash-001")
 
 try:
     # Load documents from a directory
-    documents = SimpleDirectoryReader('./data/istqb').load_data()
+    # Parsed once, then read from the document cache (in-process: this script
+    # has no __main__ guard for worker processes)
+    documents = load_documents('./data/istqb', workers=1)
 
-    # Create a vector store index
+    # Create a vector store index (chunks embedded before come from the local cache)
+    enable_embedding_cache()
     index = VectorStoreIndex.from_documents(documents)
 
     # the retriever is setup to retrieve the most similar document to the query
@@ -0,0 +1,138 @@
+"""
+Benchmark: exact (MmapVectorStore) vs HNSW (HnswVectorStore) retrieval.
+
+Both stores are persisted and reloaded before querying (the
+load_index_from_storage path). Reports the HNSW build time, and recall@k
+against exact search and queries per second for a range of ef_search
+values, on two corpora:
+
+- data: the bundled PDFs, chunked with the default SentenceSplitter and
+  embedded with a local feature-hashing embedder (no API key; recall is
+  measured against exact search in the same embedding space). Queries are
+  sentences taken from random chunks.
+- synthetic: a Gaussian mixture of --synthetic vectors × --dim dims, queries
+  are perturbed corpus points.
+
+Usage:
+  python bench_ann.py --synthetic 100000 --dim 384 --k 10
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+import zlib
+
+import numpy as np
+from llama_index.core import SimpleDirectoryReader
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from ann_vector_store import HnswVectorStore
+from mmap_vector_store import MmapVectorStore
+
+EF_VALUES = [16, 32, 64, 128, 256]
+
+
+def hashing_embed(texts, dim):
+    """Feature-hashed, sublinear-tf bag of words + bigrams (a stand-in for a real embedder)."""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        for token in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            h = zlib.crc32(token.encode("utf-8"))
+            vectors[row, h % dim] += 1.0 if h & 0x80000000 else -1.0
+    return np.sign(vectors) * np.log1p(np.abs(vectors))
+
+
+def data_corpus(data_dir, dim, query_count, seed=0):
+    documents = SimpleDirectoryReader(data_dir, required_exts=[".pdf"], recursive=True).load_data()
+    chunks = [n.get_content() for n in SentenceSplitter().get_nodes_from_documents(documents)]
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i in rng.choice(len(chunks), size=query_count, replace=len(chunks) < query_count):
+        sentences = [s for s in re.split(r"(?<=[.?!])\s+", chunks[i]) if len(s) > 40] or [chunks[i]]
+        queries.append(sentences[rng.integers(len(sentences))])
+    return hashing_embed(chunks, dim), hashing_embed(queries, dim)
+
+
+def synthetic_corpus(count, dim, query_count, clusters=256, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=count)] + 0.6 * rng.normal(size=(count, dim)).astype(np.float32)
+    picks = rng.choice(count, size=query_count, replace=False)
+    queries = vectors[picks] + 0.6 * rng.normal(size=(query_count, dim)).astype(np.float32)
+    return vectors, queries
+
+
+def to_nodes(vectors):
+    return [
+        TextNode(
+            id_=f"node-{i}",
+            text="",
+            embedding=vector.tolist(),
+            relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=f"doc-{i // 8}")},
+        )
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def run_queries(store, queries, k, **kwargs):
+    start = time.perf_counter()
+    results = [
+        store.query(VectorStoreQuery(query_embedding=q.tolist(), similarity_top_k=k), **kwargs).ids for q in queries
+    ]
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def bench(name, vectors, queries, k, M, ef_construction):
+    nodes = to_nodes(vectors)
+    with tempfile.TemporaryDirectory() as tmp:
+        exact_path = os.path.join(tmp, "exact", "default__vector_store.json")
+        exact = MmapVectorStore()
+        exact.add(nodes)
+        exact.persist(exact_path)
+        truth, exact_qps = run_queries(MmapVectorStore.from_persist_path(exact_path), queries, k)
+
+        hnsw_path = os.path.join(tmp, "hnsw", "default__vector_store.json")
+        store = HnswVectorStore(M=M, ef_construction=ef_construction)
+        store.add(nodes)
+        start = time.perf_counter()
+        store.persist(hnsw_path)  # builds and saves the graph
+        build_s = time.perf_counter() - start
+        store = HnswVectorStore.from_persist_path(hnsw_path)
+        run_queries(store, queries[:1], k)  # reads the graph
+
+        print(f"\n{name}: {len(vectors)} vectors × {vectors.shape[1]} dims, {len(queries)} queries, k={k}")
+        print(f"HNSW build + save (M={M}, ef_construction={ef_construction}): {build_s:.2f}s")
+        print(f"{'search':<14}{'recall@' + str(k):>10}{'QPS':>10}{'speedup':>9}")
+        print(f"{'exact':<14}{1.0:>10.3f}{exact_qps:>10.0f}{1.0:>8.1f}x")
+        for ef in EF_VALUES:
+            results, qps = run_queries(store, queries, k, ef=ef)
+            recall = np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)])
+            print(f"{'hnsw ef=' + str(ef):<14}{recall:>10.3f}{qps:>10.0f}{qps / exact_qps:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="./data")
+    parser.add_argument("--synthetic", type=int, default=100000, help="Synthetic corpus size (0 to skip)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--M", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.data_dir:
+        vectors, queries = data_corpus(args.data_dir, args.dim, args.queries)
+        bench("data/ PDFs (hashing embedder)", vectors, queries, args.k, args.M, args.ef_construction)
+    if args.synthetic:
+        vectors, queries = synthetic_corpus(args.synthetic, args.dim, args.queries)
+        bench("synthetic Gaussian mixture", vectors, queries, args.k, args.M, args.ef_construction)
+
+
+if __name__ == "__main__":
+    main()
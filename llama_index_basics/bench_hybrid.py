@@ -0,0 +1,133 @@
+"""
+Benchmark: vector-only vs BM25-only vs hybrid (RRF) retrieval on the bundled PDFs.
+
+The PDFs under --data-dir are chunked with the default SentenceSplitter and
+indexed in a VectorStoreIndex. Queries are known-item searches: a sentence
+is taken from a random chunk and reduced to a random subset of its words
+(keyword-style, as users type them); the relevant chunks are the ones that
+contain the sentence. Reports hit rate@k, precision@k, MRR and the
+per-query latency of each retriever.
+
+--embedder hashing (default) uses a local character-trigram hashing
+embedder, so no API key is needed; its absolute quality is below a real
+embedding model. --embedder openai uses text-embedding-ada-002 (through the
+embedding cache) when OPENAI_API_KEY is set.
+
+Usage:
+  python bench_hybrid.py --queries 300 --k 5
+"""
+
+import argparse
+import re
+import statistics
+import time
+import zlib
+from typing import List
+
+import numpy as np
+from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.node_parser import SentenceSplitter
+
+from document_loader import load_documents
+from hybrid_retriever import BM25Index, HybridRetriever
+
+
+class HashingEmbedding(BaseEmbedding):
+    """Feature-hashed, sublinear-tf character trigrams (a local stand-in for a real embedder)."""
+
+    embed_dim: int = 512
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.embed_dim, dtype=np.float32)
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            word = f" {word} "
+            for i in range(len(word) - 2):
+                h = zlib.crc32(word[i:i + 3].encode("utf-8"))
+                vector[h % self.embed_dim] += 1.0 if h & 0x80000000 else -1.0
+        return (np.sign(vector) * np.log1p(np.abs(vector))).tolist()
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._vector(text)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+
+def make_queries(nodes, count, seed=0):
+    """(query, relevant node IDs) pairs: a word subset of a sentence from a random chunk."""
+    rng = np.random.default_rng(seed)
+    texts = [n.get_content() for n in nodes]
+    queries = []
+    while len(queries) < count:
+        i = int(rng.integers(len(nodes)))
+        sentences = [s for s in re.split(r"(?<=[.?!])\s+", texts[i]) if len(s.split()) >= 10]
+        if not sentences:
+            continue
+        sentence = sentences[rng.integers(len(sentences))]
+        words = sentence.split()
+        keep = sorted(rng.choice(len(words), size=max(4, len(words) // 2), replace=False))
+        relevant = {nodes[j].node_id for j, text in enumerate(texts) if sentence in text}
+        queries.append((" ".join(words[j] for j in keep), relevant))
+    return queries
+
+
+def evaluate(name, retrieve, queries, k):
+    hits, precision, rr, latency = [], [], [], []
+    for query, relevant in queries:
+        start = time.perf_counter()
+        ids = retrieve(query)[:k]
+        latency.append((time.perf_counter() - start) * 1000)
+        ranks = [rank for rank, node_id in enumerate(ids, start=1) if node_id in relevant]
+        hits.append(bool(ranks))
+        precision.append(len(ranks) / k)
+        rr.append(1 / ranks[0] if ranks else 0.0)
+    print(
+        f"{name:<10}{np.mean(hits):>10.3f}{np.mean(precision):>10.3f}{np.mean(rr):>8.3f}"
+        f"{statistics.median(latency):>10.2f}{np.percentile(latency, 95):>10.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="./data")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--embedder", choices=["hashing", "openai"], default="hashing")
+    args = parser.parse_args()
+
+    if args.embedder == "openai":
+        from llama_index.embeddings.openai import OpenAIEmbedding
+
+        from embedding_cache import enable_embedding_cache
+
+        Settings.embed_model = OpenAIEmbedding()
+        enable_embedding_cache()
+    else:
+        Settings.embed_model = HashingEmbedding()
+
+    documents = load_documents(args.data_dir, required_exts=[".pdf"], recursive=True)
+    nodes = SentenceSplitter().get_nodes_from_documents(documents)
+    start = time.perf_counter()
+    index = VectorStoreIndex(nodes)
+    embed_s = time.perf_counter() - start
+    start = time.perf_counter()
+    bm25 = BM25Index.from_index(index)
+    bm25_s = time.perf_counter() - start
+    queries = make_queries(nodes, args.queries)
+
+    vector = index.as_retriever(similarity_top_k=args.k)
+    hybrid = HybridRetriever(index, bm25, similarity_top_k=args.k)
+    print(f"{len(documents)} pages, {len(nodes)} chunks, {len(queries)} queries, k={args.k}, {args.embedder} embedder")
+    print(f"index build: embeddings {embed_s:.2f}s, BM25 {bm25_s * 1000:.0f} ms ({len(bm25.term_ids)} terms)")
+    print(f"{'retriever':<10}{'hit@' + str(args.k):>10}{'P@' + str(args.k):>10}{'MRR':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    evaluate("vector", lambda q: [n.node.node_id for n in vector.retrieve(q)], queries, args.k)
+    evaluate("bm25", lambda q: [node_id for node_id, _ in bm25.top_k(q, args.k)], queries, args.k)
+    evaluate("hybrid", lambda q: [n.node.node_id for n in hybrid.retrieve(q)], queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: JSON SimpleVectorStore vs MmapVectorStore persistence.
+
+Builds a synthetic store (random embeddings, 4 chunks per document), persists
+it in both formats, then loads each one in a fresh subprocess and reports
+load time, the first query's latency and the process's RSS growth after the
+load and after the query. No API key needed.
+
+Usage:
+  python bench_vector_store.py --nodes 10000 --dim 768
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from mmap_vector_store import MmapVectorStore
+
+
+def synthetic_nodes(count, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dim)).astype(np.float32)
+    for i in range(count):
+        yield TextNode(
+            id_=f"node-{i:08d}",
+            text="",
+            embedding=vectors[i].tolist(),
+            metadata={"file_name": f"doc-{i // 4}.pdf", "page_label": str(i % 4 + 1)},
+            relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=f"doc-{i // 4}")},
+        )
+
+
+def rss_mb():
+    """Current resident set size (Linux); peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux, bytes on macOS
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def load_and_query(kind, path, dim):
+    """Runs in the child process; prints a JSON line of measurements."""
+    baseline = rss_mb()
+    start = time.perf_counter()
+    store = SimpleVectorStore.from_persist_path(path) if kind == "json" else MmapVectorStore.from_persist_path(path)
+    load_s = time.perf_counter() - start
+    loaded_mb = rss_mb() - baseline
+    query = VectorStoreQuery(query_embedding=np.ones(dim).tolist(), similarity_top_k=10)
+    start = time.perf_counter()
+    store.query(query)
+    query_s = time.perf_counter() - start
+    # For mmap this includes the page cache mapped in by the scan (shared, evictable)
+    queried_mb = rss_mb() - baseline
+    print(json.dumps({"load_s": load_s, "query_s": query_s, "loaded_mb": loaded_mb, "queried_mb": queried_mb}))
+
+
+def measure(kind, path, dim):
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", kind, path, "--dim", str(dim)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--child", nargs=2, metavar=("KIND", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return load_and_query(args.child[0], args.child[1], args.dim)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {
+            "json": os.path.join(tmp, "json", "default__vector_store.json"),
+            "mmap float32": os.path.join(tmp, "f32", "default__vector_store.json"),
+            "mmap float16": os.path.join(tmp, "f16", "default__vector_store.json"),
+        }
+        stores = {"json": SimpleVectorStore(), "mmap float32": MmapVectorStore(), "mmap float16": MmapVectorStore(dtype="float16")}
+        nodes = list(synthetic_nodes(args.nodes, args.dim))
+        print(f"{args.nodes} nodes × {args.dim} dims")
+        print(f"{'format':<14}{'on disk':>10}{'persist':>10}{'load':>10}{'1st query':>11}{'RSS load':>11}{'+query':>10}")
+        for name, store in stores.items():
+            store.add(nodes)
+            start = time.perf_counter()
+            store.persist(paths[name])
+            persist_s = time.perf_counter() - start
+            folder = os.path.dirname(paths[name])
+            size_mb = sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder)) / 1e6
+            result = measure("json" if name == "json" else "mmap", paths[name], args.dim)
+            print(
+                f"{name:<14}{size_mb:>8.1f}MB{persist_s:>9.2f}s{result['load_s']:>9.3f}s"
+                f"{result['query_s'] * 1000:>9.1f}ms{result['loaded_mb']:>9.1f}MB{result['queried_mb']:>8.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,16 +6,17 @@
 # pipenv install llama_index.vector_stores.chroma
 # pip install llama-index-llms-gemini
 
+import argparse
 import chromadb
-from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.core import StorageContext 
 from llama_index.llms.openai import OpenAI
 from llama_index.core import Settings
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader
 from llama_index.llms.gemini import Gemini
 from dotenv import load_dotenv
 import os
 
+from chroma_ingest import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, attach_index, ingest_documents
+from document_loader import load_documents
+
 load_dotenv()   
 api_key = os.getenv("GEMINI_API_KEY")
 os.environ["GOOGLE_API_KEY"] = api_key
@@ -37,27 +38,42 @@ Settings.llm = Gemini(
     context_window=context_window)
 
 
-documents = SimpleDirectoryReader("./data").load_data()
+def main():
+    parser = argparse.ArgumentParser(description="Ingest ./data into ChromaDB and query it.")
+    parser.add_argument("question", nargs="?", default="What The Potential Benefits of Social Media Use Among Children and Adolescents?")
+    parser.add_argument("--query-only", action="store_true", help="Query the existing collection without loading ./data")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Chunks per embedding call / upsert")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Embedding batches in flight")
+    args = parser.parse_args()
+
+    # initialize client, setting path to save data
+    db = chromadb.PersistentClient(path="./chroma_db")
+
+    # create collection
+    chroma_collection = db.get_or_create_collection("quickstart")
+
+    if not args.query_only:
+        # PDFs are parsed in worker processes on the first run, then read from the document cache
+        documents = load_documents("./data")
 
-# print the number of documents
-print(f"Number of documents: {len(documents)}")
+        # print the number of documents
+        print(f"Number of documents: {len(documents)}")
 
-# initialize client, setting path to save data
-db = chromadb.PersistentClient(path="./chroma_db")
+        # chunks already in the collection (same content → same ID) are skipped, so reruns don't duplicate vectors
+        report = ingest_documents(
+            documents, chroma_collection, batch_size=args.batch_size, concurrency=args.concurrency
+        )
+        print(report.summary())
 
-# create collection
-chroma_collection = db.get_or_create_collection("quickstart")
+    # attach the index to the collection (no documents are re-read or re-embedded here)
+    index = attach_index(chroma_collection)
 
-# assign chroma as the vector_store to the context
-vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-storage_context = StorageContext.from_defaults(vector_store=vector_store)
+    # create a query engine and query
+    query_engine = index.as_query_engine()
+    response = query_engine.query(args.question)
+    print(response)
 
-# create your index
-index = VectorStoreIndex.from_documents(
-    documents, storage_context=storage_context
-)
 
-# create a query engine and query
-query_engine = index.as_query_engine()
-response = query_engine.query("What The Potential Benefits of Social Media Use Among Children and Adolescents?")
-print(response)
\ No newline at end of file
+if __name__ == "__main__":
+    # Guarded: document_loader parses files in worker processes
+    main()
@@ -0,0 +1,182 @@
+"""
+Idempotent, batched ingestion into a Chroma collection.
+
+VectorStoreIndex.from_documents(documents, storage_context=...) re-embeds
+and re-inserts every chunk on every run, so a persistent collection fills
+up with duplicates. ingest_documents() instead:
+
+- gives documents stable IDs (<file name>#<n>) and node IDs derived from a
+  content hash (document ID + chunk text), so the same chunk always maps to
+  the same Chroma ID;
+- looks the IDs up in the collection in bulk and skips chunks already there;
+- embeds the remaining chunks in batches of `batch_size`, `concurrency`
+  batches at a time, upserting each batch as soon as it is embedded (an
+  interrupted run keeps its finished batches);
+- once everything is upserted, deletes the chunks of the ingested files
+  that this run did not produce (an edited or shortened file leaves no
+  stale chunks behind). Files not passed in are left alone.
+
+attach_index() opens an existing collection for querying without reading
+any documents.
+
+Usage:
+  report = ingest_documents(documents, chroma_collection, batch_size=100, concurrency=4)
+  index = attach_index(chroma_collection)
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import BaseNode, MetadataMode, NodeRelationship
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CONCURRENCY = 4
+LOOKUP_BATCH_SIZE = 1000
+
+
+@dataclass
+class IngestReport:
+    documents: int = 0
+    nodes: int = 0
+    skipped: int = 0
+    embedded: int = 0
+    removed: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.documents} documents → {self.nodes} chunks: "
+            f"{self.skipped} already in the collection, {self.embedded} embedded and upserted, "
+            f"{self.removed} stale removed"
+        )
+
+
+def assign_document_ids(documents: Sequence):
+    """<file name>#<n> document IDs (in place), so re-reading the same files gives the same IDs."""
+    per_file: Dict[str, int] = {}
+    for document in documents:
+        name = document.metadata.get("file_name") or document.doc_id
+        n = per_file.get(name, 0)
+        per_file[name] = n + 1
+        document.id_ = f"{name}#{n}"
+
+
+def assign_node_ids(nodes: Sequence[BaseNode]):
+    """Content-hash node IDs (document ID + chunk text), in place; prev/next links follow."""
+    renamed: Dict[str, str] = {}
+    seen: Dict[str, int] = {}
+    for node in nodes:
+        key = hashlib.sha256(f"{node.ref_doc_id}\0{node.get_content()}".encode("utf-8")).hexdigest()[:32]
+        # Repeated chunks in one document (headers, boilerplate) still get distinct IDs
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        renamed[node.node_id] = key if occurrence == 0 else f"{key}-{occurrence}"
+        node.id_ = renamed[node.node_id]
+    for node in nodes:
+        for relation in (NodeRelationship.PREVIOUS, NodeRelationship.NEXT):
+            info = node.relationships.get(relation)
+            if info is not None and info.node_id in renamed:
+                info.node_id = renamed[info.node_id]
+
+
+def existing_ids(collection, ids: Sequence[str], batch_size: int = LOOKUP_BATCH_SIZE) -> Set[str]:
+    found: Set[str] = set()
+    for start in range(0, len(ids), batch_size):
+        result = collection.get(ids=list(ids[start:start + batch_size]), include=[])
+        found.update(result["ids"])
+    return found
+
+
+def stale_ids(collection, documents: Sequence, keep: Set[str], batch_size: int = LOOKUP_BATCH_SIZE) -> List[str]:
+    """IDs stored for the documents' files (or document IDs, for documents without a file) that are not in keep."""
+    file_names = sorted({d.metadata["file_name"] for d in documents if d.metadata.get("file_name")})
+    document_ids = sorted({d.doc_id for d in documents if not d.metadata.get("file_name")})
+    stale: Set[str] = set()
+    for key, values in (("file_name", file_names), ("document_id", document_ids)):
+        for start in range(0, len(values), batch_size):
+            result = collection.get(where={key: {"$in": values[start:start + batch_size]}}, include=[])
+            stale.update(node_id for node_id in result["ids"] if node_id not in keep)
+    return sorted(stale)
+
+
+def upsert_nodes(collection, nodes: Sequence[BaseNode], flat_metadata: bool = True):
+    """Bulk upsert of embedded nodes, stored the way ChromaVectorStore.add stores them."""
+    metadatas = []
+    for node in nodes:
+        metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=flat_metadata)
+        metadatas.append({key: ("" if value is None else value) for key, value in metadata.items()})
+    collection.upsert(
+        ids=[node.node_id for node in nodes],
+        embeddings=[node.get_embedding() for node in nodes],
+        metadatas=metadatas,
+        documents=[node.get_content(metadata_mode=MetadataMode.NONE) for node in nodes],
+    )
+
+
+def _batches(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def ingest_documents(
+    documents: Sequence,
+    collection,
+    embed_model=None,
+    transformations: Optional[list] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> IngestReport:
+    """
+    Chunk, embed and upsert documents that are not in the collection yet, then drop the ingested
+    files' chunks that are no longer produced.
+
+    Args:
+        documents: Loaded documents (e.g. SimpleDirectoryReader(...).load_data())
+        collection: Chroma collection
+        embed_model: Defaults to Settings.embed_model
+        transformations: Node parser / extractors; defaults to Settings.transformations
+        batch_size: Chunks per embedding call and per upsert
+        concurrency: Embedding batches in flight at once
+
+    Returns:
+        IngestReport with chunk counts.
+    """
+    embed_model = embed_model or Settings.embed_model
+    assign_document_ids(documents)
+    nodes = run_transformations(list(documents), transformations or Settings.transformations)
+    assign_node_ids(nodes)
+    report = IngestReport(documents=len(documents), nodes=len(nodes))
+
+    present = existing_ids(collection, [node.node_id for node in nodes])
+    pending = [node for node in nodes if node.node_id not in present]
+    report.skipped = len(nodes) - len(pending)
+
+    def embed(batch: List[BaseNode]) -> List[BaseNode]:
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in batch]
+        for node, embedding in zip(batch, embed_model.get_text_embedding_batch(texts)):
+            node.embedding = embedding
+        return batch
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(embed, batch) for batch in _batches(pending, batch_size)]
+        for future in as_completed(futures):
+            batch = future.result()
+            upsert_nodes(collection, batch)
+            report.embedded += len(batch)
+
+    # Only after the new chunks are in, so an interrupted run never loses a file's chunks
+    stale = stale_ids(collection, documents, {node.node_id for node in nodes})
+    for batch in _batches(stale, LOOKUP_BATCH_SIZE):
+        collection.delete(ids=batch)
+    report.removed = len(stale)
+    return report
+
+
+def attach_index(collection) -> VectorStoreIndex:
+    """Query-only index over an existing collection (nothing is loaded or embedded)."""
+    return VectorStoreIndex.from_vector_store(ChromaVectorStore(chroma_collection=collection))
@@ -1,19 +1,22 @@
 # This code does the following:
 # 1. It reads the documents from the data folder and then loads the documents into the VectorStoreIndex.
 # 2. Creates a PromptTemplate object with the prompt string.
-# 3. Creates an Vector Index Retriever object with the index and similarity_top_k=5. (Data ingested from folder)
-# 4. Creates a QueryPipeline object and adds the llm, prompttemplate, reranker, and summarizer modules.
+# 3. Creates a hybrid (vector + BM25) retriever over the index with similarity_top_k=5. (Data ingested from folder)
+# 4. Creates a QueryPipeline object and adds the llm, prompttemplate, (optional) reranker, and summarizer modules.
 # 5. Adds links between the modules to build the pipeline sequence.
 # 6. Runs the pipeline 
 from llama_index.core.query_pipeline import QueryPipeline
-from llama_index.postprocessor.cohere_rerank import CohereRerank
 from llama_index.core.response_synthesizers import TreeSummarize
 from llama_index.core import PromptTemplate
 from llama_index.llms.openai import OpenAI
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader
+from llama_index.core import VectorStoreIndex
 from dotenv import load_dotenv
 import os 
 
+from document_loader import load_documents
+from embedding_cache import enable_embedding_cache
+from hybrid_retriever import hybrid_retriever
+
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 os.environ["OPENAI_API_KEY"] = api_key
@@ -34,11 +37,11 @@ print(f"Attempting to access file at: {pdf_path}")
 if not os.path.exists(pdf_path):
     raise FileNotFoundError(f"The file {pdf_path} does not exist.")
 
-# If the file exists, proceed with loading it
-from llama_index.core import SimpleDirectoryReader
-
-documents = SimpleDirectoryReader(input_files=[pdf_path]).load_data()
+# If the file exists, proceed with loading it (parsed once, then read from the document cache)
+documents = load_documents(input_files=[pdf_path])
 
+# Chunks embedded by an earlier run are read from the local embedding cache
+enable_embedding_cache()
 index = VectorStoreIndex.from_documents(documents)
 
 # Print the number of documents
@@ -50,11 +53,12 @@ prompt_tmpl = PromptTemplate(prompt_str)
 
 llm = OpenAI(model="gpt-3.5-turbo")
 
-retriever = index.as_retriever(similarity_top_k=5)  # configure retriever with top_k=5
+# Vector search and BM25 keyword search fused by reciprocal rank, with top_k=5
+retriever = hybrid_retriever(index, similarity_top_k=5)
 
-# Rerank provides a powerful semantic boost to the search quality of any keyword or vector search
-# system without requiring any overhaul or replacement
-reranker = CohereRerank()   
+# The hybrid retriever already catches the keyword matches the Cohere reranker used to fix up,
+# so the remote rerank call (a network round-trip per query) is opt-in: USE_COHERE_RERANK=1
+use_reranker = os.getenv("USE_COHERE_RERANK") == "1"
 
 # TreeSummerize: When provided with text nodes and a query, recursively merges them (like a tree - bottoms up) 
 # and returns the root node as the result. 
@@ -64,22 +68,29 @@ summarizer = TreeSummarize(llm=llm)
 p = QueryPipeline(verbose=True)
 
 # add modules (LLM, prompt template, retreiver object, summarizer and reranker) to the pipeline
-p.add_modules(
-		{
-    	"llm": llm,
-    	"prompt_tmpl": prompt_tmpl,
-    	"retriever": retriever,
-    	"summarizer": summarizer,
-    	"reranker": reranker
-	}
-)
+modules = {
+    "llm": llm,
+    "prompt_tmpl": prompt_tmpl,
+    "retriever": retriever,
+    "summarizer": summarizer,
+}
+if use_reranker:
+    from llama_index.postprocessor.cohere_rerank import CohereRerank
+
+    # Rerank provides a powerful semantic boost to the search quality of any keyword or vector search
+    # system without requiring any overhaul or replacement
+    modules["reranker"] = CohereRerank()
+p.add_modules(modules)
 
 # add links between the modules to create the sequence of the pipeline
 p.add_link("prompt_tmpl", "llm")   
 p.add_link("llm", "retriever")
-p.add_link("retriever", "reranker", dest_key="nodes")   
-p.add_link("llm", "reranker", dest_key="query_str")     
-p.add_link("reranker", "summarizer", dest_key="nodes")
+if use_reranker:
+    p.add_link("retriever", "reranker", dest_key="nodes")   
+    p.add_link("llm", "reranker", dest_key="query_str")     
+    p.add_link("reranker", "summarizer", dest_key="nodes")
+else:
+    p.add_link("retriever", "summarizer", dest_key="nodes")
 p.add_link("llm", "summarizer", dest_key="query_str")
 
 # run the pipeline
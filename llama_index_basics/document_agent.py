@@ -14,6 +14,9 @@ from llama_index.llms.gemini import Gemini
 from llama_index.core import Settings
 import os
 
+from embedding_cache import enable_embedding_cache
+from lazy_document_tools import lazy_document_tools
+
 # Load the OpenAI API Key into the environment variable named OPENAI_API_KEY
 load_dotenv()   
 api_key = os.getenv("OPENAI_API_KEY")
@@ -22,9 +25,11 @@ os.environ["OPENAI_API_KEY"] = api_key
 # Set up model configuration
 Settings.llm = OpenAI(temperature=0.5,
     model="gpt-3.5-turbo") 
+# Chunks embedded by an earlier run are read from the local embedding cache
+enable_embedding_cache()
 
 
-# Load 3 PDF documents on mental Haalth from the folder, using SimpleDirectoryReader
+# 3 PDF documents on the Drake / Kendrick beef
 
 titles = [
     "drake_kendrick_beef", 
@@ -32,31 +37,18 @@ titles = [
     "kendrick"
     ]
 
-documents = {}
-for title in titles:
-    documents[title] = SimpleDirectoryReader(input_files=[f"data/drake_beef/{title}.pdf"]).load_data()
-print(f"loaded documents with {len(documents)} documents")
-
-# documents = SimpleDirectoryReader(documents).load_data()
-# index = VectorStoreIndex.from_documents(documents)
-
-# query_engine = index.as_query_engine()
-
-# # Ask a question
-# response = query_engine.query("why did drake and kendrick beef?")
-# print(response)
+# One tool per document. Nothing is parsed, embedded or loaded here: a tool's index is
+# loaded from ./storage/document_agent/<title> (or built and persisted there, parsing the
+# PDF through the document cache) when the agent first routes a query to it, and loaded
+# indexes are kept in an LRU capped at 512 MB
 
-# Iteratively, build three Tools - one for each document, with theirr corresponding retreiver objects
-
-query_engine_tools = []
 response_synthesizer = get_response_synthesizer(response_mode=ResponseMode.COMPACT)
-for title in titles:
 
-    # build vector index
-    vector_index = VectorStoreIndex.from_documents(documents[title])
+
+def build_query_engine(vector_index):
     retriever = VectorIndexRetriever(index=vector_index, similarity_top_k=3)
     # define query engines
-    query_engine = RetrieverQueryEngine(
+    return RetrieverQueryEngine(
         retriever=retriever,
         node_postprocessors=[SimilarityPostprocessor(similarity_cutoff=0.7, # filter nodes with similarity score below the cutoff 
                                                     filter_empty=True,  # filter empty nodes
@@ -66,16 +58,14 @@ for title in titles:
         response_synthesizer=response_synthesizer,                                                 
     )
 
-    # define tools for each document 
-    query_engine_tools += [
-        QueryEngineTool(
-            query_engine=query_engine,
-            metadata=ToolMetadata(
-                name=f"vector_tool_{title}",
-                description=f"Useful for retrieving specific context related to {title}"
-            ),
-        )
-        ] 
+
+query_engine_tools = lazy_document_tools(
+    {title: [f"data/drake_beef/{title}.pdf"] for title in titles},
+    build_query_engine,
+    persist_root="./storage/document_agent",
+    max_bytes=512 * 1024 * 1024,
+    description=lambda title: f"Useful for retrieving specific context related to {title}",
+)
 
 # build agent
 agent = OpenAIAgent.from_tools(
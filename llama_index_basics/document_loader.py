@@ -0,0 +1,214 @@
+"""
+Parallel, cached document loading (a drop-in for SimpleDirectoryReader.load_data).
+
+SimpleDirectoryReader(...).load_data() re-parses every PDF on every run, one
+file at a time, and returns only when the last file is done. This module:
+
+- caches each file's parsed documents under CACHE_DIR, keyed by the sha256
+  of the file content (gzip'd JSON: text, parser metadata and the metadata
+  exclusion lists); file-level metadata (path, size, dates) is refreshed on
+  every load, so a moved or copied file still hits;
+- parses cache misses in a process pool (PDF parsing is CPU-bound Python);
+- streams: iter_file_documents() yields (path, documents) per file as soon
+  as it is available (cache hits first, then files in completion order), so
+  chunking and embedding can start while later files are still parsing.
+
+Documents get fresh random IDs, as with SimpleDirectoryReader. Files that
+fail to parse (or contain no text) are not cached. Scripts that use a
+process pool must guard their entry point with if __name__ == "__main__"
+(required on macOS/Windows, where workers re-import the main module).
+
+Usage:
+  documents = load_documents("./data")
+  for path, documents in iter_documents("./data", required_exts=[".pdf"]):
+      ...
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from llama_index.core import Document, SimpleDirectoryReader
+from llama_index.core.readers.file.base import default_file_metadata_func
+
+CACHE_DIR = Path(os.getenv("LLAMA_PARSE_CACHE", Path.home() / ".cache" / "llama_index_basics" / "documents"))
+CACHE_VERSION = 1
+
+
+def file_sha256(path: Path, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentCache:
+    """Parsed documents per file content hash, one gzip'd JSON file each."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+
+    def _path(self, sha: str) -> Path:
+        return self.cache_dir / sha[:2] / f"{sha}.v{CACHE_VERSION}.json.gz"
+
+    def contains(self, sha: str) -> bool:
+        return self._path(sha).exists()
+
+    def get(self, sha: str) -> Optional[List[dict]]:
+        try:
+            with gzip.open(self._path(sha), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None  # missing, or a truncated write from an interrupted run
+
+    def put(self, sha: str, records: List[dict]):
+        path = self._path(sha)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(records, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+
+def _to_record(document: Document) -> dict:
+    return {
+        "text": document.text,
+        "metadata": document.metadata,
+        "excluded_embed_metadata_keys": document.excluded_embed_metadata_keys,
+        "excluded_llm_metadata_keys": document.excluded_llm_metadata_keys,
+    }
+
+
+def _from_record(record: dict, file_metadata: dict) -> Document:
+    metadata = dict(record["metadata"])
+    metadata.update(file_metadata)
+    return Document(
+        text=record["text"],
+        metadata=metadata,
+        excluded_embed_metadata_keys=record["excluded_embed_metadata_keys"],
+        excluded_llm_metadata_keys=record["excluded_llm_metadata_keys"],
+    )
+
+
+def parse_file(path: str) -> List[dict]:
+    """Parse one file with SimpleDirectoryReader's readers (runs in a worker process)."""
+    return [_to_record(document) for document in SimpleDirectoryReader(input_files=[path]).load_data()]
+
+
+def iter_file_documents(
+    paths: Iterable,
+    workers: Optional[int] = None,
+    cache_dir=None,
+) -> Iterator[Tuple[Path, List[Document]]]:
+    """
+    Yield (path, documents) for each file as soon as it is loaded.
+
+    Args:
+        paths: Files to load
+        workers: Parser processes; defaults to the CPU count (1 parses in-process)
+        cache_dir: Parsed-document cache; defaults to CACHE_DIR, False disables it
+
+    Yields:
+        (path, documents) per file: cache hits in input order, then parsed
+        files in completion order.
+    """
+    paths = [Path(p) for p in paths]
+    cache = None if cache_dir is False else DocumentCache(cache_dir or CACHE_DIR)
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    def documents(path: Path, records: List[dict]) -> List[Document]:
+        file_metadata = default_file_metadata_func(str(path))
+        return [_from_record(record, file_metadata) for record in records]
+
+    def parsed(path: Path, sha: Optional[str], records: List[dict]):
+        if cache is not None and records:
+            cache.put(sha, records)
+        return path, documents(path, records)
+
+    hits: List[Tuple[Path, str]] = []
+    misses: List[Tuple[Path, Optional[str]]] = []
+    for path in paths:
+        sha = file_sha256(path) if cache is not None else None
+        (hits if cache is not None and cache.contains(sha) else misses).append((path, sha))
+
+    # Start parsing the misses before handing out the hits
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(misses))) if workers > 1 and len(misses) > 1 else None
+    try:
+        futures = {pool.submit(parse_file, str(path)): (path, sha) for path, sha in misses} if pool else {}
+        for path, sha in hits:
+            records = cache.get(sha)
+            if records is None:  # unreadable entry
+                yield parsed(path, sha, parse_file(str(path)))
+            else:
+                yield path, documents(path, records)
+        if pool is None:
+            for path, sha in misses:
+                yield parsed(path, sha, parse_file(str(path)))
+        for future in as_completed(futures):
+            path, sha = futures[future]
+            yield parsed(path, sha, future.result())
+    finally:
+        if pool is not None:
+            # A consumer that stops early should not wait for the remaining files
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def list_files(
+    input_dir=None,
+    input_files: Optional[Sequence] = None,
+    required_exts: Optional[Sequence[str]] = None,
+    recursive: bool = False,
+) -> List[Path]:
+    """The files SimpleDirectoryReader would load, in its order."""
+    reader = SimpleDirectoryReader(
+        input_dir=input_dir,
+        input_files=list(input_files) if input_files is not None else None,
+        required_exts=list(required_exts) if required_exts else None,
+        recursive=recursive,
+    )
+    return [Path(p) for p in reader.input_files]
+
+
+def iter_documents(
+    input_dir=None,
+    input_files: Optional[Sequence] = None,
+    required_exts: Optional[Sequence[str]] = None,
+    recursive: bool = False,
+    workers: Optional[int] = None,
+    cache_dir=None,
+) -> Iterator[Tuple[Path, List[Document]]]:
+    """iter_file_documents() over the files of a folder (or an explicit file list)."""
+    files = list_files(input_dir, input_files, required_exts, recursive)
+    return iter_file_documents(files, workers=workers, cache_dir=cache_dir)
+
+
+def load_documents(
+    input_dir=None,
+    input_files: Optional[Sequence] = None,
+    required_exts: Optional[Sequence[str]] = None,
+    recursive: bool = False,
+    workers: Optional[int] = None,
+    cache_dir=None,
+) -> List[Document]:
+    """
+    All documents, in SimpleDirectoryReader's file order.
+
+    Args:
+        input_dir: Folder to load (or use input_files)
+        input_files: Explicit list of files
+        required_exts: Only load these extensions, e.g. [".pdf"]
+        recursive: Include sub-folders
+        workers: Parser processes; defaults to the CPU count
+        cache_dir: Parsed-document cache; defaults to CACHE_DIR, False disables it
+
+    Returns:
+        The documents of every file, file by file.
+    """
+    files = list_files(input_dir, input_files, required_exts, recursive)
+    by_file: Dict[Path, List[Document]] = dict(iter_file_documents(files, workers=workers, cache_dir=cache_dir))
+    return [document for path in files for document in by_file[path]]
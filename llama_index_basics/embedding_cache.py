@@ -0,0 +1,227 @@
+"""
+Persistent, content-addressed embedding cache shared by the llama_index scripts.
+
+Every script here builds its index with VectorStoreIndex.from_documents(),
+so each run re-embeds the same PDF chunks through the embedding API.
+CachedEmbedding wraps the configured embed model and stores vectors in one
+SQLite file:
+
+- keyed by sha256(model settings + chunk text): any script that chunks the
+  same text with the same model (name, dimensions, ...) gets the stored
+  vector, and a different model or setting never does;
+- lookups are batched (one SELECT per LOOKUP_BATCH_SIZE texts) and only
+  the misses are sent to the wrapped model, in its own batch size;
+- vectors are stored as float32 blobs; the file is capped at `max_bytes`
+  and the least recently used entries are evicted past the cap;
+- WAL mode, so several scripts (or threads) can share the file.
+
+The default location is ~/.cache/llama_index_basics/embeddings.sqlite
+(override with LLAMA_EMBED_CACHE). Query embeddings are not cached.
+
+Usage:
+  from embedding_cache import enable_embedding_cache
+  enable_embedding_cache()  # wraps Settings.embed_model
+  index = VectorStoreIndex.from_documents(documents)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import Field, PrivateAttr
+
+CACHE_PATH = Path(os.getenv("LLAMA_EMBED_CACHE", Path.home() / ".cache" / "llama_index_basics" / "embeddings.sqlite"))
+DEFAULT_MAX_BYTES = 1 << 30  # 1 GiB of vectors
+LOOKUP_BATCH_SIZE = 500  # stays under SQLite's host parameter limit
+EVICT_TO_FRACTION = 0.9
+# Fields that do not change the vectors a model returns
+TRANSPORT_FIELDS = {
+    "api_key", "api_base", "api_version", "embed_batch_size", "num_workers", "callback_manager",
+    "embeddings_cache", "rate_limiter", "timeout", "max_retries", "reuse_client", "default_headers",
+    "http_client", "async_http_client", "azure_endpoint", "azure_deployment", "class_name",
+}
+
+
+def model_fingerprint(embed_model: BaseEmbedding) -> str:
+    """Class name + the settings that determine the vectors (model name, dimensions, ...)."""
+    settings = {k: v for k, v in embed_model.to_dict().items() if k not in TRANSPORT_FIELDS}
+    return f"{embed_model.class_name()}:{json.dumps(settings, sort_keys=True, default=str)}"
+
+
+class EmbeddingCache:
+    """
+    SQLite store of float32 vectors keyed by (model fingerprint, text) hash.
+
+    Args:
+        path: SQLite file (created with its folder)
+        max_bytes: Cap on stored vector bytes; least recently used entries are evicted
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, last_used INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def key(fingerprint: str, text: str) -> bytes:
+        return hashlib.sha256(f"{fingerprint}\0{text}".encode("utf-8")).digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, Embedding]:
+        """Stored vectors for the keys that are present; marks them as recently used."""
+        found: Dict[bytes, Embedding] = {}
+        now = time.time_ns()
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = list(keys[start:start + LOOKUP_BATCH_SIZE])
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+        return found
+
+    def put_many(self, items: Dict[bytes, Embedding]):
+        if not items:
+            return
+        now = time.time_ns()
+        rows = []
+        for key, vector in items.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            # Sizes of keys already stored: a rewrite replaces them rather than adding to the total
+            replaced = 0
+            keys = list(items)
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchone()[0]
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+            self._total_bytes += sum(row[2] for row in rows) - replaced
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is at EVICT_TO_FRACTION of the cap."""
+        # Recount: other processes share the file
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        excess = total - int(self.max_bytes * EVICT_TO_FRACTION)
+        if excess > 0:
+            victims, freed = [], 0
+            for key, size in self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_used"):
+                victims.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+            self._conn.commit()
+            total -= freed
+        self._total_bytes = total
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Embed model wrapper that serves text embeddings from an EmbeddingCache.
+
+    Args:
+        embed_model: The model that computes cache misses
+        cache: EmbeddingCache; defaults to one at CACHE_PATH
+    """
+
+    embed_model: BaseEmbedding
+    # Texts looked up per call; the wrapped model batches the misses with its own size
+    embed_batch_size: int = Field(default=1000, gt=0)
+    hits: int = 0
+    misses: int = 0
+
+    _cache: EmbeddingCache = PrivateAttr()
+    _fingerprint: str = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: Optional[EmbeddingCache] = None, **kwargs: Any):
+        super().__init__(embed_model=embed_model, model_name=embed_model.model_name, **kwargs)
+        self._cache = cache if cache is not None else EmbeddingCache()
+        self._fingerprint = model_fingerprint(embed_model)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _lookup(self, texts: List[str]):
+        keys = [EmbeddingCache.key(self._fingerprint, text) for text in texts]
+        found = self._cache.get_many(list(dict.fromkeys(keys)))
+        missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in found))
+        return keys, found, missing
+
+    def _store(self, keys, found, missing: List[str], embeddings: List[Embedding]) -> List[Embedding]:
+        computed = {EmbeddingCache.key(self._fingerprint, t): e for t, e in zip(missing, embeddings)}
+        self._cache.put_many(computed)
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        found.update(computed)
+        return [found[key] for key in keys]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        keys, found, missing = self._lookup(texts)
+        embeddings = self.embed_model.get_text_embedding_batch(missing) if missing else []
+        return self._store(keys, found, missing, embeddings)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        keys, found, missing = self._lookup(texts)
+        embeddings = await self.embed_model.aget_text_embedding_batch(missing) if missing else []
+        return self._store(keys, found, missing, embeddings)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self.embed_model.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self.embed_model.aget_query_embedding(query)
+
+
+def enable_embedding_cache(path=CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES) -> CachedEmbedding:
+    """Wrap Settings.embed_model (once) with a CachedEmbedding and return it."""
+    embed_model = Settings.embed_model
+    if not isinstance(embed_model, CachedEmbedding):
+        embed_model = CachedEmbedding(embed_model, EmbeddingCache(path, max_bytes))
+        Settings.embed_model = embed_model
+    return embed_model
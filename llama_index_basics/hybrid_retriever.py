@@ -0,0 +1,274 @@
+"""
+Hybrid BM25 + vector retrieval with reciprocal-rank fusion.
+
+VectorIndexRetriever only finds chunks that embed close to the query, and
+misses exact keyword matches (names, acronyms, section numbers); dag_chain.py
+patched that up with a remote CohereRerank call per query. Here:
+
+- BM25Index is an inverted index over the index's nodes (CSR postings of
+  term -> (node, tf) in numpy arrays). A query only touches the postings of
+  its own terms. It is persisted as bm25.npz next to the index (written by
+  refresh_index() at ingest time) and rebuilt only if the index's nodes
+  changed;
+- HybridRetriever runs the vector retriever and BM25 for `candidate_k`
+  candidates each and fuses the two rankings with reciprocal-rank fusion,
+  score(node) = sum over rankings of weight / (rrf_k + rank), so neither
+  the cosine nor the BM25 scale has to be calibrated.
+
+Fused scores are ranks, not similarities: similarity cutoffs (e.g.
+SimilarityPostprocessor(similarity_cutoff=0.7)) do not apply to them.
+
+Usage:
+  retriever = hybrid_retriever(index, similarity_top_k=10, persist_dir="./storage")
+  query_engine = RetrieverQueryEngine.from_args(retriever)
+"""
+
+import hashlib
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
+
+BM25_NAME = "bm25.npz"
+BM25_VERSION = 1
+DEFAULT_RRF_K = 60
+MAX_TOKEN_LENGTH = 40
+STOPWORDS = frozenset(
+    """a about above after again against all am an and any are as at be because been before being below between
+    both but by can could did do does doing down during each few for from further had has have having he her here
+    hers herself him himself his how i if in into is it its itself just me more most my myself no nor not now of off
+    on once only or other our ours ourselves out over own same she should so some such than that the their theirs
+    them themselves then there these they this those through to too under until up very was we were what when where
+    which while who whom why will with would you your yours yourself yourselves""".split()
+)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric words, without stopwords and overlong tokens."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS and len(t) <= MAX_TOKEN_LENGTH]
+
+
+def nodes_digest(node_ids) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for node_id in sorted(node_ids):
+        digest.update(node_id.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of nodes.
+
+    Args:
+        node_ids: Node ID of each document row
+        terms: Vocabulary; postings of terms[t] are postings[offsets[t]:offsets[t + 1]]
+        offsets: CSR offsets into postings / tfs (len(terms) + 1)
+        postings: Document rows, grouped by term
+        tfs: Term frequency of each posting
+        doc_len: Token count of each document
+        k1, b: BM25 parameters
+    """
+
+    def __init__(self, node_ids, terms, offsets, postings, tfs, doc_len, k1: float = 1.5, b: float = 0.75):
+        self.node_ids = [str(n) for n in node_ids]
+        self.term_ids: Dict[str, int] = {str(term): i for i, term in enumerate(terms)}
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.postings = np.asarray(postings, dtype=np.int32)
+        self.tfs = np.asarray(tfs, dtype=np.float32)
+        self.doc_len = np.asarray(doc_len, dtype=np.float32)
+        self.k1, self.b = float(k1), float(b)
+        n = len(self.node_ids)
+        df = np.diff(self.offsets).astype(np.float64)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = float(self.doc_len.mean()) if n else 1.0
+        # Per-document part of the tf saturation, computed once
+        self._norm = (self.k1 * (1.0 - self.b + self.b * self.doc_len / (avgdl or 1.0))).astype(np.float32)
+
+    @classmethod
+    def from_nodes(cls, nodes: Sequence[BaseNode], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        term_ids: Dict[str, int] = {}
+        rows, cols, counts, doc_len = [], [], [], []
+        for row, node in enumerate(nodes):
+            tokens = tokenize(node.get_content())
+            doc_len.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                rows.append(row)
+                cols.append(term_ids.setdefault(term, len(term_ids)))
+                counts.append(count)
+        cols_arr = np.asarray(cols, dtype=np.int64)
+        order = np.argsort(cols_arr, kind="stable")
+        offsets = np.zeros(len(term_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols_arr, minlength=len(term_ids)), out=offsets[1:])
+        return cls(
+            [node.node_id for node in nodes],
+            list(term_ids),
+            offsets,
+            np.asarray(rows, dtype=np.int32)[order],
+            np.asarray(counts, dtype=np.float32)[order],
+            doc_len,
+            k1,
+            b,
+        )
+
+    @classmethod
+    def from_index(cls, index, **kwargs) -> "BM25Index":
+        """Build from the nodes in the index's docstore."""
+        node_ids = list(index.index_struct.nodes_dict)
+        if not node_ids and index.ref_doc_info:
+            # A vector store that keeps the text itself (e.g. Chroma)
+            raise ValueError("BM25Index needs the index's nodes in its docstore")
+        return cls.from_nodes(index.docstore.get_nodes(node_ids), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.node_ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = self.term_ids.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            docs, tf = self.postings[start:end], self.tfs[start:end]
+            # Each document appears once in a term's postings
+            scores[docs] += self.idf[t] * tf * (self.k1 + 1.0) / (tf + self._norm[docs])
+        return scores
+
+    def top_k(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """(node_id, score) of the k best matching nodes, best first; nodes without a query term are left out."""
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.node_ids[i], float(scores[i])) for i in candidates]
+
+    def persist(self, persist_dir):
+        path = Path(persist_dir) / BM25_NAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.stem}.tmp.npz")
+        terms = sorted(self.term_ids, key=self.term_ids.get)
+        np.savez(
+            tmp,
+            version=np.array(BM25_VERSION),
+            node_ids=np.array(self.node_ids, dtype=str),
+            terms=np.array(terms, dtype=str),
+            offsets=self.offsets,
+            postings=self.postings,
+            tfs=self.tfs,
+            doc_len=self.doc_len,
+            params=np.array([self.k1, self.b]),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir) -> Optional["BM25Index"]:
+        """The persisted index, or None if missing or written by another version."""
+        path = Path(persist_dir) / BM25_NAME
+        if not path.exists():
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != BM25_VERSION:
+                return None
+            k1, b = data["params"]
+            return cls(
+                data["node_ids"].tolist(), data["terms"].tolist(), data["offsets"], data["postings"],
+                data["tfs"], data["doc_len"], k1, b,
+            )
+
+
+def load_or_build_bm25(index, persist_dir=None, **kwargs) -> BM25Index:
+    """The BM25Index persisted in persist_dir if it covers exactly the index's nodes, else a new one (persisted)."""
+    if persist_dir is not None:
+        bm25 = BM25Index.from_persist_dir(persist_dir)
+        if bm25 is not None and nodes_digest(bm25.node_ids) == nodes_digest(index.index_struct.nodes_dict):
+            return bm25
+    bm25 = BM25Index.from_index(index, **kwargs)
+    if persist_dir is not None:
+        bm25.persist(persist_dir)
+    return bm25
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], weights: Optional[Sequence[float]] = None, rrf_k: int = DEFAULT_RRF_K
+) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists: sum of weight / (rrf_k + rank) per ID (rank from 1), best first."""
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, node_id in enumerate(ranking, start=1):
+            fused[node_id] = fused.get(node_id, 0.0) + weight / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Vector + BM25 retrieval fused with reciprocal-rank fusion.
+
+    Args:
+        index: The VectorStoreIndex (its docstore holds the nodes BM25 returns)
+        bm25: BM25Index over the index's nodes
+        similarity_top_k: Nodes returned
+        candidate_k: Candidates taken from each retriever; defaults to 2 * similarity_top_k
+        rrf_k: Rank offset of reciprocal-rank fusion (60 as in Cormack et al.)
+        vector_weight, bm25_weight: Weight of each ranking in the fused score
+    """
+
+    def __init__(
+        self,
+        index,
+        bm25: BM25Index,
+        similarity_top_k: int = 10,
+        candidate_k: Optional[int] = None,
+        rrf_k: int = DEFAULT_RRF_K,
+        vector_weight: float = 1.0,
+        bm25_weight: float = 1.0,
+        **kwargs,
+    ):
+        self._index = index
+        self._bm25 = bm25
+        self._similarity_top_k = similarity_top_k
+        self._candidate_k = candidate_k or 2 * similarity_top_k
+        self._vector_retriever = index.as_retriever(similarity_top_k=self._candidate_k)
+        self._rrf_k = rrf_k
+        self._weights = (vector_weight, bm25_weight)
+        super().__init__(**kwargs)
+
+    def _fuse(self, query_bundle: QueryBundle, vector_nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        keyword_ids = [node_id for node_id, _ in self._bm25.top_k(query_bundle.query_str, self._candidate_k)]
+        by_id = {n.node.node_id: n.node for n in vector_nodes}
+        fused = reciprocal_rank_fusion(
+            [[n.node.node_id for n in vector_nodes], keyword_ids], self._weights, self._rrf_k
+        )[: self._similarity_top_k]
+        missing = [node_id for node_id, _ in fused if node_id not in by_id]
+        if missing:
+            by_id.update((node.node_id, node) for node in self._index.docstore.get_nodes(missing))
+        return [NodeWithScore(node=by_id[node_id], score=score) for node_id, score in fused]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._fuse(query_bundle, self._vector_retriever.retrieve(query_bundle))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._fuse(query_bundle, await self._vector_retriever.aretrieve(query_bundle))
+
+
+def hybrid_retriever(index, similarity_top_k: int = 10, persist_dir=None, **kwargs) -> HybridRetriever:
+    """
+    A HybridRetriever over `index`, with its BM25Index loaded from (or built and persisted to) persist_dir.
+
+    Args:
+        index: The VectorStoreIndex
+        similarity_top_k: Nodes returned
+        persist_dir: The index's storage folder; None builds the BM25 index in memory
+        **kwargs: candidate_k, rrf_k, vector_weight, bm25_weight
+
+    Returns:
+        The retriever.
+    """
+    return HybridRetriever(index, load_or_build_bm25(index, persist_dir), similarity_top_k=similarity_top_k, **kwargs)
@@ -0,0 +1,242 @@
+"""
+Incremental refresh of a persisted VectorStoreIndex.
+
+Checking only os.path.exists(PERSIST_DIR) either loads a stale index (files
+in data/ added, edited or removed since) or re-embeds the whole corpus.
+refresh_index() instead keeps an ingestion manifest next to the index:
+
+- manifest.json maps each file (relative to data_dir) to its size, mtime,
+  sha256 and the document / node IDs it produced;
+- files whose size and mtime are unchanged are skipped without hashing;
+  touched files are re-hashed and only re-indexed if the content changed;
+- nodes of removed and changed files are deleted (delete_ref_doc);
+- new and changed files are parsed in a process pool (parsed documents are
+  cached by content hash, see document_loader.py) and chunked, embedded and
+  inserted file by file as they arrive, so embedding overlaps parsing; then
+  the storage context and manifest are persisted.
+
+A BM25 keyword index over the nodes (bm25.npz, see hybrid_retriever.py) is
+rebuilt and persisted with the index whenever it changes.
+
+Embeddings are stored with MmapVectorStore (see mmap_vector_store.py), so
+loading the index does not parse a JSON float list per node. Pass
+vector_store_cls=HnswVectorStore for approximate (HNSW) search instead.
+
+Document IDs are derived from the relative path ("<path>#<n>"), so a refresh
+interrupted between persisting the index and the manifest is repaired on the
+next run instead of duplicating nodes.
+
+Usage:
+  index, report = refresh_index("./data", "./storage")
+  print(report.summary())
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core import (
+    Settings,
+    StorageContext,
+    VectorStoreIndex,
+    load_index_from_storage,
+)
+from llama_index.core.ingestion import run_transformations
+
+from document_loader import file_sha256, iter_file_documents
+from hybrid_retriever import BM25_NAME, BM25Index
+from mmap_vector_store import MmapVectorStore, load_storage_context
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def scan_files(
+    data_dir: Path,
+    required_exts: Optional[Sequence[str]] = None,
+    recursive: bool = False,
+) -> Dict[str, Path]:
+    """Relative posix path -> Path for every (non-hidden) file SimpleDirectoryReader would load."""
+    data_dir = Path(data_dir)
+    pattern = "**/*" if recursive else "*"
+    exts = {e.lower() for e in required_exts} if required_exts else None
+    files = {}
+    for path in sorted(data_dir.glob(pattern)):
+        rel = path.relative_to(data_dir)
+        if not path.is_file() or any(part.startswith(".") for part in rel.parts):
+            continue
+        if exts and path.suffix.lower() not in exts:
+            continue
+        files[rel.as_posix()] = path
+    return files
+
+
+class IndexManifest:
+    """rel path -> {size, mtime_ns, sha256, doc_ids, node_ids}, saved atomically as JSON."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.files: Dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") == MANIFEST_VERSION:
+                self.files = payload["files"]
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+@dataclass
+class RefreshReport:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    nodes_inserted: int = 0
+    nodes_deleted: int = 0
+    rebuilt: bool = False
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.changed)} changed, {len(self.removed)} removed, "
+            f"{self.unchanged} unchanged; {self.nodes_inserted} nodes embedded, {self.nodes_deleted} deleted"
+        )
+
+
+def plan_refresh(files: Dict[str, Path], manifest: IndexManifest) -> Tuple[RefreshReport, Dict[str, dict]]:
+    """
+    Compare the files on disk with the manifest.
+
+    Returns:
+        The report (added / changed / removed / unchanged) and the fresh
+        stat + hash entries for the files that have to be (re)indexed.
+    """
+    report = RefreshReport()
+    fresh = {}
+    for rel, path in files.items():
+        stat = path.stat()
+        entry = manifest.files.get(rel)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            report.unchanged += 1
+            continue
+        sha = file_sha256(path)
+        if entry and entry["sha256"] == sha:
+            # Touched but identical (copy, checkout...): remember the new mtime only
+            entry["mtime_ns"] = stat.st_mtime_ns
+            report.unchanged += 1
+            continue
+        fresh[rel] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha}
+        (report.changed if entry else report.added).append(rel)
+    report.removed = sorted(set(manifest.files) - set(files))
+    return report, fresh
+
+
+def assign_file_document_ids(rel: str, documents: list) -> list:
+    """Stable document IDs derived from the file's relative path (in place)."""
+    for n, document in enumerate(documents):
+        document.id_ = f"{rel}#{n}"
+    return documents
+
+
+def _open_index(persist_dir: Path, manifest_exists: bool, vector_store_cls) -> Tuple[VectorStoreIndex, bool]:
+    if manifest_exists:
+        return load_index_from_storage(load_storage_context(persist_dir, vector_store_cls=vector_store_cls)), False
+    # No manifest (first run, or storage written by the old all-or-nothing script):
+    # its nodes can't be mapped back to files, so start from an empty index once
+    storage_context = StorageContext.from_defaults(vector_store=vector_store_cls())
+    return VectorStoreIndex(nodes=[], storage_context=storage_context), True
+
+
+def refresh_index(
+    data_dir,
+    persist_dir,
+    required_exts: Optional[Sequence[str]] = None,
+    recursive: bool = False,
+    transformations: Optional[list] = None,
+    show_progress: bool = False,
+    vector_store_cls=MmapVectorStore,
+    workers: Optional[int] = None,
+    parse_cache_dir=None,
+) -> Tuple[VectorStoreIndex, RefreshReport]:
+    """
+    Bring the index persisted in persist_dir up to date with data_dir.
+
+    Args:
+        data_dir: Folder of source documents
+        persist_dir: Storage folder (created on first run)
+        required_exts: Only index these extensions, e.g. [".pdf"]
+        recursive: Include sub-folders
+        transformations: Node parser / extractors; defaults to Settings.transformations
+        show_progress: Show embedding progress bars
+        vector_store_cls: MmapVectorStore, or HnswVectorStore (ann_vector_store.py)
+            for approximate search over large corpora
+        workers: Parser processes; defaults to the CPU count
+        parse_cache_dir: Parsed-document cache (document_loader.CACHE_DIR by default)
+
+    Returns:
+        The up-to-date index and a RefreshReport of what changed.
+    """
+    data_dir, persist_dir = Path(data_dir), Path(persist_dir)
+    manifest = IndexManifest(persist_dir / MANIFEST_NAME)
+    index, rebuilt = _open_index(persist_dir, manifest.path.exists(), vector_store_cls)
+    if rebuilt:
+        manifest.files = {}
+
+    files = scan_files(data_dir, required_exts, recursive)
+    report, fresh = plan_refresh(files, manifest)
+    report.rebuilt = rebuilt
+
+    # Drop every node produced by a removed or changed file
+    docstore = index.docstore
+    for rel in report.removed + report.changed:
+        for doc_id in manifest.files[rel]["doc_ids"]:
+            info = docstore.get_ref_doc_info(doc_id)
+            if info is not None:
+                report.nodes_deleted += len(info.node_ids)
+                index.delete_ref_doc(doc_id, delete_from_docstore=True)
+        if rel in report.removed:
+            del manifest.files[rel]
+
+    # Parse new / changed files in parallel; chunk and embed each one as it arrives
+    pending = report.added + report.changed
+    rel_by_path = {files[rel]: rel for rel in pending}
+    parsed = iter_file_documents([files[rel] for rel in pending], workers=workers, cache_dir=parse_cache_dir)
+    for path, documents in parsed:
+        rel = rel_by_path[path]
+        assign_file_document_ids(rel, documents)
+        for document in documents:
+            if docstore.get_ref_doc_info(document.id_) is not None:
+                # Indexed by an interrupted earlier refresh that never saved its manifest
+                index.delete_ref_doc(document.id_, delete_from_docstore=True)
+        nodes = []
+        if documents:
+            nodes = run_transformations(
+                documents, transformations or Settings.transformations, show_progress=show_progress
+            )
+            index.insert_nodes(nodes, show_progress=show_progress)
+            report.nodes_inserted += len(nodes)
+        manifest.files[rel] = {
+            **fresh[rel],
+            "doc_ids": [document.id_ for document in documents],
+            "node_ids": [node.node_id for node in nodes],
+        }
+
+    if report.dirty or rebuilt or not persist_dir.exists():
+        index.storage_context.persist(persist_dir=str(persist_dir))
+        BM25Index.from_index(index).persist(persist_dir)
+    elif not (persist_dir / BM25_NAME).exists():
+        BM25Index.from_index(index).persist(persist_dir)  # storage written before the keyword index existed
+    # Saved after the index, so a crash in between is repaired by the next refresh
+    manifest.save()
+    return index, report
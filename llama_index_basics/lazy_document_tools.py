@@ -0,0 +1,185 @@
+"""
+Lazily loaded, persisted per-document query engine tools for agents.
+
+document_agent.py used to build a VectorStoreIndex per document at startup,
+so the agent paid for every document before answering anything. Here:
+
+- each document's index is persisted under <persist_root>/<title>/ (with
+  MmapVectorStore) next to a sources.json of the input files' sha256;
+- lazy_document_tools() returns QueryEngineTools whose query engine is a
+  LazyQueryEngine: nothing is read, parsed or embedded until the agent
+  first routes a query to that tool, which then loads the persisted index
+  (or builds it if missing or its sources changed);
+- loaded engines are kept in an IndexLRU capped at `max_bytes`, measured
+  as the on-disk size of each index; the least recently used are dropped
+  past the cap and reloaded from disk on their next query.
+
+Usage:
+  tools = lazy_document_tools(
+      {"drake": ["data/drake_beef/drake.pdf"], ...},
+      build_query_engine=lambda index: index.as_query_engine(similarity_top_k=3),
+      persist_root="./storage/document_agent",
+  )
+  agent = OpenAIAgent.from_tools(tools)
+"""
+
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from llama_index.core import Settings, StorageContext, VectorStoreIndex, load_index_from_storage
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.tools import QueryEngineTool, ToolMetadata
+
+from document_loader import file_sha256, load_documents
+from mmap_vector_store import MmapVectorStore, load_storage_context
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+SOURCES_NAME = "sources.json"
+
+
+def dir_size(path: Path) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file()) if path.exists() else 0
+
+
+class IndexLRU:
+    """
+    Loaded objects (indexes / query engines) by key, least recently used first out.
+
+    Args:
+        max_bytes: Cap on the summed sizes; the most recent entry is always kept
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.loads = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def _hit(self, key: str):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        return None
+
+    def get(self, key: str, load: Callable[[], object], size: Callable[[], int]):
+        with self._lock:
+            entry = self._hit(key)
+            if entry is not None:
+                return entry[0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # One load per key at a time; loads of different keys run concurrently
+        with key_lock:
+            with self._lock:
+                entry = self._hit(key)
+                if entry is not None:
+                    return entry[0]  # loaded by a concurrent call
+            value = load()
+            cost = size()
+        with self._lock:
+            self.loads += 1
+            self._entries[key] = (value, cost)
+            self._total += cost
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._total -= evicted
+            return value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def load_or_build_index(persist_dir, input_files: Sequence, transformations: Optional[list] = None) -> VectorStoreIndex:
+    """The index persisted in persist_dir, (re)built first if missing or its input files changed."""
+    persist_dir = Path(persist_dir)
+    sources = {str(path): file_sha256(Path(path)) for path in input_files}
+    sources_path = persist_dir / SOURCES_NAME
+    if sources_path.exists():
+        with open(sources_path, "r", encoding="utf-8") as f:
+            persisted = json.load(f)
+        if persisted == sources:
+            return load_index_from_storage(load_storage_context(persist_dir))
+        shutil.rmtree(persist_dir)  # stale: rebuilt below (after closing sources.json, for Windows)
+
+    documents = load_documents(input_files=list(input_files), workers=1)
+    storage_context = StorageContext.from_defaults(vector_store=MmapVectorStore())
+    index = VectorStoreIndex.from_documents(
+        documents, storage_context=storage_context, transformations=transformations or Settings.transformations
+    )
+    index.storage_context.persist(persist_dir=str(persist_dir))
+    # Written last: an interrupted build is redone on the next load
+    with open(sources_path.with_suffix(".tmp"), "w", encoding="utf-8") as f:
+        json.dump(sources, f, indent=2)
+    os.replace(sources_path.with_suffix(".tmp"), sources_path)
+    return index
+
+
+class LazyQueryEngine(BaseQueryEngine):
+    """Query engine that loads its index through an IndexLRU on first use."""
+
+    def __init__(self, key: str, persist_dir, input_files: Sequence, build_query_engine, cache: IndexLRU):
+        super().__init__(callback_manager=Settings.callback_manager)
+        self._key = key
+        self._persist_dir = Path(persist_dir)
+        self._input_files = list(input_files)
+        self._build_query_engine = build_query_engine
+        self._cache = cache
+
+    def _engine(self) -> BaseQueryEngine:
+        return self._cache.get(
+            self._key,
+            lambda: self._build_query_engine(load_or_build_index(self._persist_dir, self._input_files)),
+            lambda: dir_size(self._persist_dir),
+        )
+
+    def _query(self, query_bundle):
+        return self._engine().query(query_bundle)
+
+    async def _aquery(self, query_bundle):
+        return await self._engine().aquery(query_bundle)
+
+    def _get_prompt_modules(self) -> dict:
+        return {}
+
+
+def lazy_document_tools(
+    sources: Dict[str, Sequence],
+    build_query_engine: Callable[[VectorStoreIndex], BaseQueryEngine],
+    persist_root="./storage/document_agent",
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    description: Callable[[str], str] = lambda title: f"Useful for retrieving specific context related to {title}",
+    name_prefix: str = "vector_tool_",
+    cache: Optional[IndexLRU] = None,
+) -> List[QueryEngineTool]:
+    """
+    One lazily loaded QueryEngineTool per document; no I/O happens here.
+
+    Args:
+        sources: Title -> input files of that document
+        build_query_engine: Turns a loaded index into the tool's query engine
+        persist_root: Folder of the per-document index folders
+        max_bytes: Cap on the on-disk size of the indexes kept loaded
+        description: Tool description for a title
+        name_prefix: Tool name prefix (the title is appended)
+        cache: Share an IndexLRU between tool sets; defaults to a new one
+
+    Returns:
+        The tools, in the order of `sources`.
+    """
+    cache = cache if cache is not None else IndexLRU(max_bytes)
+    return [
+        QueryEngineTool(
+            query_engine=LazyQueryEngine(title, Path(persist_root) / title, files, build_query_engine, cache),
+            metadata=ToolMetadata(name=f"{name_prefix}{title}", description=description(title)),
+        )
+        for title, files in sources.items()
+    ]
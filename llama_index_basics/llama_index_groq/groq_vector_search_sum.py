@@ -4,9 +4,14 @@ import os
 from dotenv import load_dotenv
 from llama_index.llms.groq import Groq
 from llama_index.core import SimpleDirectoryReader
-from llama_index.core import SummaryIndex
 from llama_index.core.tools import QueryEngineTool, ToolMetadata
 from llama_index.core.query_engine import RouterQueryEngine
+import sys
+
+# embedding_cache lives in llama_index_basics/, shared with the other scripts
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_cache import enable_embedding_cache
+from summary_tree import SummaryTreeQueryEngine, load_or_build_summary_tree
 
 # Get the directory of the current script
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -25,7 +30,9 @@ docs_drake = SimpleDirectoryReader(input_files=[drake_pdf]).load_data()
 docs_both = SimpleDirectoryReader(input_files=[both_pdf]).load_data()
 
 # Create a VectorStoreIndex from the documents
-# This index allows for efficient similarity-based searches
+# This index allows for efficient similarity-based searches; chunks embedded
+# by an earlier run (of any llama_index script) come from the local cache
+enable_embedding_cache()
 index = VectorStoreIndex.from_documents(docs_both)
 
 # Create a query engine from the index
@@ -36,10 +43,12 @@ query_engine = index.as_query_engine(similarity_top_k=3)
 response = query_engine.query("Tell me about family matters")
 print(str(response))
 
-# Create a SummaryIndex from the documents
-# This index is optimized for generating summaries of the content
-summary_index = SummaryIndex.from_documents(docs_both)
-summary_engine = summary_index.as_query_engine()
+# Build the summary tree once (chunk summaries rolled up to section and document summaries)
+# and reuse it until the PDF changes: a summary question is then one LLM call over the
+# precomputed summaries instead of one per chunk, and only questions the summaries can't
+# answer read the chunks of the most relevant sections
+summary_tree = load_or_build_summary_tree([both_pdf], os.path.join(script_dir, "storage", "summary_tree"))
+summary_engine = SummaryTreeQueryEngine(summary_tree)
 
 # Use the summary engine to ask who won the beef
 response = summary_engine.query(
@@ -60,7 +69,7 @@ vector_tool = QueryEngineTool(
 # Create a summary tool
 # This tool is useful for summarizing entire documents or large sections
 summary_tool = QueryEngineTool(
-    index.as_query_engine(response_mode="tree_summarize"),
+    summary_engine,
     metadata=ToolMetadata(
         name="summary",
         description="Useful for summarizing an entire document.",
@@ -0,0 +1,244 @@
+"""
+Precomputed hierarchical summaries for summarization questions.
+
+A SummaryIndex (or a tree_summarize query engine over all nodes) sends every
+chunk of the document through the LLM each time a summary question comes in.
+Here the summaries are computed once, at ingest time:
+
+- the documents are chunked (Settings.transformations); each run of `fanout`
+  consecutive chunks is summarized into a section summary, each run of
+  `fanout` section summaries into a higher-level summary, and so on up to a
+  single document summary;
+- the tree (leaf chunks, summaries per level, section summary embeddings) is
+  persisted as summary_tree.json, versioned with the sha256 of the source
+  files, the LLM model and the fanout: it is only rebuilt if one of those
+  changes;
+- SummaryTreeQueryEngine answers from the document summary plus the finest
+  summary level that fits in `max_summaries` nodes, in one LLM call. If the
+  LLM replies that the summaries lack the details the question needs, it
+  drops to the leaf chunks of the `drill_k` sections whose summaries are
+  closest to the question.
+
+Usage:
+  tree = load_or_build_summary_tree([pdf_path], "./storage/summary_tree")
+  summary_engine = SummaryTreeQueryEngine(tree)
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+from llama_index.core import PromptTemplate, Settings, SimpleDirectoryReader, get_response_synthesizer
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.response_synthesizers import ResponseMode
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+
+TREE_NAME = "summary_tree.json"
+TREE_VERSION = 1
+NEED_DETAILS = "NEED_DETAILS"
+
+SUMMARIZE_PROMPT = PromptTemplate(
+    "Write a concise summary of the following text. Keep the names, numbers, events and claims "
+    "a reader would need to answer questions about it.\n"
+    "---------------------\n"
+    "{text}\n"
+    "---------------------\n"
+    "Summary: "
+)
+SUMMARY_QA_PROMPT = PromptTemplate(
+    "Summaries of a document, from the whole document down to its sections, are below.\n"
+    "---------------------\n"
+    "{context_str}\n"
+    "---------------------\n"
+    "Using only these summaries, answer the query. If they do not contain the specific details "
+    f"the query needs, reply with exactly {NEED_DETAILS} and nothing else.\n"
+    "Query: {query_str}\n"
+    "Answer: "
+)
+
+
+def sources_sha256(input_files: Sequence) -> str:
+    """One digest over the names and contents of the source files."""
+    digest = hashlib.sha256()
+    for path in sorted(str(p) for p in input_files):
+        digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class SummaryTree:
+    """
+    Leaf chunks and their summaries, level by level.
+
+    Args:
+        leaves: [{"text", "metadata"}] per chunk, in document order
+        levels: levels[0] summarizes leaves, levels[i] summarizes levels[i - 1]; the last level
+            holds the single document summary. Each entry is {"text", "children"} (child indices
+            in the level below)
+        section_embeddings: Embedding of each levels[0] summary, for drilling down
+        meta: Version info (sources sha256, model, fanout)
+    """
+
+    def __init__(self, leaves: List[dict], levels: List[List[dict]], section_embeddings: List[List[float]], meta: dict):
+        self.leaves = leaves
+        self.levels = levels
+        self.section_embeddings = np.asarray(section_embeddings, dtype=np.float32)
+        self.meta = meta
+
+    @property
+    def document_summary(self) -> str:
+        return self.levels[-1][0]["text"]
+
+    def section_leaves(self, section: int) -> List[dict]:
+        return [self.leaves[i] for i in self.levels[0][section]["children"]]
+
+    def persist(self, persist_dir):
+        path = Path(persist_dir) / TREE_NAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "meta": self.meta,
+                    "leaves": self.leaves,
+                    "levels": self.levels,
+                    "section_embeddings": self.section_embeddings.tolist(),
+                },
+                f,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir) -> Optional["SummaryTree"]:
+        path = Path(persist_dir) / TREE_NAME
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        return cls(payload["leaves"], payload["levels"], payload["section_embeddings"], payload["meta"])
+
+
+def _summarize_level(texts: List[str], fanout: int, llm, workers: int) -> List[dict]:
+    groups = [list(range(start, min(start + fanout, len(texts)))) for start in range(0, len(texts), fanout)]
+
+    def summarize(children: List[int]) -> dict:
+        prompt = SUMMARIZE_PROMPT.format(text="\n\n".join(texts[i] for i in children))
+        return {"text": llm.complete(prompt).text.strip(), "children": children}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(summarize, groups))
+
+
+def build_summary_tree(
+    documents, fanout: int = 8, llm=None, embed_model=None, transformations=None, workers: int = 4, meta=None
+) -> SummaryTree:
+    """
+    Chunk the documents and summarize them bottom-up (about len(chunks) / (fanout - 1) LLM calls).
+
+    Args:
+        documents: Documents to summarize, in order
+        fanout: Children per summary
+        llm: Summarizing LLM; defaults to Settings.llm
+        embed_model: Embeds the section summaries; defaults to Settings.embed_model
+        transformations: Node parser; defaults to Settings.transformations
+        workers: Concurrent LLM calls per level
+        meta: Version info stored with the tree
+
+    Returns:
+        The SummaryTree.
+    """
+    if fanout < 2:
+        raise ValueError("fanout must be at least 2")
+    llm = llm if llm is not None else Settings.llm
+    embed_model = embed_model if embed_model is not None else Settings.embed_model
+    nodes = run_transformations(documents, transformations or Settings.transformations)
+    if not nodes:
+        raise ValueError("No text to summarize")
+    leaves = [{"text": node.get_content(), "metadata": node.metadata} for node in nodes]
+
+    levels = [_summarize_level([leaf["text"] for leaf in leaves], fanout, llm, workers)]
+    while len(levels[-1]) > 1:
+        levels.append(_summarize_level([s["text"] for s in levels[-1]], fanout, llm, workers))
+    section_embeddings = embed_model.get_text_embedding_batch([s["text"] for s in levels[0]])
+    return SummaryTree(leaves, levels, section_embeddings, meta or {})
+
+
+def load_or_build_summary_tree(
+    input_files: Sequence, persist_dir, fanout: int = 8, llm=None, embed_model=None, workers: int = 4
+) -> SummaryTree:
+    """The tree persisted in persist_dir if built from the same sources, model and fanout; else a new one (persisted)."""
+    llm = llm if llm is not None else Settings.llm
+    meta = {
+        "version": TREE_VERSION,
+        "sources_sha256": sources_sha256(input_files),
+        "model": llm.metadata.model_name,
+        "fanout": fanout,
+    }
+    tree = SummaryTree.from_persist_dir(persist_dir)
+    if tree is not None and tree.meta == meta:
+        return tree
+    documents = SimpleDirectoryReader(input_files=[str(p) for p in input_files]).load_data()
+    tree = build_summary_tree(documents, fanout, llm, embed_model, workers=workers, meta=meta)
+    tree.persist(persist_dir)
+    return tree
+
+
+class SummaryTreeQueryEngine(BaseQueryEngine):
+    """
+    Answers from a SummaryTree's precomputed summaries, reading leaf chunks only when needed.
+
+    Args:
+        tree: The SummaryTree
+        llm: Answering LLM; defaults to Settings.llm
+        embed_model: Embeds questions to pick sections to drill into; defaults to Settings.embed_model
+        max_summaries: Most summaries sent with the document summary (from the finest level that fits)
+        drill_k: Sections whose leaf chunks are read when the summaries are not enough
+    """
+
+    def __init__(self, tree: SummaryTree, llm=None, embed_model=None, max_summaries: int = 16, drill_k: int = 2):
+        super().__init__(callback_manager=Settings.callback_manager)
+        self._tree = tree
+        self._embed_model = embed_model if embed_model is not None else Settings.embed_model
+        self._drill_k = drill_k
+        self._summary_synthesizer = get_response_synthesizer(
+            llm=llm, response_mode=ResponseMode.COMPACT, text_qa_template=SUMMARY_QA_PROMPT
+        )
+        self._leaf_synthesizer = get_response_synthesizer(llm=llm, response_mode=ResponseMode.COMPACT)
+        # Document summary first, then the finest summary level that fits in max_summaries
+        level = next((lvl for lvl in tree.levels[:-1] if len(lvl) <= max_summaries), None)
+        summaries = [tree.document_summary] + [s["text"] for s in level or []]
+        self._summary_nodes = [NodeWithScore(node=TextNode(text=text), score=1.0) for text in summaries]
+
+    def _leaf_nodes(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        embedding = query_bundle.embedding or self._embed_model.get_query_embedding(query_bundle.query_str)
+        sections = self._tree.section_embeddings
+        scores = sections @ np.asarray(embedding, dtype=np.float32)
+        scores /= np.linalg.norm(sections, axis=1) * (np.linalg.norm(embedding) or 1.0) + 1e-12
+        picked = sorted(np.argsort(-scores, kind="stable")[: self._drill_k])  # in document order
+        return [
+            NodeWithScore(node=TextNode(text=leaf["text"], metadata=leaf["metadata"]), score=float(scores[section]))
+            for section in picked
+            for leaf in self._tree.section_leaves(int(section))
+        ]
+
+    def _query(self, query_bundle: QueryBundle):
+        response = self._summary_synthesizer.synthesize(query_bundle, self._summary_nodes)
+        if NEED_DETAILS not in str(response):
+            return response
+        return self._leaf_synthesizer.synthesize(query_bundle, self._leaf_nodes(query_bundle))
+
+    async def _aquery(self, query_bundle: QueryBundle):
+        response = await self._summary_synthesizer.asynthesize(query_bundle, self._summary_nodes)
+        if NEED_DETAILS not in str(response):
+            return response
+        return await self._leaf_synthesizer.asynthesize(query_bundle, self._leaf_nodes(query_bundle))
+
+    def _get_prompt_modules(self) -> dict:
+        return {"summary_synthesizer": self._summary_synthesizer, "leaf_synthesizer": self._leaf_synthesizer}
@@ -0,0 +1,113 @@
+"""
+Test the precomputed summary tree: bottom-up build, versioned persistence and answering with drill-down
+"""
+
+import zlib
+
+import numpy as np
+import pytest
+from llama_index.core import Settings
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.llms import CompletionResponse, CustomLLM, LLMMetadata
+from llama_index.core.node_parser import SentenceSplitter
+
+from summary_tree import NEED_DETAILS, SummaryTreeQueryEngine, load_or_build_summary_tree
+
+
+class BagOfWordsEmbedding(MockEmbedding):
+    def _vector(self, text):
+        vector = np.zeros(self.embed_dim)
+        for word in text.lower().replace(".", " ").replace("?", " ").split():
+            vector[zlib.crc32(word.encode()) % self.embed_dim] += 1
+        return vector.tolist()
+
+    def _get_text_embedding(self, text):
+        return self._vector(text)
+
+    def _get_query_embedding(self, query):
+        return self._vector(query)
+
+
+class ScriptedLLM(CustomLLM):
+    """Summaries keep chapter headings and that a vault is mentioned; the vault code is only in the chunks."""
+
+    prompts: list = []
+
+    @property
+    def metadata(self):
+        return LLMMetadata(model_name="scripted")
+
+    def complete(self, prompt, formatted=False, **kwargs):
+        self.prompts.append(prompt)
+        if prompt.startswith("Write a concise summary"):
+            text = prompt.split("---------------------\n")[1]
+            lines = [line for line in text.splitlines() if line.startswith("Chapter")]
+            if "vault" in text:
+                lines.append("It mentions a vault.")
+            return CompletionResponse(text=" / ".join(dict.fromkeys(lines)) or "summary")
+        if "vault" in prompt.split("Query:")[-1] and "vault code" not in prompt.split("Query:")[0]:
+            return CompletionResponse(text=NEED_DETAILS)
+        return CompletionResponse(text="answer")
+
+    def stream_complete(self, prompt, formatted=False, **kwargs):
+        raise NotImplementedError
+
+
+@pytest.fixture
+def models():
+    previous = Settings._embed_model, Settings._llm, Settings._transformations
+    Settings.embed_model = BagOfWordsEmbedding(embed_dim=4096)
+    Settings.llm = ScriptedLLM(prompts=[])
+    Settings.transformations = [SentenceSplitter(chunk_size=128, chunk_overlap=0)]
+    yield Settings.llm
+    Settings._embed_model, Settings._llm, Settings._transformations = previous
+
+
+@pytest.fixture
+def book(tmp_path):
+    path = tmp_path / "book.txt"
+    chapters = []
+    for i in range(12):
+        body = " ".join(f"Sentence {j} of chapter {i} describes the plot." for j in range(6))
+        if i == 7:
+            body += " The vault code is 4512."
+        chapters.append(f"Chapter {i}\n{body}")
+    path.write_text("\n\n".join(chapters))
+    return path
+
+
+def summary_calls(llm):
+    return sum(p.startswith("Write a concise summary") for p in llm.prompts)
+
+
+def test_built_bottom_up_and_reused_until_the_source_changes(models, book, tmp_path):
+    llm = models
+    tree = load_or_build_summary_tree([book], tmp_path / "tree", fanout=4)
+    sizes = [len(level) for level in tree.levels]
+    assert sizes[-1] == 1 and all(a > b for a, b in zip(sizes, sizes[1:]))
+    assert len(tree.levels[0]) == -(-len(tree.leaves) // 4)
+    assert summary_calls(llm) == sum(sizes)
+    assert "Chapter 0" in tree.document_summary and "Chapter 11" in tree.document_summary
+
+    llm.prompts.clear()
+    assert load_or_build_summary_tree([book], tmp_path / "tree", fanout=4).levels == tree.levels
+    assert llm.prompts == []
+
+    book.write_text(book.read_text() + "\n\nChapter 12\nAn epilogue.")
+    tree = load_or_build_summary_tree([book], tmp_path / "tree", fanout=4)
+    assert summary_calls(llm) > 0 and "Chapter 12" in tree.document_summary
+
+
+def test_answers_from_summaries_and_drills_down_when_needed(models, book, tmp_path):
+    llm = models
+    engine = SummaryTreeQueryEngine(load_or_build_summary_tree([book], tmp_path / "tree", fanout=4), drill_k=1)
+
+    llm.prompts.clear()
+    response = engine.query("What is the book about?")
+    assert str(response) == "answer" and len(llm.prompts) == 1
+    assert all("Sentence" not in n.node.get_content() for n in response.source_nodes)
+
+    llm.prompts.clear()
+    response = engine.query("What is the vault code?")
+    assert str(response) == "answer" and len(llm.prompts) == 2
+    assert any("vault code is 4512" in n.node.get_content() for n in response.source_nodes)
@@ -1,10 +1,8 @@
 import os.path
-from llama_index.core import (
-    VectorStoreIndex,
-    SimpleDirectoryReader,
-    StorageContext,
-    load_index_from_storage,
-)
+
+from embedding_cache import enable_embedding_cache
+from incremental_index import refresh_index
+from query_cache import cached_query_engine
 
 #check if storage already exists
 PERSIST_DIR = "./storage"
@@ -13,20 +11,25 @@ PERSIST_DIR = "./storage"
 # Get the current script's directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
 # Construct the path to the data directory
-data_dir = os.path.join(os.path.dirname(current_dir), "data")
-
-if not os.path.exists(PERSIST_DIR):
-    # Load data using SimpleDirectoryReader
-    documents = SimpleDirectoryReader(input_dir=data_dir).load_data()
-    # Create a VectorStoreIndex from the documents
-    index = VectorStoreIndex.from_documents(documents)
-    # Save the index to disk
-    index.storage_context.persist(persist_dir=PERSIST_DIR)
-else:
-    # Load the index from disk
-    storage_context = StorageContext.from_defaults(persist_dir=PERSIST_DIR)
-    index = load_index_from_storage(storage_context)
-    
-query_engine = index.as_query_engine()
-response = query_engine.query("Logic is great for planning, but weak for motivation. what does this mean?")
-print(response)
+data_dir = os.path.join(current_dir, "data")
+
+
+def main():
+    # Re-embedded chunks (e.g. a changed file with mostly unchanged pages) come from the local cache
+    enable_embedding_cache()
+
+    # Load the index from disk and bring it up to date with data/: only new or
+    # changed files are parsed (in worker processes) and embedded, nodes of
+    # removed files are deleted
+    index, report = refresh_index(data_dir, PERSIST_DIR)
+    print(f"Index refreshed: {report.summary()}")
+
+    # Answers are cached per index version: a refresh that changed the index starts afresh
+    query_engine = cached_query_engine(index, index.as_query_engine(), namespace="llama_persist_data")
+    response = query_engine.query("Logic is great for planning, but weak for motivation. what does this mean?")
+    print(response)
+    print(f"Query cache: {query_engine.stats}")
+
+
+if __name__ == "__main__":
+    main()
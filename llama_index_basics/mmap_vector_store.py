@@ -0,0 +1,434 @@
+"""
+Memory-mapped binary vector store for persisted llama_index indexes.
+
+SimpleVectorStore persists embeddings as JSON float lists, so every
+load_index_from_storage() parses the whole file: load time and memory grow
+linearly with the corpus. MmapVectorStore persists the same data as:
+
+- <namespace>__vector_store.npy        float32/float16 matrix, L2-normalized rows
+- <namespace>__vector_store.ids.npy    fixed-width node IDs, one per row
+- <namespace>__vector_store.refs.npy   int32 row → ref doc index
+- <namespace>__vector_store.meta.json  dtype, dim, row count, ref doc ID table
+- <namespace>__vector_store.metadata.jsonl  node metadata, one line per row
+
+The three .npy files are opened with mmap, so loading reads only headers and
+the (per-document) ref doc table. Queries scan the matrix in blocks, and the
+metadata lines are parsed only when a query uses metadata filters.
+Persisting rewrites the files block by block without parsing the metadata.
+
+load_storage_context(persist_dir) is the drop-in for
+StorageContext.from_defaults(persist_dir=...). Existing JSON vector stores are
+read once and converted on the next persist.
+
+Usage:
+  storage_context = load_storage_context("./storage")
+  index = load_index_from_storage(storage_context)
+  ...
+  index.storage_context.persist(persist_dir="./storage")
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core import StorageContext
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.simple import DEFAULT_VECTOR_STORE, NAMESPACE_SEP, SimpleVectorStore
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import build_metadata_filter_fn, node_to_metadata_dict
+from pydantic import PrivateAttr
+
+FORMAT_VERSION = 1
+VECTOR_STORE_FNAME = "vector_store"
+DOCSTORE_FNAME = "docstore.json"
+QUERY_BLOCK_ROWS = 65536
+WRITE_BLOCK_ROWS = 65536
+
+
+def _base_path(persist_path: str) -> str:
+    """StorageContext passes ".../default__vector_store.json"; our files share its stem."""
+    return persist_path[: -len(".json")] if persist_path.endswith(".json") else persist_path
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """
+    Vector store with embeddings in an mmap'ed .npy matrix (cosine similarity).
+
+    Args:
+        dtype: "float32" or "float16" (half the disk and page-cache footprint;
+            blocks are upcast to float32 for scoring, so queries are slower)
+    """
+
+    stores_text: bool = False
+    dtype: str = "float32"
+
+    # Persisted segment (mmap'ed) + rows added since the last persist
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _ids: Optional[np.ndarray] = PrivateAttr(default=None)
+    _refs: Optional[np.ndarray] = PrivateAttr(default=None)
+    _ref_table: List[str] = PrivateAttr(default_factory=list)
+    _metadata_path: Optional[str] = PrivateAttr(default=None)
+    _metadata: Optional[List[dict]] = PrivateAttr(default=None)
+    _deleted: Optional[np.ndarray] = PrivateAttr(default=None)
+    _new_vectors: List[np.ndarray] = PrivateAttr(default_factory=list)
+    _new_ids: List[str] = PrivateAttr(default_factory=list)
+    _new_refs: List[int] = PrivateAttr(default_factory=list)
+    _new_metadata: List[dict] = PrivateAttr(default_factory=list)
+    _ref_index: dict = PrivateAttr(default_factory=dict)
+
+    def __init__(self, dtype: str = "float32", **kwargs: Any):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported dtype {dtype!r}; use float32 or float16")
+        super().__init__(dtype=dtype, **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    # ---- loading ---------------------------------------------------------
+
+    @classmethod
+    def from_persist_path(cls, persist_path: str, dtype: Optional[str] = None, **kwargs: Any) -> "MmapVectorStore":
+        base = _base_path(persist_path)
+        meta_path = base + ".meta.json"
+        if not os.path.exists(meta_path):
+            store = cls(dtype=dtype or "float32", **kwargs)
+            json_path = base + ".json"
+            if os.path.exists(json_path):
+                store._import_simple(SimpleVectorStore.from_persist_path(json_path))
+            return store
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store format in {meta_path}")
+        store = cls(dtype=dtype or meta["dtype"], **kwargs)
+        store._ref_table = meta["ref_doc_ids"]
+        store._ref_index = {ref: i for i, ref in enumerate(store._ref_table)}
+        if meta["count"]:
+            store._matrix = np.load(base + ".npy", mmap_mode="r")
+            store._ids = np.load(base + ".ids.npy", mmap_mode="r")
+            store._refs = np.load(base + ".refs.npy", mmap_mode="r")
+            if not (len(store._matrix) == len(store._ids) == len(store._refs) == meta["count"]):
+                raise ValueError(f"Vector store files under {base} are inconsistent; persist the index again")
+            store._deleted = np.zeros(meta["count"], dtype=bool)
+        store._metadata_path = base + ".metadata.jsonl"
+        return store
+
+    @classmethod
+    def from_persist_dir(
+        cls, persist_dir: str, namespace: str = DEFAULT_VECTOR_STORE, dtype: Optional[str] = None, **kwargs: Any
+    ) -> "MmapVectorStore":
+        path = os.path.join(persist_dir, f"{namespace}{NAMESPACE_SEP}{VECTOR_STORE_FNAME}.json")
+        return cls.from_persist_path(path, dtype=dtype, **kwargs)
+
+    def _import_simple(self, simple: SimpleVectorStore):
+        data = simple.data
+        node_ids = list(data.embedding_dict)
+        if node_ids:
+            self._append(
+                np.asarray([data.embedding_dict[i] for i in node_ids], dtype=np.float32),
+                node_ids,
+                [data.text_id_to_ref_doc_id.get(i, "None") for i in node_ids],
+                [(data.metadata_dict or {}).get(i, {}) for i in node_ids],
+            )
+
+    # ---- sizes / row access ------------------------------------------------
+
+    @property
+    def _base_rows(self) -> int:
+        return 0 if self._matrix is None else len(self._matrix)
+
+    def __len__(self) -> int:
+        deleted = 0 if self._deleted is None else int(self._deleted.sum())
+        return self._base_rows - deleted + len(self._new_ids)
+
+    def __bool__(self) -> bool:
+        # StorageContext.from_defaults(vector_store=...) replaces falsy stores with a SimpleVectorStore
+        return True
+
+    def _ref_id(self, ref_doc_id: str) -> int:
+        if ref_doc_id not in self._ref_index:
+            self._ref_index[ref_doc_id] = len(self._ref_table)
+            self._ref_table.append(ref_doc_id)
+        return self._ref_index[ref_doc_id]
+
+    def _load_metadata(self) -> List[dict]:
+        if self._metadata is None:
+            self._metadata = []
+            if self._base_rows and self._metadata_path and os.path.exists(self._metadata_path):
+                with open(self._metadata_path, "r", encoding="utf-8") as f:
+                    self._metadata = [json.loads(line) for line in f]
+        return self._metadata
+
+    # ---- BasePydanticVectorStore API --------------------------------------
+
+    def _append(self, vectors: np.ndarray, node_ids: List[str], ref_doc_ids: List[str], metadata: List[dict]):
+        self._new_vectors.append(_normalize(vectors).astype(self.dtype))
+        self._new_ids.extend(node_ids)
+        self._new_refs.extend(self._ref_id(ref) for ref in ref_doc_ids)
+        self._new_metadata.extend(metadata)
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        metadata = []
+        for node in nodes:
+            entry = node_to_metadata_dict(node, remove_text=True, flat_metadata=False)
+            entry.pop("_node_content", None)
+            metadata.append(entry)
+        self._append(
+            np.asarray([node.get_embedding() for node in nodes], dtype=np.float32),
+            [node.node_id for node in nodes],
+            [node.ref_doc_id or "None" for node in nodes],
+            metadata,
+        )
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        ref = self._ref_index.get(ref_doc_id)
+        if ref is None:
+            return
+        if self._base_rows:
+            self._deleted |= np.asarray(self._refs) == ref
+        keep = [i for i, r in enumerate(self._new_refs) if r != ref]
+        if len(keep) != len(self._new_refs):
+            self._compact_new(keep)
+
+    def delete_nodes(self, node_ids: Optional[List[str]] = None, filters=None, **delete_kwargs: Any) -> None:
+        if node_ids is None and filters is None:
+            return
+        if self._base_rows:
+            self._deleted |= self._base_mask(node_ids, filters)
+        new_mask = self._new_mask(node_ids, filters)
+        keep = [i for i, hit in enumerate(new_mask) if not hit]
+        if len(keep) != len(self._new_ids):
+            self._compact_new(keep)
+
+    def _compact_new(self, keep: List[int]):
+        vectors = np.concatenate(self._new_vectors) if self._new_vectors else np.zeros((0, 0), self.dtype)
+        self._new_vectors = [vectors[keep]] if keep else []
+        self._new_ids = [self._new_ids[i] for i in keep]
+        self._new_refs = [self._new_refs[i] for i in keep]
+        self._new_metadata = [self._new_metadata[i] for i in keep]
+
+    def clear(self) -> None:
+        if self._base_rows:
+            self._deleted[:] = True
+        self._new_vectors, self._new_ids, self._new_refs, self._new_metadata = [], [], [], []
+
+    def get(self, text_id: str) -> List[float]:
+        if text_id in self._new_ids:
+            i = self._new_ids.index(text_id)
+            return np.concatenate(self._new_vectors)[i].astype(np.float32).tolist()
+        if self._base_rows:
+            rows = np.flatnonzero(np.asarray(self._ids) == text_id.encode("utf-8"))
+            rows = [row for row in rows if not self._deleted[row]]
+            if rows:
+                return np.asarray(self._matrix[rows[0]], dtype=np.float32).tolist()
+        raise KeyError(text_id)
+
+    def _base_mask(self, node_ids: Optional[Sequence[str]], filters) -> np.ndarray:
+        """Rows of the persisted segment selected by node_ids and/or metadata filters."""
+        mask = np.ones(self._base_rows, dtype=bool)
+        if node_ids is not None:
+            wanted = np.asarray([i.encode("utf-8") for i in node_ids], dtype=self._ids.dtype)
+            mask &= np.isin(np.asarray(self._ids), wanted)
+        if filters is not None:
+            metadata = self._load_metadata()
+            filter_fn = build_metadata_filter_fn(lambda row: metadata[row], filters)
+            mask &= np.fromiter((filter_fn(row) for row in range(self._base_rows)), bool, self._base_rows)
+        return mask
+
+    def _new_mask(self, node_ids: Optional[Sequence[str]], filters) -> List[bool]:
+        wanted = set(node_ids) if node_ids is not None else None
+        filter_fn = build_metadata_filter_fn(lambda i: self._new_metadata[i], filters)
+        return [
+            (wanted is None or node_id in wanted) and (filters is None or filter_fn(i))
+            for i, node_id in enumerate(self._new_ids)
+        ]
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise ValueError(f"MmapVectorStore only supports the default (cosine) query mode, not {query.mode}")
+        top_k = query.similarity_top_k
+        q = _normalize(np.asarray(query.query_embedding, dtype=np.float32))
+        scores: List[np.ndarray] = []
+        labels: List[np.ndarray] = []
+
+        def collect(block_scores: np.ndarray, offset: int):
+            if len(block_scores) > top_k:
+                best = np.argpartition(-block_scores, top_k - 1)[:top_k]
+            else:
+                best = np.arange(len(block_scores))
+            best = best[np.isfinite(block_scores[best])]
+            scores.append(block_scores[best])
+            labels.append(best + offset)
+
+        restricted = query.node_ids is not None or query.filters is not None
+        if self._base_rows:
+            allowed = ~self._deleted
+            if restricted:
+                allowed &= self._base_mask(query.node_ids, query.filters)
+            for start in range(0, self._base_rows, QUERY_BLOCK_ROWS):
+                stop = min(start + QUERY_BLOCK_ROWS, self._base_rows)
+                block = np.asarray(self._matrix[start:stop], dtype=np.float32) @ q
+                block[~allowed[start:stop]] = -np.inf
+                collect(block, start)
+        if self._new_ids:
+            if len(self._new_vectors) > 1:
+                self._new_vectors = [np.concatenate(self._new_vectors)]
+            block = self._new_vectors[0].astype(np.float32) @ q
+            if restricted:
+                block[~np.asarray(self._new_mask(query.node_ids, query.filters), dtype=bool)] = -np.inf
+            collect(block, self._base_rows)
+
+        if not scores:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+        all_scores, all_labels = np.concatenate(scores), np.concatenate(labels)
+        order = np.argsort(-all_scores, kind="stable")[:top_k]
+        ids = []
+        for label in all_labels[order]:
+            if label < self._base_rows:
+                ids.append(self._ids[label].decode("utf-8"))
+            else:
+                ids.append(self._new_ids[label - self._base_rows])
+        return VectorStoreQueryResult(similarities=all_scores[order].tolist(), ids=ids)
+
+    # ---- persistence --------------------------------------------------------
+
+    def _live_rows(self) -> Iterator[tuple]:
+        """(vectors, ids, refs, metadata line indices) per block of surviving persisted rows."""
+        for start in range(0, self._base_rows, WRITE_BLOCK_ROWS):
+            stop = min(start + WRITE_BLOCK_ROWS, self._base_rows)
+            keep = np.flatnonzero(~self._deleted[start:stop])
+            yield self._matrix[start:stop][keep], np.asarray(self._ids[start:stop])[keep], \
+                np.asarray(self._refs[start:stop])[keep], keep + start
+
+    def persist(self, persist_path: str, fs=None) -> None:
+        if fs is not None and getattr(fs, "protocol", "file") not in ("file", ("file", "local")):
+            raise NotImplementedError("MmapVectorStore persists to the local filesystem only")
+        base = _base_path(persist_path)
+        unchanged = (
+            not self._new_ids
+            and (self._deleted is None or not self._deleted.any())
+            and (self._matrix is None or self._matrix.dtype == np.dtype(self.dtype))
+        )
+        if unchanged and self._metadata_path == base + ".metadata.jsonl":
+            return  # already on disk as-is
+        os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+        new_vectors = np.concatenate(self._new_vectors) if self._new_vectors else None
+        deleted = 0 if self._deleted is None else int(self._deleted.sum())
+        count = self._base_rows - deleted + len(self._new_ids)
+        dim = self._matrix.shape[1] if self._base_rows else (new_vectors.shape[1] if new_vectors is not None else 0)
+        id_width = max(
+            [self._ids.dtype.itemsize if self._base_rows else 1]
+            + [len(i.encode("utf-8")) for i in self._new_ids]
+        )
+
+        # Ref doc table: only IDs still referenced
+        used_refs = sorted(
+            set(np.unique(np.asarray(self._refs)[~self._deleted]).tolist() if self._base_rows else [])
+            | set(self._new_refs)
+        )
+        remap = np.full(max(len(self._ref_table), 1), -1, dtype=np.int32)
+        remap[used_refs] = np.arange(len(used_refs), dtype=np.int32)
+        ref_table = [self._ref_table[r] for r in used_refs]
+
+        tmp = {suffix: f"{base}{suffix}.tmp" for suffix in (".npy", ".ids.npy", ".refs.npy", ".metadata.jsonl")}
+        if count:
+            matrix_out = np.lib.format.open_memmap(tmp[".npy"], mode="w+", dtype=self.dtype, shape=(count, dim))
+            ids_out = np.lib.format.open_memmap(tmp[".ids.npy"], mode="w+", dtype=f"S{id_width}", shape=(count,))
+            refs_out = np.lib.format.open_memmap(tmp[".refs.npy"], mode="w+", dtype=np.int32, shape=(count,))
+            row = 0
+            with open(tmp[".metadata.jsonl"], "w", encoding="utf-8") as meta_out:
+                lines = None
+                if self._metadata is None and self._metadata_path and os.path.exists(self._metadata_path):
+                    lines = open(self._metadata_path, "r", encoding="utf-8")
+                try:
+                    line_no = 0
+                    for vectors, ids, refs, rows in self._live_rows():
+                        n = len(ids)
+                        matrix_out[row:row + n] = vectors.astype(self.dtype)
+                        ids_out[row:row + n] = ids
+                        refs_out[row:row + n] = remap[refs]
+                        row += n
+                        for r in rows:
+                            if lines is None:
+                                metadata = self._load_metadata()
+                                meta_out.write(json.dumps(metadata[r] if r < len(metadata) else {}) + "\n")
+                                continue
+                            # Copy surviving lines verbatim; no JSON parsing on the write path
+                            while line_no < r:
+                                lines.readline()
+                                line_no += 1
+                            meta_out.write(lines.readline() or "{}\n")
+                            line_no += 1
+                finally:
+                    if lines is not None:
+                        lines.close()
+                if new_vectors is not None:
+                    n = len(self._new_ids)
+                    matrix_out[row:row + n] = new_vectors
+                    ids_out[row:row + n] = [i.encode("utf-8") for i in self._new_ids]
+                    refs_out[row:row + n] = remap[np.asarray(self._new_refs, dtype=np.int32)]
+                    for entry in self._new_metadata:
+                        meta_out.write(json.dumps(entry) + "\n")
+            matrix_out.flush()
+            ids_out.flush()
+            refs_out.flush()
+            del matrix_out, ids_out, refs_out
+
+        # Release our maps of the old files before replacing them (required on Windows)
+        self._matrix = self._ids = self._refs = None
+        for suffix, path in tmp.items():
+            if count:
+                os.replace(path, base + suffix)
+            elif os.path.exists(base + suffix):
+                os.remove(base + suffix)
+        meta = {"version": FORMAT_VERSION, "dtype": self.dtype, "dim": int(dim), "count": int(count), "ref_doc_ids": ref_table}
+        with open(base + ".meta.json.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(base + ".meta.json.tmp", base + ".meta.json")
+        if os.path.exists(base + ".json"):
+            os.remove(base + ".json")  # superseded JSON SimpleVectorStore
+
+        reopened = MmapVectorStore.from_persist_path(persist_path, dtype=self.dtype)
+        for attr in ("_matrix", "_ids", "_refs", "_ref_table", "_ref_index", "_deleted", "_metadata_path"):
+            setattr(self, attr, getattr(reopened, attr))
+        self._metadata = None
+        self._new_vectors, self._new_ids, self._new_refs, self._new_metadata = [], [], [], []
+
+
+def load_storage_context(
+    persist_dir, dtype: Optional[str] = None, vector_store_cls=MmapVectorStore, **store_kwargs: Any
+) -> StorageContext:
+    """
+    StorageContext backed by MmapVectorStore (or a subclass, e.g. HnswVectorStore).
+
+    Drop-in for StorageContext.from_defaults(persist_dir=persist_dir); returns
+    an empty context if persist_dir holds no index yet. dtype defaults to the
+    persisted store's (float32 for a new store).
+    """
+    persist_dir = Path(persist_dir)
+    if not (persist_dir / DOCSTORE_FNAME).exists():
+        return StorageContext.from_defaults(vector_store=vector_store_cls(dtype=dtype or "float32", **store_kwargs))
+    vector_store = vector_store_cls.from_persist_dir(str(persist_dir), dtype=dtype, **store_kwargs)
+    return StorageContext.from_defaults(persist_dir=str(persist_dir), vector_store=vector_store)
@@ -0,0 +1,376 @@
+"""
+Query-response cache in front of a llama_index query engine.
+
+query_engine.query() runs retrieval and an LLM synthesis call every time,
+even for a question that was just answered. CachedQueryEngine wraps any
+query engine and stores its responses (text, source nodes, metadata) in a
+SQLite file shared across runs:
+
+- exact hits: the key is sha256(namespace, index version, normalized query)
+  where normalizing lowercases, collapses whitespace and drops trailing
+  punctuation, so "What is X?" and "what is  x" share an answer;
+- semantic hits (opt in with `semantic_threshold`, e.g.
+  DEFAULT_SEMANTIC_THRESHOLD; off by default, since near-identical questions
+  can differ in the detail that matters): the query embedding is
+  compared with the stored embeddings of earlier queries for the same
+  namespace and index version; the closest answer is returned if its cosine
+  similarity reaches the threshold. On a miss the embedding is handed to
+  the retriever, so the query is still embedded only once;
+- the index version is a digest of the indexed node contents, so any
+  insert, delete or re-chunk changes it. Entries of other versions in the
+  namespace are dropped when the engine is created or update_version() is
+  called;
+- hit / semantic hit / miss counts are kept in `stats`; the file is capped at
+  `max_entries` responses, least recently used first out.
+
+Streaming responses are passed through uncached. The default location is
+~/.cache/llama_index_basics/queries.sqlite (override with LLAMA_QUERY_CACHE).
+
+Usage:
+  query_engine = cached_query_engine(index, index.as_query_engine(), namespace="read_load_query")
+  response = query_engine.query("...")
+  print(query_engine.stats)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.response.schema import Response
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.storage.docstore.utils import doc_to_json, json_to_doc
+
+CACHE_PATH = Path(os.getenv("LLAMA_QUERY_CACHE", Path.home() / ".cache" / "llama_index_basics" / "queries.sqlite"))
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_SEMANTIC_THRESHOLD = 0.95
+EVICT_TO_FRACTION = 0.9
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split()).rstrip("?!.;: ")
+
+
+def index_version(index) -> str:
+    """Digest of the indexed node contents: changes with any insert, delete or update."""
+    digest = hashlib.blake2b(digest_size=16)
+    docs = index.docstore.docs
+    if docs:
+        # Content hashes, so an index rebuilt from the same files (new random IDs) keeps its version
+        for node_hash in sorted(node.hash for node in docs.values()):
+            digest.update(node_hash.encode("utf-8"))
+    else:
+        # The vector store keeps the nodes (e.g. Chroma): fall back to the node IDs
+        for ref_doc_id, info in sorted(index.ref_doc_info.items()):
+            digest.update(f"{ref_doc_id}:{','.join(sorted(info.node_ids))};".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _response_to_json(response: Response) -> str:
+    return json.dumps(
+        {
+            "response": response.response,
+            "source_nodes": [{"node": doc_to_json(n.node), "score": n.score} for n in response.source_nodes],
+            "metadata": response.metadata,
+        },
+        default=str,
+    )
+
+
+def _response_from_json(payload: str) -> Response:
+    data = json.loads(payload)
+    return Response(
+        response=data["response"],
+        source_nodes=[NodeWithScore(node=json_to_doc(n["node"]), score=n["score"]) for n in data["source_nodes"]],
+        metadata=data["metadata"],
+    )
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.semantic_hits + self.misses
+        return (self.hits + self.semantic_hits) / total if total else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} exact hits, {self.semantic_hits} semantic hits, {self.misses} misses "
+            f"({self.hit_rate:.0%} hit rate)"
+        )
+
+
+class QueryCache:
+    """
+    SQLite store of responses keyed by (namespace, version, query text), with their query embeddings.
+
+    Args:
+        path: SQLite file (created with its folder)
+        max_entries: Cap on stored responses; least recently used entries are evicted
+    """
+
+    def __init__(self, path=None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path if path is not None else CACHE_PATH)
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key BLOB PRIMARY KEY, namespace TEXT NOT NULL, version TEXT NOT NULL, query TEXT NOT NULL,"
+            " embedding BLOB, response TEXT NOT NULL, last_used INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_namespace ON responses (namespace, version)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        # (namespace, version) -> (keys, normalized embedding matrix), loaded on first semantic lookup
+        self._embeddings: Dict[Tuple[str, str], Tuple[List[bytes], np.ndarray]] = {}
+
+    @staticmethod
+    def key(namespace: str, version: str, query: str) -> bytes:
+        return hashlib.sha256(f"{namespace}\0{version}\0{query}".encode("utf-8")).digest()
+
+    def _touch(self, key: bytes) -> Optional[str]:
+        row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time_ns(), key))
+        self._conn.commit()
+        return row[0]
+
+    def get(self, namespace: str, version: str, query: str) -> Optional[str]:
+        """The stored response for exactly this query, or None."""
+        with self._lock:
+            return self._touch(self.key(namespace, version, query))
+
+    def get_similar(self, namespace: str, version: str, embedding, threshold: float) -> Optional[str]:
+        """The stored response of the most similar earlier query, if its cosine similarity reaches threshold."""
+        with self._lock:
+            keys, matrix = self._semantic_index(namespace, version)
+            if not keys:
+                return None
+            query = np.asarray(embedding, dtype=np.float32)
+            scores = matrix @ (query / (np.linalg.norm(query) or 1.0))
+            best = int(np.argmax(scores))
+            if scores[best] < threshold:
+                return None
+            return self._touch(keys[best])
+
+    def _semantic_index(self, namespace: str, version: str) -> Tuple[List[bytes], np.ndarray]:
+        cached = self._embeddings.get((namespace, version))
+        if cached is None:
+            rows = self._conn.execute(
+                "SELECT key, embedding FROM responses WHERE namespace = ? AND version = ? AND embedding IS NOT NULL",
+                (namespace, version),
+            ).fetchall()
+            keys = [key for key, _ in rows]
+            matrix = np.array([np.frombuffer(blob, dtype=np.float32) for _, blob in rows], dtype=np.float32)
+            if rows:
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                matrix /= np.where(norms == 0, 1.0, norms)
+            cached = (keys, matrix)
+            self._embeddings[(namespace, version)] = cached
+        return cached
+
+    def put(self, namespace: str, version: str, query: str, response: str, embedding=None):
+        key = self.key(namespace, version, query)
+        blob = np.asarray(embedding, dtype=np.float32).tobytes() if embedding is not None else None
+        with self._lock:
+            replaced = self._conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is not None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, version, query, blob, response, time.time_ns()),
+            )
+            self._conn.commit()
+            self._count += 0 if replaced else 1
+            self._embeddings.pop((namespace, version), None)
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is at EVICT_TO_FRACTION of the cap."""
+        # Recount: other processes share the file
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = count - int(self.max_entries * EVICT_TO_FRACTION)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            self._conn.commit()
+            count -= excess
+            self._embeddings.clear()
+        self._count = count
+
+    def drop_stale(self, namespace: str, version: str) -> int:
+        """Delete the namespace's entries of every other version; returns how many were deleted."""
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM responses WHERE namespace = ? AND version != ?", (namespace, version)
+            ).rowcount
+            self._conn.commit()
+            self._count -= deleted
+            self._embeddings = {k: v for k, v in self._embeddings.items() if k[0] != namespace or k[1] == version}
+            return deleted
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedQueryEngine(BaseQueryEngine):
+    """
+    Query engine that answers repeated (or, optionally, near-identical) queries from a QueryCache.
+
+    Args:
+        query_engine: The engine that answers cache misses
+        version: Index version (see index_version); part of every key
+        namespace: Separates engines with different settings (prompt, top_k, ...) sharing a cache file
+        cache: QueryCache; defaults to one at CACHE_PATH
+        embed_model: Embeds queries for semantic lookups; must be the index's embed model,
+            the query embedding is reused for retrieval
+        semantic_threshold: Minimum cosine similarity for a semantic hit; None disables them
+    """
+
+    def __init__(
+        self,
+        query_engine: BaseQueryEngine,
+        version: str,
+        namespace: str = "default",
+        cache: Optional[QueryCache] = None,
+        embed_model: Optional[BaseEmbedding] = None,
+        semantic_threshold: Optional[float] = None,
+    ):
+        super().__init__(callback_manager=query_engine.callback_manager)
+        self._query_engine = query_engine
+        self._namespace = namespace
+        self._cache = cache if cache is not None else QueryCache()
+        self._embed_model = embed_model
+        self._semantic_threshold = semantic_threshold
+        self.stats = CacheStats()
+        self.update_version(version)
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    def update_version(self, version: str):
+        """Switch to a new index version (after inserts / deletes) and drop the answers of the old ones."""
+        self._version = version
+        self._cache.drop_stale(self._namespace, version)
+
+    def _lookup(self, query_bundle: QueryBundle) -> Tuple[str, Optional[Response]]:
+        text = normalize_query(query_bundle.query_str)
+        payload = self._cache.get(self._namespace, self._version, text)
+        if payload is not None:
+            self.stats.hits += 1
+            return text, _response_from_json(payload)
+        return text, None
+
+    def _semantic_lookup(self, query_bundle: QueryBundle) -> Optional[Response]:
+        if query_bundle.embedding is None:
+            return None
+        payload = self._cache.get_similar(
+            self._namespace, self._version, query_bundle.embedding, self._semantic_threshold
+        )
+        if payload is None:
+            return None
+        self.stats.semantic_hits += 1
+        return _response_from_json(payload)
+
+    def _store(self, text: str, query_bundle: QueryBundle, response):
+        self.stats.misses += 1
+        if isinstance(response, Response) and response.response:
+            self._cache.put(self._namespace, self._version, text, _response_to_json(response), query_bundle.embedding)
+
+    def _semantic(self, query_bundle: QueryBundle) -> bool:
+        return self._semantic_threshold is not None and self._embed_model is not None and query_bundle.embedding is None
+
+    def _query(self, query_bundle: QueryBundle):
+        text, response = self._lookup(query_bundle)
+        if response is not None:
+            return response
+        if self._semantic(query_bundle):
+            query_bundle = QueryBundle(
+                query_bundle.query_str,
+                custom_embedding_strs=query_bundle.custom_embedding_strs,
+                embedding=self._embed_model.get_agg_embedding_from_queries(query_bundle.embedding_strs),
+            )
+            response = self._semantic_lookup(query_bundle)
+            if response is not None:
+                return response
+        response = self._query_engine.query(query_bundle)
+        self._store(text, query_bundle, response)
+        return response
+
+    async def _aquery(self, query_bundle: QueryBundle):
+        text, response = self._lookup(query_bundle)
+        if response is not None:
+            return response
+        if self._semantic(query_bundle):
+            query_bundle = QueryBundle(
+                query_bundle.query_str,
+                custom_embedding_strs=query_bundle.custom_embedding_strs,
+                embedding=await self._embed_model.aget_agg_embedding_from_queries(query_bundle.embedding_strs),
+            )
+            response = self._semantic_lookup(query_bundle)
+            if response is not None:
+                return response
+        response = await self._query_engine.aquery(query_bundle)
+        self._store(text, query_bundle, response)
+        return response
+
+    def _get_prompt_modules(self) -> dict:
+        return {"query_engine": self._query_engine}
+
+
+def cached_query_engine(
+    index,
+    query_engine: BaseQueryEngine,
+    namespace: str = "default",
+    cache: Optional[QueryCache] = None,
+    semantic_threshold: Optional[float] = None,
+) -> CachedQueryEngine:
+    """
+    Wrap a query engine over `index` with a CachedQueryEngine.
+
+    Args:
+        index: The queried index; its contents give the version
+        query_engine: e.g. index.as_query_engine()
+        namespace: Name of this engine configuration, e.g. the script name (Settings.llm's
+            model name is appended)
+        cache: QueryCache; defaults to one at CACHE_PATH
+        semantic_threshold: Minimum cosine similarity for a semantic hit (DEFAULT_SEMANTIC_THRESHOLD is a
+            reasonable start); None for exact hits only
+
+    Returns:
+        The cached engine. Call update_version(index_version(index)) after changing the index in-process.
+    """
+    return CachedQueryEngine(
+        query_engine,
+        index_version(index),
+        namespace=f"{namespace}:{Settings.llm.metadata.model_name}",
+        cache=cache,
+        embed_model=index._embed_model,
+        semantic_threshold=semantic_threshold,
+    )
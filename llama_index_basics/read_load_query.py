@@ -4,14 +4,17 @@ and then queries the index with a question to return a response.
 """
 
 from llama_index.llms.openai import OpenAI
-from llama_index.core import Settings, VectorStoreIndex, SimpleDirectoryReader, get_response_synthesizer
-from llama_index.core.retrievers import VectorIndexRetriever
+from llama_index.core import Settings, VectorStoreIndex, get_response_synthesizer
 from llama_index.core.response_synthesizers import ResponseMode
 from llama_index.core.query_engine import RetrieverQueryEngine
-from llama_index.core.postprocessor import SimilarityPostprocessor
 from dotenv import load_dotenv
 import os
 
+from document_loader import load_documents
+from embedding_cache import enable_embedding_cache
+from hybrid_retriever import hybrid_retriever
+from query_cache import cached_query_engine
+
 def main():
     """Main function to demonstrate reading documents, loading them into a VectorStoreIndex,
     and querying the index with a question to return a response.
@@ -25,9 +28,12 @@ def main():
 
     # Set the OpenAI model and temperature
     Settings.llm = OpenAI(temperature=0.2, model="gpt-4o-mini")
+    # Chunks embedded by an earlier run (of any script) are read from the local cache
+    enable_embedding_cache()
 
-    # Load data using SimpleDirectoryReader
-    documents = SimpleDirectoryReader("./data").load_data()
+    # Load data: PDFs are parsed in parallel worker processes on the first run,
+    # then read from the parsed-document cache
+    documents = load_documents("./data")
     index = VectorStoreIndex.from_documents(documents)
 
     # Print the number of documents
@@ -35,30 +41,26 @@ def main():
     print(f"Display a document in the Index: {documents[25].text}")
     print("---------------------------------------------")
 
-    # Configure retriever
-    retriever = VectorIndexRetriever(index=index, similarity_top_k=10)
+    # Configure retriever: vector search and BM25 keyword search, fused by reciprocal rank
+    retriever = hybrid_retriever(index, similarity_top_k=10)
 
     # The response synthesizer is used to turn the response data into a human-readable format
     response_synthesizer = get_response_synthesizer(response_mode=ResponseMode.COMPACT)
 
     # The query engine is used to query the index and generate a response
+    # (no similarity cutoff: fused scores are reciprocal ranks, not cosine similarities)
     query_engine = RetrieverQueryEngine(
         retriever=retriever,
-        node_postprocessors=[
-            SimilarityPostprocessor(
-                similarity_cutoff=0.7,  # filter nodes with similarity score below the cutoff
-                filter_empty=True,  # filter empty nodes
-                filter_duplicates=True,  # filter duplicate nodes
-                filter_similar=True,  # filter similar nodes
-            )
-        ],
         response_synthesizer=response_synthesizer,
     )
+    # Repeated (or near-identical) questions are answered from the query cache, without an LLM call
+    query_engine = cached_query_engine(index, query_engine, namespace="read_load_query_hybrid")
 
     # Query the index and print the response
     question = "What are the Potential Benefits of Social Media Use Among Children and Adolescents?"
     response = query_engine.query(question)
     print(response)
+    print(f"Query cache: {query_engine.stats}")
 
 if __name__ == "__main__":
     main()
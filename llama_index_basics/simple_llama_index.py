@@ -7,6 +7,8 @@ from llama_index.llms.openai import OpenAI
 from llama_index.core import Settings, VectorStoreIndex, SimpleDirectoryReader
 from dotenv import load_dotenv
 
+from query_cache import cached_query_engine
+
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
@@ -30,7 +32,8 @@ print(documents[1])
 print(documents[3])
 
 index = VectorStoreIndex.from_documents(documents)
-query_engine = index.as_query_engine()
+# Repeated (or near-identical) questions are answered from the query cache, without an LLM call
+query_engine = cached_query_engine(index, index.as_query_engine(), namespace="simple_llama_index")
 response = query_engine.query("Logic is great for planning, but weak for motivation. what does this mean?")
 
 print(response)
\ No newline at end of file
@@ -11,11 +11,22 @@ from llama_index.llms.gemini import Gemini
 from dotenv import load_dotenv
 import os
 
+from query_cache import QueryCache
+
 # Load the OpenAI API Key into the environment variable named OPENAI_API_KEY
 load_dotenv()   
 api_key = os.getenv("GEMINI_API_KEY")
 os.environ["GOOGLE_API_KEY"] = api_key
 
+MODEL = "models/gemini-1.5-pro"
+
+
+@st.cache_resource
+def query_cache():
+    # Shared across reruns and sessions: the same question + code is only sent to the model once
+    return QueryCache()
+
+
 def check_code(code, question, language):
 
     # Prompt templates
@@ -38,10 +49,16 @@ def check_code(code, question, language):
     # you can create text prompt (for completion API)
     prompt = qa_template.format(language=language, question=question, code=code)
 
-    llm = Gemini(model="models/gemini-1.5-pro")
+    # Exact prompt match only: code is case and whitespace sensitive
+    cached = query_cache().get("streamlit_codechecker", MODEL, prompt)
+    if cached is not None:
+        return cached
+
+    llm = Gemini(model=MODEL)
     
     chat_engine = SimpleChatEngine.from_defaults(llm=llm)
-    response = chat_engine.chat(prompt)
+    response = str(chat_engine.chat(prompt))
+    query_cache().put("streamlit_codechecker", MODEL, prompt, response)
     
     return response
 
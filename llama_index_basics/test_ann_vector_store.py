@@ -0,0 +1,123 @@
+"""
+Test the HNSW vector store against exact search, across persists and mutations
+"""
+
+import numpy as np
+import pytest
+from llama_index.core import Document, Settings, VectorStoreIndex, load_index_from_storage
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import ExactMatchFilter, MetadataFilters, VectorStoreQuery
+
+from ann_vector_store import HnswVectorStore
+from mmap_vector_store import MmapVectorStore, load_storage_context
+
+DIM = 16
+
+
+def make_nodes(n, seed=0, doc_count=10):
+    rng = np.random.default_rng(seed)
+    return [
+        TextNode(
+            id_=f"node-{seed}-{i}",
+            text=f"text {i}",
+            embedding=rng.normal(size=DIM).tolist(),
+            metadata={"topic": "even" if i % 2 == 0 else "odd"},
+            relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=f"doc-{seed}-{i % doc_count}")},
+        )
+        for i in range(n)
+    ]
+
+
+def query(store, vector, k=10, **kwargs):
+    return store.query(VectorStoreQuery(query_embedding=list(vector), similarity_top_k=k), **kwargs)
+
+
+def recall(store, exact, queries, k=10):
+    hits = sum(len(set(query(store, q, k).ids) & set(query(exact, q, k).ids)) for q in queries)
+    return hits / (k * len(queries))
+
+
+@pytest.fixture
+def queries():
+    return np.random.default_rng(42).normal(size=(20, DIM))
+
+
+def test_matches_exact_search(queries):
+    nodes = make_nodes(500)
+    store, exact = HnswVectorStore(ef_search=100), MmapVectorStore()
+    store.add(nodes)
+    exact.add(nodes)
+    assert recall(store, exact, queries) >= 0.95
+    result, expected = query(store, queries[0], k=1), query(exact, queries[0], k=1)
+    assert result.ids == expected.ids
+    assert np.allclose(result.similarities, expected.similarities, atol=1e-5)
+
+
+def test_persist_reload_insert_delete(queries, tmp_path):
+    path = str(tmp_path / "default__vector_store.json")
+    first, second = make_nodes(400, seed=0), make_nodes(200, seed=1)
+    store = HnswVectorStore()
+    store.add(first)
+    store.persist(path)
+    assert (tmp_path / "default__vector_store.hnsw.bin").exists()
+
+    reloaded = HnswVectorStore.from_persist_path(path)
+    assert reloaded._graph is None  # read on the first query
+    reloaded.add(second)
+    reloaded.delete("doc-0-3")
+    reloaded.delete_nodes(node_ids=["node-1-5"])
+
+    exact = MmapVectorStore()
+    exact.add([n for n in first + second if n.ref_doc_id != "doc-0-3" and n.node_id != "node-1-5"])
+    assert recall(reloaded, exact, queries) >= 0.95
+    returned = {i for q in queries for i in query(reloaded, q, k=20).ids}
+    assert not any(i.startswith("node-0-") and int(i.rsplit("-", 1)[1]) % 10 == 3 for i in returned)
+    assert "node-1-5" not in returned
+
+    reloaded.persist(path)
+    final = HnswVectorStore.from_persist_path(path)
+    assert len(final) == len(exact)
+    assert recall(final, exact, queries) >= 0.95
+    final.add(make_nodes(5, seed=2))  # labels keep growing past the persisted ones
+    assert query(final, make_nodes(5, seed=2)[3].embedding, k=1).ids == ["node-2-3"]
+
+
+def test_stale_graph_is_rebuilt(queries, tmp_path):
+    path = str(tmp_path / "default__vector_store.json")
+    store = HnswVectorStore()
+    store.add(make_nodes(300))
+    store.persist(path)
+    # Rows rewritten by a plain MmapVectorStore: the saved graph no longer matches
+    plain = MmapVectorStore.from_persist_path(path)
+    plain.delete("doc-0-1")
+    plain.persist(path)
+
+    reloaded = HnswVectorStore.from_persist_path(path)
+    assert recall(reloaded, plain, queries) >= 0.95
+
+
+def test_filters_fall_back_to_exact_and_ef_per_query(queries):
+    store = HnswVectorStore(ef_search=10)
+    store.add(make_nodes(300))
+    filters = MetadataFilters(filters=[ExactMatchFilter(key="topic", value="odd")])
+    result = store.query(VectorStoreQuery(query_embedding=list(queries[0]), similarity_top_k=5, filters=filters))
+    assert len(result.ids) == 5 and all(int(i.rsplit("-", 1)[1]) % 2 == 1 for i in result.ids)
+    assert len(query(store, queries[0], k=50, ef=200).ids) == 50
+
+
+def test_storage_context_roundtrip(tmp_path):
+    previous = Settings._embed_model
+    Settings.embed_model = MockEmbedding(embed_dim=DIM)
+    try:
+        context = load_storage_context(tmp_path, vector_store_cls=HnswVectorStore, ef_search=32)
+        assert isinstance(context.vector_store, HnswVectorStore)
+        index = VectorStoreIndex.from_documents(
+            [Document(text=f"document number {i}", id_=f"doc{i}") for i in range(4)], storage_context=context
+        )
+        index.storage_context.persist(persist_dir=str(tmp_path))
+        index = load_index_from_storage(load_storage_context(tmp_path, vector_store_cls=HnswVectorStore))
+        assert isinstance(index.vector_store, HnswVectorStore) and len(index.vector_store) == 4
+        assert len(index.as_retriever(similarity_top_k=2).retrieve("document")) == 2
+    finally:
+        Settings._embed_model = previous
@@ -0,0 +1,103 @@
+"""
+Test idempotent Chroma ingestion against a local persistent client
+"""
+
+import chromadb
+import pytest
+from llama_index.core import Document, Settings
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.node_parser import SentenceSplitter
+
+from chroma_ingest import attach_index, ingest_documents
+
+
+class CountingEmbedding(MockEmbedding):
+    calls: int = 0
+    batches: int = 0
+
+    def _get_text_embeddings(self, texts):
+        self.batches += 1
+        return super()._get_text_embeddings(texts)
+
+    def _get_text_embedding(self, text):
+        self.calls += 1
+        return super()._get_text_embedding(text)
+
+
+@pytest.fixture
+def embed_model():
+    previous = Settings._embed_model
+    Settings.embed_model = CountingEmbedding(embed_dim=8)
+    yield Settings.embed_model
+    Settings._embed_model = previous
+
+
+@pytest.fixture
+def collection(tmp_path):
+    return chromadb.PersistentClient(path=str(tmp_path / "chroma_db")).get_or_create_collection("quickstart")
+
+
+def load(pages):
+    # Fresh Document objects each time, like a new SimpleDirectoryReader run (random IDs)
+    return [Document(text=text, metadata={"file_name": name}) for name, text in pages]
+
+
+PAGES = [
+    ("advisory.pdf", " ".join(f"Social media sentence number {i}." for i in range(300))),
+    ("advisory.pdf", "Header\n\n" + " ".join(f"Second page sentence {i}." for i in range(200))),
+    ("illness.pdf", " ".join(f"Mental illness sentence {i}." for i in range(150))),
+]
+SPLITTER = [SentenceSplitter(chunk_size=128, chunk_overlap=0)]
+
+
+def test_rerun_skips_existing_chunks(embed_model, collection):
+    first = ingest_documents(load(PAGES), collection, transformations=SPLITTER, batch_size=4, concurrency=3)
+    assert first.embedded == first.nodes == collection.count() > 8
+    assert embed_model.calls == first.nodes
+    assert embed_model.batches == -(-first.nodes // 4)
+
+    embed_model.calls = 0
+    second = ingest_documents(load(PAGES), collection, transformations=SPLITTER, batch_size=4, concurrency=3)
+    assert second.skipped == second.nodes == first.nodes and second.embedded == 0
+    assert embed_model.calls == 0
+    assert collection.count() == first.nodes
+
+
+def test_only_new_content_is_embedded(embed_model, collection):
+    first = ingest_documents(load(PAGES), collection, transformations=SPLITTER)
+    embed_model.calls = 0
+
+    extra = PAGES + [("new.pdf", "A brand new document about sleep and screens.")]
+    report = ingest_documents(load(extra), collection, transformations=SPLITTER)
+
+    assert report.embedded == 1 and embed_model.calls == 1
+    assert collection.count() == first.nodes + 1
+
+
+def test_changed_files_leave_no_stale_chunks(embed_model, collection):
+    ingest_documents(load(PAGES), collection, transformations=SPLITTER)
+
+    # advisory.pdf is edited down to one page; illness.pdf is unchanged
+    edited = [("advisory.pdf", "The advisory was rewritten in a single short page."), PAGES[2]]
+    report = ingest_documents(load(edited), collection, transformations=SPLITTER)
+    assert report.embedded == 1 and report.removed > 0
+    assert collection.count() == report.nodes
+    stored = collection.get(include=["metadatas"])["metadatas"]
+    assert {m["document_id"] for m in stored} == {"advisory.pdf#0", "illness.pdf#0"}
+
+    # A run over other files leaves these alone
+    ingest_documents(load([("new.pdf", "Another document.")]), collection, transformations=SPLITTER)
+    assert collection.count() == report.nodes + 1
+
+
+def test_repeated_chunks_keep_distinct_ids(embed_model, collection):
+    pages = [("a.pdf", "same text"), ("a.pdf", "same text"), ("b.pdf", "same text")]
+    report = ingest_documents(load(pages), collection, transformations=SPLITTER)
+    assert report.nodes == 3 and collection.count() == 3
+
+
+def test_attach_index_queries_without_loading(embed_model, collection):
+    ingest_documents(load(PAGES), collection, transformations=SPLITTER)
+    nodes = attach_index(collection).as_retriever(similarity_top_k=3).retrieve("social media")
+    assert len(nodes) == 3
+    assert all(n.node.ref_doc_id in {"advisory.pdf#0", "advisory.pdf#1", "illness.pdf#0"} for n in nodes)
@@ -0,0 +1,82 @@
+"""
+Test parallel, cached document loading against SimpleDirectoryReader
+"""
+
+import os
+import shutil
+
+import pytest
+from llama_index.core import SimpleDirectoryReader
+
+import document_loader
+from document_loader import iter_documents, load_documents
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+PDFS = ["what_is_mental_illness.pdf", "sg-youth-mental-health-social-media-advisory.pdf"]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    for name, text in [("a.txt", "alpha " * 50), ("b.txt", "bravo " * 50), ("c.md", "# charlie\n\ntext")]:
+        (data / name).write_text(text)
+    return data
+
+
+@pytest.fixture
+def parse_calls(monkeypatch):
+    calls = []
+    parse_file = document_loader.parse_file
+
+    def counting(path):
+        calls.append(os.path.basename(path))
+        return parse_file(path)
+
+    monkeypatch.setattr(document_loader, "parse_file", counting)
+    return calls
+
+
+def comparable(documents):
+    return [(d.text, d.metadata, d.excluded_embed_metadata_keys, d.excluded_llm_metadata_keys) for d in documents]
+
+
+def test_matches_simple_directory_reader_and_caches(corpus, tmp_path, parse_calls):
+    cache_dir = tmp_path / "cache"
+    expected = SimpleDirectoryReader(str(corpus)).load_data()
+    first = load_documents(str(corpus), workers=1, cache_dir=cache_dir)
+    assert comparable(first) == comparable(expected)
+    assert len(parse_calls) == 3
+
+    second = load_documents(str(corpus), workers=1, cache_dir=cache_dir)
+    assert comparable(second) == comparable(expected)
+    assert len(parse_calls) == 3  # all served from the cache
+    assert {d.id_ for d in first}.isdisjoint(d.id_ for d in second)
+
+
+def test_only_changed_files_are_reparsed(corpus, tmp_path, parse_calls):
+    cache_dir = tmp_path / "cache"
+    load_documents(str(corpus), workers=1, cache_dir=cache_dir)
+    (corpus / "b.txt").write_text("bravo changed")
+    shutil.copy(corpus / "a.txt", corpus / "copy_of_a.txt")
+
+    documents = load_documents(str(corpus), workers=1, cache_dir=cache_dir)
+    assert parse_calls[3:] == ["b.txt"]
+    copy = next(d for d in documents if d.metadata["file_name"] == "copy_of_a.txt")
+    assert copy.text.startswith("alpha") and copy.metadata["file_path"].endswith("copy_of_a.txt")
+
+
+def test_streams_hits_before_parsed_files(corpus, tmp_path, parse_calls):
+    cache_dir = tmp_path / "cache"
+    load_documents(input_files=[str(corpus / "b.txt")], workers=1, cache_dir=cache_dir)
+    order = [path.name for path, _ in iter_documents(str(corpus), workers=1, cache_dir=cache_dir)]
+    assert order[0] == "b.txt" and sorted(order) == ["a.txt", "b.txt", "c.md"]
+
+
+def test_process_pool_parses_pdfs(tmp_path):
+    files = [os.path.join(DATA_DIR, name) for name in PDFS]
+    expected = SimpleDirectoryReader(input_files=files).load_data()
+    documents = load_documents(input_files=files, workers=2, cache_dir=tmp_path / "cache")
+    assert comparable(documents) == comparable(expected)
+    cached = load_documents(input_files=files, workers=2, cache_dir=tmp_path / "cache")
+    assert comparable(cached) == comparable(expected)
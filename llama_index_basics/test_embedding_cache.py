@@ -0,0 +1,92 @@
+"""
+Test the persistent embedding cache: hits across runs, model separation and the size cap
+"""
+
+import numpy as np
+import pytest
+from llama_index.core import Document, Settings, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+
+from embedding_cache import CachedEmbedding, EmbeddingCache, enable_embedding_cache
+
+
+class CountingEmbedding(MockEmbedding):
+    calls: int = 0
+
+    def _get_text_embedding(self, text):
+        self.calls += 1
+        # Text-dependent vectors, so cache mix-ups show up
+        return np.random.default_rng(abs(hash(text)) % 2**32).normal(size=self.embed_dim).tolist()
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return tmp_path / "embeddings.sqlite"
+
+
+def test_second_run_is_served_from_disk(cache_path):
+    texts = [f"chunk {i}" for i in range(1200)]  # more than one lookup batch
+    first = CachedEmbedding(CountingEmbedding(embed_dim=8), EmbeddingCache(cache_path))
+    expected = first.get_text_embedding_batch(texts)
+    assert first.embed_model.calls == 1200 and first.misses == 1200
+
+    # A new process: fresh model and cache objects on the same file
+    second = CachedEmbedding(CountingEmbedding(embed_dim=8), EmbeddingCache(cache_path))
+    got = second.get_text_embedding_batch(texts + ["one new chunk"])
+    assert second.embed_model.calls == 1 and second.hits == 1200
+    assert np.allclose(got[:1200], expected, atol=1e-6)
+
+
+def test_duplicate_texts_are_embedded_once(cache_path):
+    cached = CachedEmbedding(CountingEmbedding(embed_dim=8), EmbeddingCache(cache_path))
+    result = cached.get_text_embedding_batch(["same", "same", "other"])
+    assert cached.embed_model.calls == 2 and result[0] == result[1]
+
+
+def test_model_settings_are_part_of_the_key(cache_path):
+    cache = EmbeddingCache(cache_path)
+    CachedEmbedding(CountingEmbedding(embed_dim=8), cache).get_text_embedding_batch(["a", "b"])
+    other = CachedEmbedding(CountingEmbedding(embed_dim=16), cache)
+    assert len(other.get_text_embedding_batch(["a", "b"])[0]) == 16
+    assert other.embed_model.calls == 2
+    # Batch size is transport, not content: still a hit
+    same = CachedEmbedding(CountingEmbedding(embed_dim=8, embed_batch_size=3), cache)
+    same.get_text_embedding_batch(["a", "b"])
+    assert same.embed_model.calls == 0
+
+
+def test_size_cap_evicts_least_recently_used(cache_path):
+    cache = EmbeddingCache(cache_path, max_bytes=100 * 8 * 4)  # room for 100 vectors of dim 8
+    cached = CachedEmbedding(CountingEmbedding(embed_dim=8), cache)
+    cached.get_text_embedding_batch([f"old {i}" for i in range(60)])
+    cached.get_text_embedding_batch([f"new {i}" for i in range(60)])
+    assert len(cache) <= 100
+    cached.embed_model.calls = 0
+    cached.get_text_embedding_batch([f"new {i}" for i in range(60)])
+    assert cached.embed_model.calls == 0
+
+
+def test_rewritten_keys_are_not_counted_twice(cache_path):
+    cache = EmbeddingCache(cache_path)
+    items = {EmbeddingCache.key("model", f"chunk {i}"): [float(i)] * 8 for i in range(10)}
+    for _ in range(3):
+        cache.put_many(items)
+    assert cache._total_bytes == 10 * 8 * 4
+    assert EmbeddingCache(cache_path)._total_bytes == cache._total_bytes
+
+
+def test_index_build_uses_cache(cache_path):
+    previous = Settings._embed_model
+    Settings.embed_model = CountingEmbedding(embed_dim=8)
+    try:
+        embed_model = enable_embedding_cache(cache_path)
+        assert enable_embedding_cache(cache_path) is embed_model
+        documents = [Document(text=f"document number {i} " * 50) for i in range(5)]
+        VectorStoreIndex.from_documents(documents)
+        calls = embed_model.embed_model.calls
+        assert calls > 0
+        VectorStoreIndex.from_documents([Document(text=d.text) for d in documents])
+        assert embed_model.embed_model.calls == calls
+        assert len(embed_model.get_query_embedding("a question")) == 8
+    finally:
+        Settings._embed_model = previous
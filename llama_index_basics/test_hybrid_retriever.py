@@ -0,0 +1,110 @@
+"""
+Test BM25 scoring, reciprocal-rank fusion, the hybrid retriever and BM25 persistence
+"""
+
+import math
+
+import pytest
+from llama_index.core import Document, Settings, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import TextNode
+
+from hybrid_retriever import BM25_NAME, BM25Index, hybrid_retriever, load_or_build_bm25, reciprocal_rank_fusion, tokenize
+from incremental_index import refresh_index
+
+
+@pytest.fixture(autouse=True)
+def parse_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr("document_loader.CACHE_DIR", tmp_path / "parse_cache")
+
+
+@pytest.fixture
+def embed_model():
+    previous = Settings._embed_model
+    # Every text gets the same vector: the vector ranking carries no signal
+    Settings.embed_model = MockEmbedding(embed_dim=8)
+    yield Settings.embed_model
+    Settings._embed_model = previous
+
+
+def reference_bm25(docs, query, k1=1.5, b=0.75):
+    tokens = [tokenize(d) for d in docs]
+    avgdl = sum(map(len, tokens)) / len(tokens)
+    scores = []
+    for doc in tokens:
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in d for d in tokens)
+            tf = doc.count(term)
+            if tf:
+                idf = math.log(1 + (len(tokens) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avgdl))
+        scores.append(score)
+    return scores
+
+
+def test_bm25_matches_reference_scores():
+    docs = [
+        "The cat sat on the mat.",
+        "A dog chased the cat around the garden, the cat ran.",
+        "Stock markets fell sharply today.",
+        "Cats and dogs: a guide to pets and their garden habits.",
+    ]
+    bm25 = BM25Index.from_nodes([TextNode(text=d, id_=f"n{i}") for i, d in enumerate(docs)])
+    for query in ["cat garden", "the markets", "unknown words"]:
+        assert bm25.scores(query).tolist() == pytest.approx(reference_bm25(docs, query), rel=1e-5)
+    assert [node_id for node_id, _ in bm25.top_k("cat garden", 2)] == ["n1", "n0"]
+    assert bm25.top_k("unknown words", 3) == []
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], rrf_k=60)
+    assert [node_id for node_id, _ in fused] == ["a", "c", "b"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+
+
+class KeywordBlindEmbedding(MockEmbedding):
+    """Queries embed like the filler text and unlike the keyword document, so only BM25 can find it."""
+
+    def _get_text_embedding(self, text):
+        return [0.0, 1.0] + [0.0] * (self.embed_dim - 2) if "zephyrine" in text else self._get_query_embedding(text)
+
+    def _get_query_embedding(self, query):
+        return [1.0] + [0.0] * (self.embed_dim - 1)
+
+
+def test_hybrid_retriever_finds_keyword_matches(embed_model):
+    documents = [Document(text=f"Generic filler paragraph number {i} about nothing much.") for i in range(40)]
+    documents.append(Document(text="The zephyrine protocol was ratified in 1998."))
+    index = VectorStoreIndex.from_documents(documents, embed_model=KeywordBlindEmbedding(embed_dim=8))
+    retriever = hybrid_retriever(index, similarity_top_k=3, candidate_k=5)
+    results = retriever.retrieve("what is the zephyrine protocol?")
+    vector_hits = retriever._vector_retriever.retrieve("what is the zephyrine protocol?")
+    assert not any("zephyrine" in n.node.get_content() for n in vector_hits)
+    assert len(results) == 3
+    # Found by BM25 alone (tied with the vector top hit), fetched from the docstore
+    assert any("zephyrine" in n.node.get_content() for n in results[:2])
+    assert results[0].score == results[1].score == pytest.approx(1 / 61)
+
+
+def test_bm25_is_persisted_with_the_index(embed_model, tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "a.txt").write_text("alpha bravo charlie")
+    (data / "b.txt").write_text("delta echo foxtrot")
+    storage = tmp_path / "storage"
+    index, _ = refresh_index(data, storage)
+    assert (storage / BM25_NAME).exists()
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("BM25 index rebuilt")
+
+    with monkeypatch.context() as m:
+        m.setattr(BM25Index, "from_nodes", no_rebuild)
+        bm25 = load_or_build_bm25(index, storage)
+    assert bm25.top_k("echo", 1)[0][0] in index.docstore.get_ref_doc_info("b.txt#0").node_ids
+
+    (data / "b.txt").write_text("golf hotel india")
+    index, _ = refresh_index(data, storage)
+    bm25 = load_or_build_bm25(index, storage)
+    assert bm25.top_k("echo", 1) == [] and len(bm25.top_k("hotel", 1)) == 1
@@ -0,0 +1,107 @@
+"""
+Test incremental index refresh with a counting mock embedding model
+"""
+
+import os
+
+import pytest
+from llama_index.core import Settings, load_index_from_storage
+from llama_index.core.embeddings import MockEmbedding
+
+from incremental_index import MANIFEST_NAME, IndexManifest, refresh_index
+from mmap_vector_store import load_storage_context
+
+
+class CountingEmbedding(MockEmbedding):
+    calls: int = 0
+
+    def _get_text_embedding(self, text):
+        self.calls += 1
+        return super()._get_text_embedding(text)
+
+
+@pytest.fixture(autouse=True)
+def parse_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr("document_loader.CACHE_DIR", tmp_path / "parse_cache")
+
+
+@pytest.fixture
+def embed_model():
+    previous = Settings._embed_model
+    Settings.embed_model = CountingEmbedding(embed_dim=8)
+    yield Settings.embed_model
+    Settings._embed_model = previous
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    for name, text in [("a.txt", "alpha " * 50), ("b.txt", "bravo " * 50), ("c.txt", "charlie " * 50)]:
+        (data / name).write_text(text)
+    return data
+
+
+def stored_ref_docs(persist_dir):
+    index = load_index_from_storage(load_storage_context(persist_dir))
+    return set(index.docstore.get_all_ref_doc_info())
+
+
+def test_first_run_indexes_everything_then_nothing(embed_model, corpus, tmp_path):
+    storage = tmp_path / "storage"
+    _, report = refresh_index(corpus, storage)
+    assert sorted(report.added) == ["a.txt", "b.txt", "c.txt"]
+    assert embed_model.calls == report.nodes_inserted > 0
+
+    embed_model.calls = 0
+    index, again = refresh_index(corpus, storage)
+    assert not again.dirty and again.unchanged == 3
+    assert embed_model.calls == 0
+    assert len(index.docstore.get_all_ref_doc_info()) == 3
+
+
+def test_only_changed_and_new_files_are_embedded(embed_model, corpus, tmp_path):
+    storage = tmp_path / "storage"
+    refresh_index(corpus, storage)
+    embed_model.calls = 0
+
+    (corpus / "b.txt").write_text("bravo changed " * 40)
+    (corpus / "d.txt").write_text("delta " * 50)
+    (corpus / "c.txt").unlink()
+    _, report = refresh_index(corpus, storage)
+
+    assert report.changed == ["b.txt"] and report.added == ["d.txt"] and report.removed == ["c.txt"]
+    assert embed_model.calls == report.nodes_inserted
+    assert stored_ref_docs(storage) == {"a.txt#0", "b.txt#0", "d.txt#0"}
+    manifest = IndexManifest(storage / MANIFEST_NAME)
+    assert set(manifest.files) == {"a.txt", "b.txt", "d.txt"}
+    index = load_index_from_storage(load_storage_context(storage))
+    assert "changed" in index.docstore.get_node(manifest.files["b.txt"]["node_ids"][0]).get_content()
+
+
+def test_touched_but_identical_file_is_not_reembedded(embed_model, corpus, tmp_path):
+    storage = tmp_path / "storage"
+    refresh_index(corpus, storage)
+    embed_model.calls = 0
+
+    path = corpus / "a.txt"
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+    _, report = refresh_index(corpus, storage)
+
+    assert not report.dirty and embed_model.calls == 0
+    assert IndexManifest(storage / MANIFEST_NAME).files["a.txt"]["mtime_ns"] == path.stat().st_mtime_ns
+
+
+def test_lost_manifest_update_does_not_duplicate_nodes(embed_model, corpus, tmp_path):
+    storage = tmp_path / "storage"
+    refresh_index(corpus, storage)
+    saved = (storage / MANIFEST_NAME).read_text()
+
+    (corpus / "a.txt").write_text("alpha v2 " * 30)
+    refresh_index(corpus, storage)
+    (storage / MANIFEST_NAME).write_text(saved)  # as if the run died before saving the manifest
+
+    index, _ = refresh_index(corpus, storage)
+    assert set(index.docstore.get_all_ref_doc_info()) == {"a.txt#0", "b.txt#0", "c.txt#0"}
+    node_count = len(index.docstore.docs)
+    assert node_count == sum(len(e["node_ids"]) for e in IndexManifest(storage / MANIFEST_NAME).files.values())
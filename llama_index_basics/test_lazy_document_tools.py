@@ -0,0 +1,117 @@
+"""
+Test lazily loaded per-document tools: no work at startup, persisted indexes and the LRU cap
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from llama_index.core import Settings
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.llms import MockLLM
+
+from lazy_document_tools import IndexLRU, lazy_document_tools
+
+
+class CountingEmbedding(MockEmbedding):
+    calls: int = 0
+
+    def _get_text_embedding(self, text):
+        self.calls += 1
+        return super()._get_text_embedding(text)
+
+
+@pytest.fixture(autouse=True)
+def parse_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr("document_loader.CACHE_DIR", tmp_path / "parse_cache")
+
+
+@pytest.fixture
+def embed_model():
+    previous = Settings._embed_model, Settings._llm
+    Settings.embed_model = CountingEmbedding(embed_dim=8)
+    Settings.llm = MockLLM()
+    yield Settings.embed_model
+    Settings._embed_model, Settings._llm = previous
+
+
+@pytest.fixture
+def sources(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    sources = {}
+    for i in range(20):
+        path = data / f"doc{i}.txt"
+        path.write_text(f"document {i} talks about topic {i}. " * 40)
+        sources[f"doc{i}"] = [str(path)]
+    return sources
+
+
+def build_query_engine(index):
+    return index.as_query_engine(response_mode="no_text", similarity_top_k=2)
+
+
+def test_startup_does_no_work_and_queries_build_one_index(embed_model, sources, tmp_path):
+    root = tmp_path / "storage"
+    tools = lazy_document_tools(sources, build_query_engine, persist_root=root)
+    assert len(tools) == 20 and tools[3].metadata.name == "vector_tool_doc3"
+    assert embed_model.calls == 0 and not root.exists()
+
+    response = tools[3].query_engine.query("topic 3")
+    assert response.source_nodes and "topic 3" in response.source_nodes[0].node.get_content()
+    assert [p.name for p in root.iterdir()] == ["doc3"]
+    assert (root / "doc3" / "sources.json").exists()
+
+
+def test_persisted_index_is_reused_and_rebuilt_when_source_changes(embed_model, sources, tmp_path):
+    root = tmp_path / "storage"
+    lazy_document_tools(sources, build_query_engine, persist_root=root)[0].query_engine.query("topic 0")
+    built = embed_model.calls
+
+    # A new agent (fresh LRU): loads from disk, no chunk is embedded again
+    tools = lazy_document_tools(sources, build_query_engine, persist_root=root)
+    embed_model.calls = 0
+    tools[0].query_engine.query("topic 0")
+    assert embed_model.calls == 0
+
+    with open(sources["doc0"][0], "a") as f:
+        f.write("A new closing paragraph.")
+    tools = lazy_document_tools(sources, build_query_engine, persist_root=root)
+    embed_model.calls = 0
+    tools[0].query_engine.query("topic 0")
+    assert embed_model.calls >= built > 0
+
+
+def test_lru_keeps_loaded_indexes_under_the_cap(embed_model, sources, tmp_path):
+    root = tmp_path / "storage"
+    cache = IndexLRU()
+    tools = lazy_document_tools(sources, build_query_engine, persist_root=root, cache=cache)
+    tools[0].query_engine.query("topic 0")
+    one_index = cache._total
+
+    cache.max_bytes = int(one_index * 2.5)  # room for two indexes
+    for i in (1, 2, 0):
+        tools[i].query_engine.query(f"topic {i}")
+    assert len(cache) == 2 and "doc0" in cache and "doc2" in cache and "doc1" not in cache
+    loads = cache.loads
+    tools[2].query_engine.query("topic 2")
+    assert cache.loads == loads  # still loaded
+
+
+def test_lru_loads_different_keys_concurrently_and_each_key_once():
+    cache = IndexLRU()
+    both_loading = threading.Barrier(2, timeout=5)  # broken if the two loads are serialized
+    loads = []
+
+    def load(key):
+        def run():
+            loads.append(key)
+            if key in ("a", "b"):
+                both_loading.wait()
+            return key.upper()
+        return run
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda key: cache.get(key, load(key), lambda: 1), ["a", "b", "a", "b"]))
+    assert results == ["A", "B", "A", "B"]
+    assert sorted(loads) == ["a", "b"] and cache.loads == 2
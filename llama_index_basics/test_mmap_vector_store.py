@@ -0,0 +1,148 @@
+"""
+Test the mmap vector store against SimpleVectorStore and through a persisted index
+"""
+
+import numpy as np
+import pytest
+from llama_index.core import Document, Settings, StorageContext, VectorStoreIndex, load_index_from_storage
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import ExactMatchFilter, MetadataFilters, VectorStoreQuery
+
+from mmap_vector_store import MmapVectorStore, load_storage_context
+
+DIM = 16
+
+
+def make_nodes(n, seed=0, doc_count=5):
+    rng = np.random.default_rng(seed)
+    return [
+        TextNode(
+            id_=f"node-{seed}-{i}",
+            text=f"text {i}",
+            embedding=rng.normal(size=DIM).tolist(),
+            metadata={"topic": "even" if i % 2 == 0 else "odd"},
+            relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=f"doc-{i % doc_count}")},
+        )
+        for i in range(n)
+    ]
+
+
+def query(store, vector, k=5, **kwargs):
+    return store.query(VectorStoreQuery(query_embedding=list(vector), similarity_top_k=k, **kwargs))
+
+
+@pytest.fixture
+def nodes():
+    return make_nodes(200)
+
+
+def test_matches_simple_vector_store(nodes):
+    simple, mmap_store = SimpleVectorStore(), MmapVectorStore()
+    simple.add(nodes)
+    mmap_store.add(nodes)
+    for q in np.random.default_rng(1).normal(size=(5, DIM)):
+        expected, got = query(simple, q), query(mmap_store, q)
+        assert got.ids == expected.ids
+        assert np.allclose(got.similarities, expected.similarities, atol=1e-5)
+
+
+def test_persist_reload_and_keep_appending(nodes, tmp_path):
+    path = str(tmp_path / "default__vector_store.json")
+    store = MmapVectorStore()
+    store.add(nodes[:150])
+    store.persist(path)
+
+    reloaded = MmapVectorStore.from_persist_path(path)
+    assert isinstance(reloaded._matrix, np.memmap) and len(reloaded) == 150
+    reloaded.add(nodes[150:])
+    reloaded.delete("doc-0")
+    reloaded.persist(path)
+
+    final = MmapVectorStore.from_persist_path(path)
+    expected = [n for n in nodes if n.ref_doc_id != "doc-0"]
+    assert len(final) == len(expected)
+    reference = SimpleVectorStore()
+    reference.add(expected)
+    q = np.ones(DIM)
+    assert query(final, q, k=10).ids == query(reference, q, k=10).ids
+    assert np.allclose(final.get("node-0-7"), np.asarray(nodes[7].embedding) / np.linalg.norm(nodes[7].embedding), atol=1e-6)
+
+
+def test_filters_and_node_ids_after_reload(nodes, tmp_path):
+    path = str(tmp_path / "default__vector_store.json")
+    store = MmapVectorStore()
+    store.add(nodes)
+    store.persist(path)
+    store = MmapVectorStore.from_persist_path(path)
+    assert store._metadata is None  # not parsed on load
+
+    filters = MetadataFilters(filters=[ExactMatchFilter(key="topic", value="odd")])
+    result = query(store, np.ones(DIM), k=20, filters=filters)
+    assert len(result.ids) == 20 and all(int(i.rsplit("-", 1)[1]) % 2 == 1 for i in result.ids)
+
+    result = query(store, np.ones(DIM), k=5, node_ids=["node-0-3", "node-0-4"])
+    assert sorted(result.ids) == ["node-0-3", "node-0-4"]
+
+
+def test_float16_store_ranks_like_float32(nodes, tmp_path):
+    path = str(tmp_path / "default__vector_store.json")
+    store = MmapVectorStore(dtype="float16")
+    store.add(nodes)
+    store.persist(path)
+    reloaded = MmapVectorStore.from_persist_path(path)
+    assert reloaded._matrix.dtype == np.float16
+    reference = MmapVectorStore()
+    reference.add(nodes)
+    q = np.random.default_rng(3).normal(size=DIM)
+    assert query(reloaded, q, k=3).ids == query(reference, q, k=3).ids
+
+
+def test_float16_index_stays_float16_through_storage_context(tmp_path):
+    previous = Settings._embed_model
+    Settings.embed_model = MockEmbedding(embed_dim=DIM)
+    try:
+        documents = [Document(text=f"document number {i} " * 20, id_=f"doc{i}") for i in range(4)]
+        storage_context = StorageContext.from_defaults(vector_store=MmapVectorStore(dtype="float16"))
+        VectorStoreIndex.from_documents(documents, storage_context=storage_context).storage_context.persist(
+            persist_dir=str(tmp_path)
+        )
+        index = load_index_from_storage(load_storage_context(tmp_path))
+        assert index.vector_store.dtype == "float16"
+        index.insert(Document(text="a fifth document", id_="doc4"))
+        index.storage_context.persist(persist_dir=str(tmp_path))
+        assert np.load(tmp_path / "default__vector_store.npy", mmap_mode="r").dtype == np.float16
+        assert len(load_storage_context(tmp_path).vector_store) == 5
+    finally:
+        Settings._embed_model = previous
+
+
+def test_storage_context_roundtrip_and_json_migration(tmp_path):
+    previous = Settings._embed_model
+    Settings.embed_model = MockEmbedding(embed_dim=DIM)
+    try:
+        documents = [Document(text=f"document number {i} " * 20, id_=f"doc{i}") for i in range(4)]
+        # Old format: JSON SimpleVectorStore
+        legacy = VectorStoreIndex.from_documents(documents, storage_context=StorageContext.from_defaults())
+        legacy.storage_context.persist(persist_dir=str(tmp_path))
+        assert (tmp_path / "default__vector_store.json").exists()
+
+        index = load_index_from_storage(load_storage_context(tmp_path))
+        assert isinstance(index.vector_store, MmapVectorStore) and len(index.vector_store) == 4
+        index.insert(Document(text="a fifth document", id_="doc4"))
+        index.storage_context.persist(persist_dir=str(tmp_path))
+        assert not (tmp_path / "default__vector_store.json").exists()
+        assert (tmp_path / "default__vector_store.npy").exists()
+
+        index = load_index_from_storage(load_storage_context(tmp_path))
+        assert len(index.vector_store) == 5
+        nodes = index.as_retriever(similarity_top_k=2).retrieve("document")
+        assert len(nodes) == 2 and nodes[0].node.get_content()
+    finally:
+        Settings._embed_model = previous
+
+
+def test_empty_store_is_kept_by_storage_context():
+    # An empty store has len() 0; StorageContext must not swap it for a SimpleVectorStore
+    assert StorageContext.from_defaults(vector_store=MmapVectorStore()).vector_store.__class__ is MmapVectorStore
@@ -0,0 +1,121 @@
+"""
+Test the query-response cache: exact and semantic hits, invalidation on index updates and the size cap
+"""
+
+import zlib
+
+import numpy as np
+import pytest
+from llama_index.core import Document, Settings, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.llms import MockLLM
+
+from query_cache import QueryCache, cached_query_engine, index_version
+
+
+class BagOfWordsEmbedding(MockEmbedding):
+    """Texts sharing their words get the same vector, unrelated texts nearly orthogonal ones."""
+
+    query_calls: int = 0
+
+    def _vector(self, text):
+        vector = np.zeros(self.embed_dim)
+        for word in text.lower().replace("?", " ").replace(",", " ").split():
+            vector[zlib.crc32(word.encode()) % self.embed_dim] += 1
+        return vector.tolist()
+
+    def _get_text_embedding(self, text):
+        return self._vector(text)
+
+    def _get_query_embedding(self, query):
+        self.query_calls += 1
+        return self._vector(query)
+
+
+class CountingLLM(MockLLM):
+    calls: int = 0
+
+    def complete(self, prompt, formatted=False, **kwargs):
+        self.calls += 1
+        return super().complete(prompt, formatted=formatted, **kwargs)
+
+
+@pytest.fixture
+def models():
+    previous = Settings._embed_model, Settings._llm
+    Settings.embed_model = BagOfWordsEmbedding(embed_dim=256)
+    Settings.llm = CountingLLM()
+    yield Settings.embed_model, Settings.llm
+    Settings._embed_model, Settings._llm = previous
+
+
+def documents():
+    return [Document(text=f"Topic {i} is about subject number {i}.") for i in range(5)]
+
+
+def test_repeated_queries_cost_no_llm_calls(models, tmp_path):
+    _, llm = models
+    index = VectorStoreIndex.from_documents(documents())
+    engine = cached_query_engine(index, index.as_query_engine(), cache=QueryCache(tmp_path / "q.sqlite"))
+    first = engine.query("What is topic 3 about?")
+    assert llm.calls == 1
+    again = engine.query("  what is TOPIC 3 about ")
+    assert llm.calls == 1 and engine.stats.hits == 1 and engine.stats.misses == 1
+    assert str(again) == str(first)
+    assert [n.node.get_content() for n in again.source_nodes] == [n.node.get_content() for n in first.source_nodes]
+
+    # Next run: the index is rebuilt from the same documents (new IDs, same contents)
+    index = VectorStoreIndex.from_documents(documents())
+    engine = cached_query_engine(index, index.as_query_engine(), cache=QueryCache(tmp_path / "q.sqlite"))
+    assert str(engine.query("What is topic 3 about?")) == str(first)
+    assert llm.calls == 1
+
+
+def test_semantic_hits_and_single_query_embedding(models, tmp_path):
+    embed_model, llm = models
+    index = VectorStoreIndex.from_documents(documents())
+    engine = cached_query_engine(
+        index, index.as_query_engine(), cache=QueryCache(tmp_path / "q.sqlite"), semantic_threshold=0.9
+    )
+    engine.query("tell me what topic 2 is about")
+    assert embed_model.query_calls == 1  # the retriever reused the cache's query embedding
+
+    engine.query("what topic 2 is about, tell me")
+    assert engine.stats.semantic_hits == 1 and llm.calls == 1
+    engine.query("which subject has number 4")
+    assert engine.stats.misses == 2 and llm.calls == 2
+
+
+def test_semantic_hits_are_opt_in(models, tmp_path):
+    _, llm = models
+    index = VectorStoreIndex.from_documents(documents())
+    engine = cached_query_engine(index, index.as_query_engine(), cache=QueryCache(tmp_path / "q.sqlite"))
+    engine.query("tell me what topic 2 is about")
+    engine.query("what topic 2 is about, tell me")
+    assert engine.stats.semantic_hits == 0 and engine.stats.misses == 2 and llm.calls == 2
+
+
+def test_index_updates_invalidate(models, tmp_path):
+    _, llm = models
+    cache = QueryCache(tmp_path / "q.sqlite")
+    index = VectorStoreIndex.from_documents(documents())
+    engine = cached_query_engine(index, index.as_query_engine(), cache=cache)
+    engine.query("What is topic 1 about?")
+
+    index.insert(Document(text="Topic 1 was renamed to topic one."))
+    assert index_version(index) != engine.version
+    engine.update_version(index_version(index))
+    assert len(cache) == 0
+    engine.query("What is topic 1 about?")
+    assert llm.calls == 2 and engine.stats.misses == 2
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path):
+    cache = QueryCache(tmp_path / "q.sqlite", max_entries=10)
+    for i in range(10):
+        cache.put("ns", "v1", f"query {i}", f"answer {i}")
+    cache.get("ns", "v1", "query 0")
+    cache.put("ns", "v1", "query 10", "answer 10")
+    assert len(cache) == 9
+    assert cache.get("ns", "v1", "query 0") == "answer 0"
+    assert cache.get("ns", "v1", "query 1") is None
@@ -8,6 +8,9 @@ import json
 import uuid
 import datetime
 import argparse
+import hashlib
+import shutil
+import subprocess
 from dotenv import load_dotenv
 from openai import OpenAI
 import replicate
@@ -48,8 +51,53 @@ def create_unique_output_directory():
     print(f"Created unique output directory: {output_dir}")
     return output_dir
 
+# Local cache for downsampled uploads, keyed by the source video's content hash
+TRANSCODE_CACHE_DIR = os.path.join(os.getcwd(), ".transcode_cache")
+
+# Function to downsample a video before uploading it to Gemini
+def transcode_for_analysis(video_path, source_hash, cache_dir=TRANSCODE_CACHE_DIR):
+    """
+    Downsamples a video to 720p / 2 fps / ~800 kbps with mono audio using ffmpeg.
+    Gemini samples video at about 1 fps, so the analysis is unaffected while the
+    upload and server-side PROCESSING shrink. Outputs are cached by source hash.
+    Returns the original path if ffmpeg is missing, fails, or the result is not smaller.
+    """
+    if shutil.which("ffmpeg") is None:
+        print("ffmpeg not found on PATH; uploading the source video.")
+        return video_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    output_path = os.path.join(cache_dir, f"{source_hash}_analysis.mp4")
+    if os.path.exists(output_path):
+        print(f"Using cached transcode: {output_path}")
+        return output_path
+
+    tmp_path = output_path + ".tmp.mp4"
+    command = [
+        "ffmpeg", "-y", "-loglevel", "error", "-i", video_path,
+        "-vf", "scale=-2:'min(720,ih)',fps=2",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "30", "-maxrate", "800k", "-bufsize", "800k",
+        "-c:a", "aac", "-b:a", "64k", "-ac", "1", "-movflags", "+faststart",
+        tmp_path,
+    ]
+    try:
+        subprocess.run(command, check=True)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"Transcode failed ({e}); uploading the source video.")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return video_path
+
+    source_size, output_size = os.path.getsize(video_path), os.path.getsize(tmp_path)
+    if output_size >= source_size:
+        os.remove(tmp_path)
+        return video_path
+    os.replace(tmp_path, output_path)
+    print(f"Transcoded video: {source_size / 1e6:.1f} MB -> {output_size / 1e6:.1f} MB")
+    return output_path
+
 # Function to analyze video using Gemini API
-def analyze_video(video_url, output_dir):
+def analyze_video(video_url, output_dir, transcode=False):
     print(f"Starting video analysis process...")
     
     # Initialize Gemini client
@@ -77,10 +125,14 @@ def analyze_video(video_url, output_dir):
         temp_file.close()
         print(f"Video saved temporarily to: {temp_file_path}")
         
+        upload_path = temp_file_path
+        if transcode:
+            upload_path = transcode_for_analysis(temp_file_path, hashlib.sha256(video_bytes).hexdigest())
+        
         # Upload the temporary video file
-        print(f"Uploading temporary video file to Gemini...")
+        print(f"Uploading video file to Gemini...")
         files = [
-            client.files.upload(file=temp_file_path),
+            client.files.upload(file=upload_path),
         ]
         
         # Check the file's state and wait until it's ACTIVE
@@ -959,6 +1011,8 @@ def main():
                             help='Generate voiceover from transcript (default: False)')
         parser.add_argument('--no_reword', action='store_true',
                             help='Disable transcript rewording (enabled by default)')
+        parser.add_argument('--transcode', action='store_true',
+                            help='Downsample the video locally with ffmpeg before upload (default: False)')
         
         args = parser.parse_args()
         
@@ -966,7 +1020,7 @@ def main():
         video_url = args.video_url
         
         print(f"Starting end-to-end pipeline for video: {video_url}")
-        json_data, analysis_file = analyze_video(video_url, output_dir)
+        json_data, analysis_file = analyze_video(video_url, output_dir, transcode=args.transcode)
         
         if not json_data:
             print("Video analysis failed. Exiting.")